@@ -0,0 +1,148 @@
+# annotation.py - IMAGEM ANOTADA SOB DEMANDA
+'''
+🧾 Resultado Sem Imagem
+    O resultado guarda só as detecções e a referência da foto:
+    'image_path' + 'image_size' (uma foto) ou 'imagens' (várias)
+    Nenhum array de pixels fica preso em current_results ou na fila
+
+🖍️ Renderização Sob Demanda
+    render_annotated(results, (largura, altura)) desenha quando alguém
+    pede (miniatura, PDF, visualizador) e na resolução pedida
+    Foto decodificada já reduzida (IMREAD_REDUCED_*), caixas escaladas
+    Traços e textos com tamanho fixo na resolução de saída
+
+🎨 Cores
+    VERDE: Detecções da API | AZUL: Detecções locais
+    CINZA: Betoneira repetida de outra foto da mesma O.S.
+'''
+import cv2
+
+from config import load_config
+
+# Importação condicional: sem Pillow a foto é decodificada inteira
+try:
+    from PIL import Image as PILImage
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+API_COLOR = (0, 255, 0)
+LOCAL_COLOR = (255, 0, 0)
+DUPLICATE_COLOR = (160, 160, 160)
+
+REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+# ==================== DECODIFICAÇÃO ====================
+
+def image_size(path):
+    """(largura, altura) lidas só do cabeçalho; None se desconhecido"""
+    if not PIL_AVAILABLE:
+        return None
+    try:
+        with PILImage.open(path) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def decode_reduced(path, width=None, height=None):
+    """Decodifica já reduzida, sem ficar menor que width x height (None = inteira)"""
+    size = image_size(path) if width and height else None
+    flag = cv2.IMREAD_COLOR
+    if size is not None:
+        # Lados comparados por tamanho: a orientação EXIF pode girar a foto
+        for factor, reduced_flag in REDUCED_FLAGS:
+            if max(size) / factor >= max(width, height) and min(size) / factor >= min(width, height):
+                flag = reduced_flag
+                break
+    return cv2.imread(path, flag)
+
+
+def fit_size(image, width, height):
+    """Reduz mantendo a proporção para caber em width x height"""
+    h, w = image.shape[:2]
+    scale = min(width / w, height / h, 1.0)
+    if scale >= 1.0:
+        return image
+    return cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+# ==================== DESENHO ====================
+
+def draw_detections(image, betoneiras, scale=1.0, duplicates=()):
+    """Desenha as caixas (coordenadas da foto original × scale) na imagem"""
+    def box(bbox):
+        return tuple(int(round(value * scale)) for value in bbox)
+
+    for bet in betoneiras:
+        x1, y1, x2, y2 = box(bet['bbox'])
+        if bet.get('local_detection'):
+            color, thickness = LOCAL_COLOR, 3
+            label = f"{bet['id']} {bet.get('method', 'local')}"
+        else:
+            color, thickness = API_COLOR, 4
+            label = f"{bet['id']} {bet.get('conf', 0):.2f}"
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, thickness)
+        cv2.putText(image, label, (x1, max(12, y1 - 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+    for duplicate in duplicates:
+        x1, y1, x2, y2 = box(duplicate['bbox'])
+        cv2.rectangle(image, (x1, y1), (x2, y2), DUPLICATE_COLOR, 3)
+        cv2.putText(image, f"= {duplicate['de']}", (x1, y2 + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, DUPLICATE_COLOR, 2)
+    return image
+
+
+def render_photo(image_path, original_size, betoneiras, duplicates=(), size=None):
+    """Uma foto anotada; size=(largura, altura) máximo ou None (resolução total)"""
+    width, height = size or (None, None)
+    image = decode_reduced(image_path, width, height)
+    if image is None:
+        return None
+    if size is not None:
+        image = fit_size(image, width, height)
+    scale = image.shape[1] / original_size[0] if original_size else 1.0
+    return draw_detections(image, betoneiras, scale, duplicates)
+
+
+def build_mosaic(images, height):
+    """Fotos anotadas lado a lado na mesma altura"""
+    resized = [cv2.resize(image, (max(1, int(image.shape[1] * height / image.shape[0])), height),
+                          interpolation=cv2.INTER_AREA)
+               for image in images]
+    return cv2.hconcat(resized)
+
+
+def render_annotated(results, size=None):
+    """Imagem anotada do resultado, só quando pedida; None se a foto sumiu
+
+    size=(largura, altura) limita a saída (miniatura, PDF); None devolve
+    a foto em resolução total (várias fotos: mosaico na altura configurada).
+    """
+    betoneiras = results.get('betoneiras', [])
+    fotos = results.get('imagens')
+    if not fotos:
+        image_path = results.get('image_path')
+        if not image_path:
+            return None
+        return render_photo(image_path, results.get('image_size'), betoneiras, size=size)
+
+    mosaic_height = load_config()["multi_imagem"]["altura_mosaico"]
+    if size is not None:
+        # Cada foto só precisa da altura final do mosaico
+        mosaic_height = min(mosaic_height, size[1])
+    duplicates = results.get('duplicatas', [])
+    images = []
+    for i, foto in enumerate(fotos):
+        if foto.get('rejected') and len(fotos) > 1 and any(not f.get('rejected') for f in fotos):
+            continue
+        image = render_photo(foto['image_path'], foto.get('image_size'),
+                             [bet for bet in betoneiras if bet.get('imagem') == i],
+                             [dup for dup in duplicates if dup['imagem'] == i],
+                             size=(mosaic_height * 4, mosaic_height))
+        if image is not None:
+            images.append(image)
+    if not images:
+        return None
+    mosaic = build_mosaic(images, mosaic_height)
+    return fit_size(mosaic, *size) if size else mosaic
@@ -0,0 +1,333 @@
+# artifact_store.py - FOTOS E PRÉVIAS ANOTADAS ENDEREÇADAS POR CONTEÚDO
+'''
+🔑 Endereçamento por Conteúdo
+    Cada arquivo é guardado pelo SHA-256 do próprio conteúdo
+    A mesma foto enviada de novo (outra O.S., reprocessamento) não ocupa espaço:
+    só o último uso é atualizado no índice
+    Arquivos nunca mudam depois de gravados (escrita em .tmp + rename atômico)
+
+🗂️ Pastas Fragmentadas
+    objetos/ab/cd/abcd…ef.jpg (dois níveis de 256 pastas)
+    Nenhuma pasta acumula centenas de milhares de arquivos
+
+🖼️ Prévia Anotada Comprimida
+    A imagem anotada deixa de ser descartada depois do PDF
+    Guardada em JPEG com lado máximo e qualidade de config.json → "artefatos"
+
+📇 Índice (SQLite)
+    hash, tipo (original / anotada), tamanho, origem, criação e último uso
+    O resultado recebe 'artefatos' = {'originais': [...], 'anotada': ...},
+    que vai junto para a coluna "resultado" do histórico (result_schema.py)
+
+🔍 Auditoria
+    restore(resultado do histórico) aponta as fotos para as cópias guardadas:
+    miniatura, visualizador e PDF funcionam sem rodar a detecção de novo,
+    mesmo que a foto original tenha sido movida ou apagada
+
+🧹 Retenção (config.json → "artefatos")
+    Mais antigos que "dias" (pelo último uso) são apagados
+    Acima de "max_total_mb", prévias saem antes das originais
+    (a prévia pode ser redesenhada a partir da original e das caixas)
+
+▶️ Uso
+    python artifact_store.py resumo
+    python artifact_store.py podar [--dias N] [--max-mb M] [--simular]
+    python artifact_store.py verificar [--reparar]
+'''
+import argparse
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+import cv2
+
+from annotation import fit_size, render_annotated
+from config import load_config
+
+ORIGINAL = "original"
+PREVIEW = "anotada"
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artefatos (
+    hash TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    extensao TEXT NOT NULL,
+    tamanho INTEGER NOT NULL,
+    origem TEXT,
+    criado REAL NOT NULL,
+    acesso REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_artefatos_acesso ON artefatos (acesso);
+"""
+
+_CHUNK = 1 << 20
+
+
+def format_mb(size):
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def file_digest(path):
+    """SHA-256 do arquivo, lido em blocos de 1 MB"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def relink_images(results, paths):
+    """Troca os caminhos das fotos do resultado (mesma ordem de 'imagens')"""
+    if results.get('imagens'):
+        for foto, path in zip(results['imagens'], paths):
+            if path:
+                foto['image_path'] = path
+        for bet in results.get('betoneiras', []):
+            if 'imagem' in bet and bet['imagem'] < len(results['imagens']):
+                bet['imagem_path'] = results['imagens'][bet['imagem']]['image_path']
+    elif paths and paths[0]:
+        results['image_path'] = paths[0]
+    return results
+
+
+class ArtifactStore:
+    """Fotos originais e prévias anotadas em pastas fragmentadas por hash"""
+
+    def __init__(self, root=None):
+        settings = load_config()["artefatos"]
+        self.settings = settings
+        self.root = os.path.abspath(root or settings["pasta"])
+        self.preview_side = settings["lado_previa"]
+        self.preview_quality = settings["qualidade_previa"]
+        os.makedirs(os.path.join(self.root, "objetos"), exist_ok=True)
+
+        # Uma conexão compartilhada pelas threads da fila / pasta monitorada
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(self.root, "indice.db"), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(INDEX_SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # ==================== OBJETOS ====================
+
+    def object_path(self, digest, extension):
+        return os.path.join(self.root, "objetos", digest[:2], digest[2:4], digest + extension)
+
+    def _store(self, digest, extension, write):
+        """Grava o objeto se ainda não existir; retorna (caminho, novo?)"""
+        path = self.object_path(digest, extension)
+        if os.path.exists(path):
+            return path, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            write(temp)
+            os.replace(temp, path)
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+        return path, True
+
+    def _index(self, digest, kind, extension, size, origin):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO artefatos (hash, tipo, extensao, tamanho, origem, criado, acesso) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(hash) DO UPDATE SET acesso = excluded.acesso",
+                (digest, kind, extension, size, origin, now, now)
+            )
+
+    def put_file(self, path, kind=ORIGINAL):
+        """Guarda uma cópia do arquivo (deduplicada); retorna o hash"""
+        digest = file_digest(path)
+        extension = os.path.splitext(path)[1].lower() or ".bin"
+        stored, _ = self._store(digest, extension, lambda temp: shutil.copyfile(path, temp))
+        self._index(digest, kind, extension, os.path.getsize(stored), os.path.basename(path))
+        return digest
+
+    def put_bytes(self, data, extension, kind, origin=None):
+        """Guarda bytes já codificados; retorna o hash"""
+        digest = hashlib.sha256(data).hexdigest()
+
+        def write(temp):
+            with open(temp, "wb") as f:
+                f.write(data)
+
+        self._store(digest, extension, write)
+        self._index(digest, kind, extension, len(data), origin)
+        return digest
+
+    def put_preview(self, image, origin=None):
+        """Imagem anotada → JPEG reduzido ao lado máximo da prévia; retorna o hash"""
+        image = fit_size(image, self.preview_side, self.preview_side)
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.preview_quality])
+        if not ok:
+            raise ValueError("falha ao codificar a prévia anotada")
+        return self.put_bytes(encoded.tobytes(), ".jpg", PREVIEW, origin)
+
+    def path(self, digest, touch=True):
+        """Caminho do objeto guardado (None se não existe mais)"""
+        with self.lock:
+            row = self.conn.execute("SELECT extensao FROM artefatos WHERE hash = ?", (digest,)).fetchone()
+        if row is None:
+            return None
+        path = self.object_path(digest, row['extensao'])
+        if not os.path.exists(path):
+            return None
+        if touch:
+            with self.lock, self.conn:
+                self.conn.execute("UPDATE artefatos SET acesso = ? WHERE hash = ?", (time.time(), digest))
+        return path
+
+    # ==================== RESULTADOS ====================
+
+    def archive(self, results, image_paths, annotated=None):
+        """Guarda as fotos e a prévia anotada de um resultado
+
+        annotated: imagem anotada já desenhada (ex.: lote); None desenha aqui.
+        Acrescenta results['artefatos'] com os hashes e o retorna.
+        """
+        if isinstance(image_paths, str):
+            image_paths = [image_paths]
+        origin = os.path.basename(image_paths[0]) if image_paths else None
+        originais = [self.put_file(path) for path in image_paths]
+        if annotated is None:
+            annotated = render_annotated(results, (self.preview_side, self.preview_side))
+        anotada = self.put_preview(annotated, origin) if annotated is not None else None
+        results['artefatos'] = {'originais': originais, 'anotada': anotada}
+        return results['artefatos']
+
+    def restore(self, results):
+        """Cópia do resultado com as fotos apontando para os arquivos guardados"""
+        artefatos = results.get('artefatos')
+        if not artefatos:
+            return results
+        results = dict(results)
+        if results.get('imagens'):
+            results['imagens'] = [dict(foto) for foto in results['imagens']]
+        results['betoneiras'] = [dict(bet) for bet in results.get('betoneiras', [])]
+        relink_images(results, [self.path(digest) for digest in artefatos.get('originais', [])])
+        return results
+
+    def preview_path(self, results):
+        """Prévia anotada guardada do resultado (None se não houver)"""
+        digest = (results.get('artefatos') or {}).get('anotada')
+        return self.path(digest) if digest else None
+
+    # ==================== RETENÇÃO ====================
+
+    def summary(self):
+        """{tipo: (quantidade, bytes)}"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT tipo, COUNT(*) AS n, COALESCE(SUM(tamanho), 0) AS total FROM artefatos GROUP BY tipo"
+            ).fetchall()
+        return {row['tipo']: (row['n'], row['total']) for row in rows}
+
+    def _remove(self, digest, extension):
+        path = self.object_path(digest, extension)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        # Pastas de fragmento vazias (ab/cd e ab) não ficam para trás
+        for folder in (os.path.dirname(path), os.path.dirname(os.path.dirname(path))):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                break
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM artefatos WHERE hash = ?", (digest,))
+
+    def prune(self, max_age_days=None, max_total_mb=None, dry_run=False):
+        """Apaga por último uso e depois por tamanho total; retorna (arquivos, bytes) removidos"""
+        with self.lock:
+            # Prévias primeiro (podem ser redesenhadas), depois o uso mais antigo
+            rows = self.conn.execute(
+                "SELECT hash, tipo, extensao, tamanho, origem, acesso FROM artefatos "
+                "ORDER BY tipo = ?, acesso", (ORIGINAL,)
+            ).fetchall()
+        cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+        total = sum(row['tamanho'] for row in rows)
+        limit = max_total_mb * 1024 * 1024 if max_total_mb else None
+
+        removed, freed = 0, 0
+        for row in rows:
+            too_old = cutoff is not None and row['acesso'] < cutoff
+            over_limit = limit is not None and total > limit
+            if not (too_old or over_limit):
+                continue
+            motivo = "sem uso" if too_old else "acima do limite"
+            print(f"🗑️  {row['tipo']} {row['hash'][:12]} {row['origem'] or ''} ({format_mb(row['tamanho'])}, {motivo})")
+            if not dry_run:
+                try:
+                    self._remove(row['hash'], row['extensao'])
+                except OSError as e:
+                    print(f"⚠️  Não foi possível apagar {row['hash'][:12]}: {e}")
+                    continue
+            total -= row['tamanho']
+            removed += 1
+            freed += row['tamanho']
+        return removed, freed
+
+    def verify(self, repair=False):
+        """Confere existência e hash de cada objeto; retorna os hashes com problema"""
+        with self.lock:
+            rows = self.conn.execute("SELECT hash, extensao FROM artefatos").fetchall()
+        damaged = []
+        for row in rows:
+            path = self.object_path(row['hash'], row['extensao'])
+            if not os.path.exists(path):
+                problema = "ausente"
+            elif file_digest(path) != row['hash']:
+                problema = "conteúdo alterado"
+            else:
+                continue
+            print(f"⚠️  {row['hash'][:12]}: {problema}")
+            damaged.append(row['hash'])
+            if repair:
+                self._remove(row['hash'], row['extensao'])
+        return damaged
+
+
+def main():
+    settings = load_config()["artefatos"]
+    parser = argparse.ArgumentParser(description="Armazenamento de fotos e prévias anotadas")
+    parser.add_argument("acao", choices=["resumo", "podar", "verificar"])
+    parser.add_argument("--pasta", default=settings["pasta"])
+    parser.add_argument("--dias", type=int, default=settings["dias"])
+    parser.add_argument("--max-mb", type=int, default=settings["max_total_mb"])
+    parser.add_argument("--simular", action="store_true", help="só mostra o que seria apagado")
+    parser.add_argument("--reparar", action="store_true", help="remove do índice objetos ausentes ou alterados")
+    args = parser.parse_args()
+
+    store = ArtifactStore(args.pasta)
+    try:
+        if args.acao == "resumo":
+            summary = store.summary()
+            for kind, (count, size) in sorted(summary.items()):
+                print(f"📦 {kind}: {count} arquivo(s), {format_mb(size)}")
+            if not summary:
+                print("📦 Nenhum artefato guardado")
+        elif args.acao == "podar":
+            removed, freed = store.prune(args.dias, args.max_mb, args.simular)
+            prefixo = "Seriam removidos" if args.simular else "Removidos"
+            print(f"🧹 {prefixo} {removed} arquivo(s), {format_mb(freed)}")
+        else:
+            damaged = store.verify(args.reparar)
+            print(f"🔍 {len(damaged)} objeto(s) com problema" if damaged else "✅ Todos os objetos conferem")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# background_model.py - MODELO DE FUNDO PARA CÂMERAS FIXAS
+'''
+📷 Câmeras Fixas (baias de devolução)
+    Fotos consecutivas só mudam onde betoneiras entraram ou saíram
+    O modelo de fundo gera máscaras de mudança por câmera
+
+🧮 Dois métodos
+    running_average: média móvel ponderada (rápida, poucas fotos)
+    mog2: mistura de gaussianas do OpenCV (robusta a iluminação)
+
+♻️ Cache de Detecções
+    Detecções fora das regiões alteradas são reaproveitadas
+    Só as regiões alteradas voltam para a detecção
+
+🔒 Atualização Só com Sucesso
+    observe() compara com o fundo sem aprender e trava a câmera
+    commit() aprende a foto e atualiza o cache juntos, com a detecção concluída
+    discard() (erro da API, cancelamento) mantém fundo e cache como estavam
+'''
+import threading
+
+import cv2
+import numpy as np
+
+
+class BackgroundModel:
+    """Modelo de fundo de uma câmera fixa com cache das últimas detecções"""
+
+    def __init__(self, method="running_average", work_size=640, learning_rate=0.5,
+                 diff_threshold=30, min_region_ratio=0.002, region_padding=0.05):
+        self.method = method
+        self.work_size = work_size
+        self.learning_rate = learning_rate
+        self.diff_threshold = diff_threshold
+        self.min_region_ratio = min_region_ratio
+        self.region_padding = region_padding
+
+        self.background = None
+        self.frame_shape = None
+        self.mog2 = None
+        if method == "mog2":
+            self.mog2 = cv2.createBackgroundSubtractorMOG2(
+                history=20, varThreshold=diff_threshold, detectShadows=False
+            )
+
+        # Detecções da última foto (coordenadas da imagem completa)
+        self.detections = None
+        self.lock = threading.Lock()
+        # Uma foto por vez da observação até commit/discard
+        self.camera_lock = threading.Lock()
+
+    def _prepare(self, image):
+        """Reduz e suaviza a imagem para a comparação com o fundo"""
+        h, w = image.shape[:2]
+        scale = min(1.0, self.work_size / max(h, w))
+        small = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        if self.method != "mog2":
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            small = cv2.GaussianBlur(small, (5, 5), 0)
+        return small, scale
+
+    def change_mask(self, small, shape):
+        """Máscara de mudança sem alterar o fundo (None se não há fundo para a foto)"""
+        if self.background is None or self.frame_shape != shape:
+            # Primeira foto ou câmera mudou de resolução: tudo é mudança
+            return None
+        if self.mog2 is not None:
+            mask = self.mog2.apply(small, learningRate=0)  # 0 = só compara, não aprende
+        else:
+            diff = cv2.absdiff(small, cv2.convertScaleAbs(self.background))
+            _, mask = cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY)
+
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+        mask = cv2.dilate(mask, kernel, iterations=2)
+        return mask
+
+    def learn(self, small, shape):
+        """Incorpora a foto ao fundo (só com a detecção da foto concluída)"""
+        if self.frame_shape != shape:
+            self.frame_shape = shape
+            self.background = None
+            self.detections = None
+        if self.mog2 is not None:
+            first_frame = self.background is None
+            self.mog2.apply(small, learningRate=-1 if first_frame else self.learning_rate)
+            self.background = True
+        elif self.background is None:
+            self.background = small.astype(np.float32)
+        else:
+            cv2.accumulateWeighted(small, self.background, self.learning_rate)
+
+    def mask_regions(self, mask, scale, shape):
+        """Regiões alteradas (x1, y1, x2, y2) na resolução original"""
+        h, w = shape[:2]
+        mask_h, mask_w = mask.shape[:2]
+        min_area = mask_h * mask_w * self.min_region_ratio
+
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        regions = []
+        for contour in contours:
+            if cv2.contourArea(contour) < min_area:
+                continue
+            x, y, rw, rh = cv2.boundingRect(contour)
+            pad_x = int(rw * self.region_padding) + 2
+            pad_y = int(rh * self.region_padding) + 2
+            x1 = max(0, int((x - pad_x) / scale))
+            y1 = max(0, int((y - pad_y) / scale))
+            x2 = min(w, int((x + rw + pad_x) / scale))
+            y2 = min(h, int((y + rh + pad_y) / scale))
+            regions.append((x1, y1, x2, y2))
+
+        return merge_regions(regions)
+
+    def observe(self, image):
+        """Início do processamento de uma foto da câmera
+
+        Trava a câmera (fotos da mesma câmera em sequência, nunca intercaladas)
+        e calcula as regiões alteradas sem mexer no fundo. O fundo e o cache só
+        mudam em BackgroundUpdate.commit(); discard() descarta a foto.
+        """
+        self.camera_lock.acquire()
+        try:
+            small, scale = self._prepare(image)
+            shape = image.shape[:2]
+            with self.lock:
+                mask = self.change_mask(small, shape)
+            regions = None if mask is None else self.mask_regions(mask, scale, shape)
+            return BackgroundUpdate(self, small, shape, regions, self.cached_detections())
+        except BaseException:
+            self.camera_lock.release()
+            raise
+
+    def cached_detections(self):
+        """Detecções da última foto (None se ainda não há cache)"""
+        with self.lock:
+            if self.detections is None:
+                return None
+            return [dict(det) for det in self.detections]
+
+    def update_detections(self, regions, new_detections):
+        """Mantém detecções fora das regiões alteradas e adiciona as novas"""
+        with self.lock:
+            if regions is None or self.detections is None:
+                kept = []
+            else:
+                kept = [det for det in self.detections
+                        if not any(boxes_overlap(det['bbox'], region) for region in regions)]
+            self.detections = kept + [dict(det) for det in new_detections]
+            return [dict(det) for det in self.detections]
+
+    def reset(self):
+        """Descarta o fundo e o cache (ex.: câmera foi movida)"""
+        with self.lock:
+            self.background = None
+            self.frame_shape = None
+            self.detections = None
+            if self.mog2 is not None:
+                self.mog2 = cv2.createBackgroundSubtractorMOG2(
+                    history=20, varThreshold=self.diff_threshold, detectShadows=False
+                )
+
+
+class BackgroundUpdate:
+    """Foto observada de uma câmera, pendente até a detecção terminar"""
+
+    def __init__(self, model, small, shape, regions, cached):
+        self.model = model
+        self.small = small
+        self.shape = shape
+        self.regions = regions  # None = sem fundo conhecido (imagem inteira)
+        self.cached = cached    # detecções da foto anterior (None se não há)
+        self.open = True
+
+    def commit(self, new_detections):
+        """Aprende a foto, mescla as detecções novas e libera a câmera"""
+        if not self.open:
+            raise RuntimeError("atualização do fundo já encerrada")
+        try:
+            with self.model.lock:
+                self.model.learn(self.small, self.shape)
+            return self.model.update_detections(self.regions, new_detections)
+        finally:
+            self.close()
+
+    def discard(self):
+        """Libera a câmera sem tocar no fundo nem no cache (idempotente)"""
+        if self.open:
+            self.close()
+
+    def close(self):
+        self.open = False
+        self.small = None
+        self.model.camera_lock.release()
+
+
+class BackgroundModelRegistry:
+    """Um modelo de fundo por câmera"""
+
+    def __init__(self, **model_kwargs):
+        self.model_kwargs = model_kwargs
+        self.models = {}
+        self.lock = threading.Lock()
+
+    def get(self, camera_id):
+        with self.lock:
+            if camera_id not in self.models:
+                self.models[camera_id] = BackgroundModel(**self.model_kwargs)
+            return self.models[camera_id]
+
+    def reset(self, camera_id=None):
+        with self.lock:
+            models = list(self.models.values()) if camera_id is None else [self.models.get(camera_id)]
+        for model in models:
+            if model is not None:
+                model.reset()
+
+
+def boxes_overlap(box_a, box_b):
+    """Verifica se duas caixas (x1, y1, x2, y2) se sobrepõem"""
+    return not (box_a[2] <= box_b[0] or box_b[2] <= box_a[0] or
+                box_a[3] <= box_b[1] or box_b[3] <= box_a[1])
+
+
+def merge_regions(regions):
+    """Une regiões sobrepostas até não haver mais sobreposição"""
+    merged = list(regions)
+    changed = True
+    while changed:
+        changed = False
+        result = []
+        while merged:
+            current = merged.pop()
+            i = 0
+            while i < len(merged):
+                if boxes_overlap(current, merged[i]):
+                    other = merged.pop(i)
+                    current = (min(current[0], other[0]), min(current[1], other[1]),
+                               max(current[2], other[2]), max(current[3], other[3]))
+                    changed = True
+                else:
+                    i += 1
+            result.append(current)
+        merged = result
+    return sorted(merged)
@@ -0,0 +1,291 @@
+# batch.py - DETECÇÃO EM LOTE COM UM PROCESSO POR NÚCLEO
+'''
+🏭 Lote (sem interface)
+    Reprocessa uma pasta inteira (ou um manifesto .jsonl) usando todos os núcleos
+    Um detector por processo trabalhador; OpenCV com 1 thread por processo
+    Resultados vão para o histórico, para um .jsonl (JSON compacto versionado)
+    e, opcionalmente, PDFs
+
+📦 Passagem entre Processos (shared_frames.py)
+    Ida: só descritores pequenos (caminhos das fotos, dados da O.S., nome do bloco)
+    Cada trabalhador decodifica a própria foto: quadros nunca atravessam o pickle
+    Volta: resultado em bytes (result_schema.py) + descritor da imagem anotada,
+    que foi escrita direto em um bloco de memória compartilhada do processo principal
+    Blocos fixos (trabalhadores + 2), devolvidos assim que o PDF/JPEG é gravado
+    e removidos ao final, mesmo com erro ou Ctrl+C
+
+🗃️ Artefatos (artifact_store.py)
+    Fotos e prévia anotada guardadas por hash no processo principal
+    A prévia sai do mesmo bloco compartilhado: nada é desenhado duas vezes
+
+🔗 Identificação da O.S.
+    Mesmas regras da pasta monitorada: sidecar .json ou padrão do nome
+    Manifesto: uma linha por O.S. {"os": {...}, "imagens": ["a.jpg", ...]}
+
+▶️ Uso
+    python batch.py fotos/ [--trabalhadores N] [--perfil rapido] [--pdf] [--anotadas saida/]
+'''
+import argparse
+import atexit
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+
+from annotation import render_annotated
+from artifact_store import ArtifactStore
+from config import load_config
+from history_store import HistoryStore, make_record
+from result_schema import pack_result, to_compact, unpack_result
+from shared_frames import SharedFramePool, detach_all, write_frame
+from watch_folder import read_os_data
+
+# Importação condicional: sem ReportLab o lote só não gera PDFs
+try:
+    from utils import generate_pdf_report
+except ImportError as e:
+    print(f"⚠️  Relatórios PDF indisponíveis: {e}")
+    generate_pdf_report = None
+
+
+# ==================== PROCESSOS TRABALHADORES ====================
+
+_detector = None
+
+
+def _init_worker():
+    """Um detector por processo; o índice de duplicatas não é gravado aqui"""
+    global _detector
+    cv2.setNumThreads(1)  # os núcleos já estão divididos entre os processos
+    from detector_roboflow_api import BetoneiraDetectorAPI
+    from phash_index import PerceptualHashIndex
+    _detector = BetoneiraDetectorAPI()
+    _detector.duplicate_index = PerceptualHashIndex(persist=False)
+    atexit.register(detach_all)
+
+
+def _detect(paths, os_data, profile, slot, side):
+    """Roda no trabalhador: retorna (resultado empacotado, descritor da anotada, erro)"""
+    # Reprocessar é o objetivo do lote: nunca devolve contagens do índice de duplicatas
+    options = dict(reuse_duplicates=False, profile=profile)
+    try:
+        if len(paths) > 1:
+            results = _detector.process_images(paths, os_data, **options)
+        else:
+            results = _detector.process_image(paths[0], os_data, **options)
+    except Exception as e:
+        return None, None, str(e)
+
+    ref = None
+    if slot is not None and not results.get('rejected'):
+        try:
+            annotated = render_annotated(results, (side, side))
+            if annotated is not None:
+                ref = write_frame(slot, annotated)
+        except Exception as e:
+            print(f"⚠️  Imagem anotada indisponível ({os.path.basename(paths[0])}): {e}")
+    return pack_result(results), ref, None
+
+
+# ==================== ENTRADA ====================
+
+def jobs_from_folder(folder, settings):
+    """(os_data, fotos) por O.S. a partir das fotos de uma pasta"""
+    pattern = re.compile(settings["padrao_nome"], re.IGNORECASE)
+    extensions = tuple(ext.lower() for ext in settings["extensoes"])
+    groups, orphans = {}, []
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        if not (os.path.isfile(path) and name.lower().endswith(extensions)):
+            continue
+        os_data = read_os_data(path, pattern, settings["funcionario"])
+        if os_data is None:
+            orphans.append(path)
+            continue
+        groups.setdefault(os_data['numero_os'], (os_data, []))[1].append(path)
+    return list(groups.values()), orphans
+
+
+def jobs_from_manifest(path):
+    """(os_data, fotos) de um manifesto .jsonl"""
+    jobs = []
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                os_data = dict(item["os"])
+                paths = [os.path.join(base, p) for p in item["imagens"]]
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"⚠️  Linha {line_number} do manifesto ignorada: {e}")
+                continue
+            os_data['quantidade_esperada'] = int(os_data.get('quantidade_esperada') or 0)
+            jobs.append((os_data, paths))
+    return jobs
+
+
+# ==================== PROCESSO PRINCIPAL ====================
+
+class BatchRunner:
+    """Distribui O.S. entre processos e consome os resultados no processo principal"""
+
+    def __init__(self, workers=None, profile=None, history_store=None, output=None,
+                 pdf=None, annotated_folder=None, artifact_store=None):
+        settings = load_config()["lote"]
+        self.settings = settings
+        self.workers = workers or settings["trabalhadores"] or os.cpu_count() or 1
+        self.profile = profile or settings["perfil"]
+        self.pdf = settings["gerar_pdf"] if pdf is None else pdf
+        self.annotated_folder = annotated_folder
+        self.side = settings["lado_anotada"]
+        self.history_store = history_store or HistoryStore()
+        if artifact_store is None and load_config()["artefatos"]["ativo"]:
+            artifact_store = ArtifactStore()
+        self.artifact_store = artifact_store
+        self.output_path = output or settings["saida"]
+        self.stats = {'processadas': 0, 'erros': 0}
+
+    @property
+    def wants_image(self):
+        return bool(self.annotated_folder or self.artifact_store or (self.pdf and generate_pdf_report))
+
+    def run(self, jobs):
+        """Processa todas as O.S.; retorna as estatísticas"""
+        jobs = list(jobs)
+        if not jobs:
+            return self.stats
+        if self.annotated_folder:
+            os.makedirs(self.annotated_folder, exist_ok=True)
+        folder = os.path.dirname(self.output_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        workers = min(self.workers, len(jobs))
+        # Um bloco por trabalho em andamento: os trabalhadores + 2 na fila
+        slots = workers + 2
+        slot_bytes = self.side * self.side * 3 if self.wants_image else 1
+        print(f"🏭 {len(jobs)} O.S. em {workers} processo(s)"
+              f"{f', {slots} blocos de {slot_bytes / 2**20:.1f} MB' if self.wants_image else ''}")
+
+        start = time.perf_counter()
+        with SharedFramePool(slots, slot_bytes) as frames, \
+                open(self.output_path, "a", encoding="utf-8") as output, \
+                ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            pending = {}
+            try:
+                for os_data, paths in jobs:
+                    if len(pending) >= slots:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self.collect(future, pending.pop(future), frames, output)
+                    slot = frames.acquire()
+                    future = pool.submit(_detect, paths, os_data, self.profile,
+                                         slot if self.wants_image else None, self.side)
+                    pending[future] = (os_data, paths, slot)
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.collect(future, pending.pop(future), frames, output)
+            except KeyboardInterrupt:
+                print("🛑 Interrompido: cancelando O.S. ainda não iniciadas...")
+                for future in pending:
+                    future.cancel()
+                raise
+            finally:
+                self.history_store.flush()
+
+        elapsed = time.perf_counter() - start
+        print(f"📊 Processadas: {self.stats['processadas']} | Erros: {self.stats['erros']} | "
+              f"{elapsed:.1f}s ({len(jobs) / max(elapsed, 1e-6):.2f} O.S./s)")
+        return self.stats
+
+    def collect(self, future, job, frames, output):
+        """Consome um trabalho terminado e devolve o seu bloco"""
+        os_data, paths, slot = job
+        try:
+            packed, ref, error = future.result()
+            results = unpack_result(packed) if packed else None
+            if error:
+                print(f"❌ O.S. {os_data['numero_os']}: {error}")
+                self.stats['erros'] += 1
+                return
+            if results.get('rejected'):
+                motivos = (results.get('quality') or {}).get('motivos', [])
+                print(f"⛔ O.S. {os_data['numero_os']}: imagem rejeitada no controle de qualidade "
+                      f"({'; '.join(motivos) or 'sem motivo informado'})")
+                output.write(json.dumps({'os': os_data, 'imagens': paths, 'rejeitada': motivos},
+                                        ensure_ascii=False) + "\n")
+                self.stats['erros'] += 1
+                return
+
+            annotated = frames.view(ref) if ref is not None else None  # sem cópia: lê direto do bloco
+            try:
+                if self.artifact_store:
+                    try:
+                        self.artifact_store.archive(results, paths, annotated=annotated)
+                    except Exception as e:
+                        print(f"⚠️  Artefatos da O.S. {os_data['numero_os']} não guardados: {e}")
+
+                record = make_record(os_data, results, paths)
+                self.history_store.add(record)
+                output.write(json.dumps({'os': os_data, 'imagens': paths, 'resultado': to_compact(results)},
+                                        ensure_ascii=False) + "\n")
+                self.stats['processadas'] += 1
+                print(f"✅ O.S. {os_data['numero_os']}: {record['detectado']}/{record['esperado']} "
+                      f"betoneiras ({record['status']})")
+
+                if annotated is not None:
+                    if self.annotated_folder:
+                        name = f"{os.path.splitext(os.path.basename(paths[0]))[0]}_anotada.jpg"
+                        cv2.imwrite(os.path.join(self.annotated_folder, name), annotated)
+                    if self.pdf and generate_pdf_report:
+                        pdf_path = generate_pdf_report(results, os_data, annotated=annotated)
+                        if pdf_path:
+                            print(f"📄 Relatório: {pdf_path}")
+            finally:
+                del annotated
+        except Exception as e:
+            print(f"❌ O.S. {os_data['numero_os']}: {e}")
+            self.stats['erros'] += 1
+        finally:
+            frames.release(slot)
+
+
+def main():
+    settings = load_config()["lote"]
+    parser = argparse.ArgumentParser(description="Detecção em lote usando todos os núcleos")
+    parser.add_argument("entrada", help="pasta com as fotos ou manifesto .jsonl")
+    parser.add_argument("--trabalhadores", type=int, default=None, help="processos (padrão: um por núcleo)")
+    parser.add_argument("--perfil", default=None)
+    parser.add_argument("--saida", default=settings["saida"], help="resultados em .jsonl (acrescenta)")
+    parser.add_argument("--pdf", action="store_true", default=None, help="gera um relatório PDF por O.S.")
+    parser.add_argument("--anotadas", default=None, help="pasta para as imagens anotadas (JPEG)")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.entrada):
+        jobs, orphans = jobs_from_folder(args.entrada, load_config()["pasta_monitorada"])
+        for path in orphans:
+            print(f"❓ Sem O.S. identificável: {os.path.basename(path)}")
+    elif os.path.isfile(args.entrada):
+        jobs = jobs_from_manifest(args.entrada)
+    else:
+        print(f"❌ Entrada não encontrada: {args.entrada}")
+        return
+
+    runner = BatchRunner(args.trabalhadores, args.perfil, output=args.saida,
+                         pdf=args.pdf, annotated_folder=args.anotadas)
+    try:
+        runner.run(jobs)
+    finally:
+        runner.history_store.close()
+        if runner.artifact_store:
+            runner.artifact_store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# cancellation.py - CANCELAMENTO COOPERATIVO DA DETECÇÃO
+'''
+⛔ Token de Cancelamento
+    Criado por quem pede a detecção (fila da interface, daemon, lote)
+    Verificado entre estratégias de API, estratégias locais e etapas do realce
+
+🌐 Chamadas HTTP em Andamento
+    run() executa a chamada bloqueante em uma thread auxiliar e espera
+    pelo resultado OU pelo cancelamento, o que vier primeiro
+    Cancelada, a chamada é abandonada (termina sozinha pelo timeout)
+    e o trabalhador fica livre na hora
+
+⏸️ Pausas Interrompíveis
+    wait() substitui time.sleep() entre tentativas
+'''
+import threading
+
+
+class DetectionCancelled(Exception):
+    """Detecção interrompida pelo token de cancelamento"""
+
+
+class CancellationToken:
+    """Sinal de cancelamento compartilhado entre quem pede e quem executa"""
+
+    def __init__(self, cancellable=True):
+        self.event = threading.Event()
+        self.cancellable = cancellable
+
+    def cancel(self):
+        if self.cancellable:
+            self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def raise_if_cancelled(self):
+        if self.event.is_set():
+            raise DetectionCancelled("Detecção cancelada")
+
+    def wait(self, seconds):
+        """Pausa que termina antes se o token for cancelado"""
+        if seconds:
+            self.event.wait(seconds)
+        self.raise_if_cancelled()
+
+    def run(self, func, *args, **kwargs):
+        """Executa uma chamada bloqueante (HTTP) que pode ser abandonada"""
+        self.raise_if_cancelled()
+        if not self.cancellable:
+            return func(*args, **kwargs)
+        outcome = {}
+        done = threading.Event()
+
+        def target():
+            try:
+                outcome['result'] = func(*args, **kwargs)
+            except BaseException as e:
+                outcome['error'] = e
+            finally:
+                done.set()
+
+        threading.Thread(target=target, name="CancellableCall", daemon=True).start()
+        while not done.wait(0.05):
+            self.raise_if_cancelled()
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome.get('result')
+
+
+# Token que nunca é cancelado (chamadas sem fila, ex.: scripts)
+NEVER_CANCELLED = CancellationToken(cancellable=False)
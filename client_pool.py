@@ -0,0 +1,49 @@
+# client_pool.py - POOL DE CLIENTES HTTP DA API
+'''
+🔌 Um Cliente por Chamada em Andamento
+    InferenceHTTPClient e requests.Session não são compartilhados entre threads
+    Cada chamada pega um cliente livre e devolve ao terminar
+    Clientes são criados sob demanda, até o limite do pool
+
+♻️ Reuso de Conexões
+    Sessões devolvidas mantêm as conexões keep-alive abertas
+'''
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class ClientPool:
+    """Pool limitado de clientes criados por uma fábrica"""
+
+    def __init__(self, factory, size):
+        self.factory = factory
+        self.size = max(1, size)
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        """Empresta um cliente (espera se todos estiverem em uso)"""
+        client = self._take()
+        try:
+            yield client
+        finally:
+            self.idle.put(client)
+
+    def _take(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                try:
+                    return self.factory()
+                except Exception:
+                    # Falha na criação (rede, SDK) não pode consumir a vaga para sempre
+                    self.created -= 1
+                    raise
+        return self.idle.get()
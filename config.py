@@ -0,0 +1,173 @@
+# config.py - CONFIGURAÇÃO DO SISTEMA
+'''
+⚙️ Configuração Centralizada
+    Valores padrão ficam aqui, no código
+    config.json (opcional) sobrescreve apenas as chaves informadas
+    Veja config.example.json para o formato completo
+'''
+import copy
+import json
+import os
+
+CONFIG_PATH = "config.json"
+
+DEFAULT_CONFIG = {
+    # Regiões de interesse por câmera ou local: lista de polígonos com
+    # coordenadas normalizadas (0 a 1) em relação à largura/altura da foto
+    "roi": {},
+
+    # Portão de qualidade antes da API (ver image_quality.py)
+    "qualidade": {
+        "lado_analise": 512,
+        "lado_minimo": 320,
+        "nitidez_rejeitar": 8.0,
+        "nitidez_alerta": 40.0,
+        "pixel_escuro": 25,
+        "pixel_estourado": 245,
+        "fracao_escura_rejeitar": 0.9,
+        "fracao_estourada_rejeitar": 0.8,
+        "brilho_minimo_alerta": 50,
+        "brilho_maximo_alerta": 210,
+    },
+
+    # Perfil de detecção padrão e perfis personalizados (ver profiles.py)
+    "perfil_padrao": "maxima_deteccao",
+    "perfis": {},
+
+    # Super processamento (ver enhancement.py). Presets personalizados:
+    # {"nome": {"etapas": ["iluminacao", ...], "params": {...}}}
+    "realce": {
+        "preset": "completo",
+        "presets": {},
+    },
+
+    # Histórico persistente (ver history_store.py)
+    "historico": {
+        "arquivo": "data/historico.db",
+        "lote_escrita": 50,
+        "intervalo_escrita": 0.5,
+    },
+
+    # Índice de imagens quase duplicadas (ver phash_index.py)
+    # intervalo_gravacao: segundos entre gravações do arquivo (em segundo plano)
+    "duplicatas": {
+        "arquivo": "cache/phash_index.json",
+        "distancia_maxima": 6,
+        "max_entradas": 5000,
+        "intervalo_gravacao": 5.0,
+    },
+
+    # Imagem dos relatórios PDF: resolução de impressão (6x4.5 pol.)
+    # orcamento_bytes: tamanho máximo de cada relatório (0 = sem limite)
+    "relatorio": {
+        "dpi": 150,
+        "qualidade": 85,
+        "qualidade_minima": 40,
+        "orcamento_bytes": 400_000,
+    },
+
+    # Miniaturas da interface (ver thumbnails.py)
+    "miniaturas": {
+        "largura": 300,
+        "altura": 220,
+        "max_itens": 200,
+        "trabalhadores": 2,
+    },
+
+    # Manutenção de reports/ (ver report_maintenance.py)
+    "retencao_relatorios": {
+        "pasta": "reports",
+        "dias": 365,
+        "max_total_mb": 1024,
+        "recomprimir_apos_dias": 7,
+    },
+
+    # Clientes da API em uso simultâneo (ver client_pool.py)
+    "api": {
+        "clientes": 4,
+    },
+
+    # Várias fotos por O.S. (ver multi_image.py)
+    "multi_imagem": {
+        "max_trabalhadores": 3,
+        "lado_correspondencia": 1024,
+        "min_inliers": 25,
+        "iou_duplicata": 0.3,
+        "altura_mosaico": 720,
+    },
+
+    # Fila de detecções da interface (ver job_queue.py)
+    # None = um trabalhador por núcleo
+    "fila": {
+        "max_trabalhadores": None,
+    },
+
+    # Ingestão automática de pasta (ver watch_folder.py)
+    # padrao_nome: grupos nomeados viram campos da O.S. (numero_os obrigatório)
+    "pasta_monitorada": {
+        "pasta": "entrada",
+        "padrao_nome": r"OS[-_ ]?(?P<numero_os>\d+)(?:[-_ ]Q(?P<quantidade_esperada>\d+))?",
+        "extensoes": [".jpg", ".jpeg", ".png"],
+        "estabilizacao": 3.0,
+        "intervalo_varredura": 5.0,
+        "max_fila": 20,
+        "trabalhadores": 2,
+        "perfil": None,
+        "funcionario": "Ingestão automática",
+        "gerar_pdf": True,
+        "pasta_processados": "processados",
+        "pasta_erros": "erros",
+    },
+
+    # Detecção em lote com processos (ver batch.py)
+    # trabalhadores None = um processo por núcleo; lado_anotada = maior lado
+    # da imagem anotada devolvida pela memória compartilhada
+    "lote": {
+        "trabalhadores": None,
+        "perfil": None,
+        "lado_anotada": 1600,
+        "gerar_pdf": False,
+        "saida": "data/lote_resultados.jsonl",
+    },
+
+    # Fotos e prévias anotadas guardadas por hash (ver artifact_store.py)
+    # dias/max_total_mb: retenção pelo último uso; prévias saem antes das originais
+    "artefatos": {
+        "ativo": True,
+        "pasta": "data/artefatos",
+        "lado_previa": 1600,
+        "qualidade_previa": 80,
+        "dias": 730,
+        "max_total_mb": 20480,
+    },
+}
+
+_cache = {}
+
+
+def merge_config(base, override):
+    """Mescla dicionários recursivamente (override vence)"""
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_config(path=CONFIG_PATH, reload=False):
+    """Carrega a configuração (padrões + config.json), com cache por arquivo"""
+    if path in _cache and not reload:
+        return _cache[path]
+
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                config = merge_config(config, json.load(f))
+        except Exception as e:
+            print(f"⚠️  Erro ao ler {path}, usando padrões: {e}")
+
+    _cache[path] = config
+    return config
@@ -0,0 +1,96 @@
+# dashboard_metrics.py - MÉTRICAS OBSERVÁVEIS DO DASHBOARD
+'''
+📈 Modelo de Métricas
+    Lê os contadores globais dos agregados do histórico (O(1))
+    Emite "changed" com os valores calculados
+
+⏳ Atualizações Agrupadas
+    Vários resultados em sequência (lote) geram uma única atualização
+    notify() apenas agenda; o cálculo e o sinal saem no fim do intervalo
+
+🃏 Cartões Persistentes
+    Criados uma vez; cada atualização troca só o texto do valor
+    Sem deleteLater, sem novo stylesheet, sem relayout completo
+'''
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+from PyQt5.QtWidgets import QFrame, QLabel, QVBoxLayout
+
+# (chave, título, cor) dos cartões, na ordem em que aparecem
+METRIC_CARDS = [
+    ('total_processamentos', "📈 Total Processado", "#3498db"),
+    ('deteccoes_bem_sucedidas', "✅ Detecções Bem-sucedidas", "#27ae60"),
+    ('inconsistencias', "⚠️ Inconsistências", "#e74c3c"),
+    ('tempo_medio', "⏱️ Tempo Médio", "#f39c12"),
+]
+
+
+def format_metric(key, value):
+    if key == 'tempo_medio':
+        return f"{value:.1f}s"
+    return str(value)
+
+
+class DashboardMetrics(QObject):
+    """Métricas do dashboard com notificação agrupada"""
+
+    changed = pyqtSignal(dict)
+
+    def __init__(self, store, interval_ms=200, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.values = self.compute()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.refresh)
+
+    def compute(self):
+        values = self.store.totals()
+        values['tempo_medio'] = values['tempo_total_processamento'] / max(1, values['total_processamentos'])
+        return values
+
+    def notify(self):
+        """Agenda uma atualização (chamadas repetidas no intervalo viram uma só)"""
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def refresh(self):
+        """Recalcula agora e avisa os observadores"""
+        self.timer.stop()
+        self.values = self.compute()
+        self.changed.emit(self.values)
+
+
+class MetricCard(QFrame):
+    """Cartão de métrica com título fixo e valor atualizável"""
+
+    def __init__(self, key, title, color, parent=None):
+        super().__init__(parent)
+        self.key = key
+        self.setObjectName("metric_card")
+        self.setStyleSheet(f"""
+            QFrame#metric_card {{
+                background-color: {color};
+                border-radius: 8px;
+                padding: 12px;
+                min-width: 120px;
+            }}
+        """)
+        layout = QVBoxLayout(self)
+
+        title_label = QLabel(title)
+        title_label.setStyleSheet("color: white; font-size: 12px; font-weight: bold;")
+        title_label.setAlignment(Qt.AlignCenter)
+        title_label.setWordWrap(True)
+
+        self.value_label = QLabel(format_metric(key, 0))
+        self.value_label.setStyleSheet("color: white; font-size: 18px; font-weight: bold;")
+        self.value_label.setAlignment(Qt.AlignCenter)
+
+        layout.addWidget(title_label)
+        layout.addWidget(self.value_label)
+
+    def update_value(self, values):
+        text = format_metric(self.key, values.get(self.key, 0))
+        if text != self.value_label.text():
+            self.value_label.setText(text)
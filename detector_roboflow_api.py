@@ -15,16 +15,52 @@
     7 cores diferentes de betoneiras
     Operações morfológicas agressivas
     Combinação inteligente de máscaras
+    Grafo de etapas sob demanda com presets (enhancement.py)
 
 📊 Análise de Forma Avançada
     Circularidade: 0.1-0.8 (formas retangulares)
     Proporção: 0.4-2.2 (formato de betoneira)
     Solidez: >0.6 (objetos sólidos)
 
-🎪 Feedback Visual Melhorado
+🧭 Câmeras Fixas (camera_id na O.S.)
+    Modelo de fundo por câmera gera máscaras de mudança
+    Só regiões alteradas vão para a API e para a detecção local
+    Detecções das áreas sem mudança vêm do cache
+
+🚦 Portão de Qualidade
+    Nitidez, exposição e resolução em milissegundos
+    Imagens sem chance de detecção não chegam à API
+
+🧬 Quase Duplicadas (dHash + Hamming)
+    Mesma cena reenviada ou recomprimida reaproveita o resultado anterior
+
+✂️ Regiões de Interesse (config.json → "roi")
+    Recorte no retângulo dos polígonos do local/câmera
+    Pixels fora do pátio zerados antes de qualquer etapa cara
+
+🏎️ Perfis de Desempenho (profiles.py)
+    rapido / balanceado / maxima_deteccao
+    Estratégias, resolução de trabalho, limiares e realce por perfil
+
+📸 Várias Fotos por O.S. (multi_image.py)
+    process_images() detecta as fotos em paralelo
+    Betoneiras repetidas entre fotos sobrepostas contam uma vez (ORB + homografia)
+
+🧵 Uso Concorrente (várias threads na mesma instância)
+    Imagens enviadas à API codificadas em memória, sem arquivos temporários
+    Pool de clientes SDK / sessões HTTP: um por chamada em andamento
+    Índice de duplicatas, modelos de fundo e ROI protegidos por locks
+
+⛔ Cancelamento e Progresso (cancellation.py)
+    process_image(..., cancel_token=token, progress=callback)
+    Token verificado entre estratégias e etapas; chamadas HTTP abandonadas na hora
+    Callback recebe (mensagem, percentual) a cada etapa
+
+🎪 Feedback Visual Melhorado (annotation.py)
     VERDE: Detecções da API
     AZUL: Detecções locais
     Labels detalhados com método de detecção
+    Desenhado sob demanda, na resolução de quem pede
 '''
 import cv2
 import numpy as np
@@ -33,6 +69,18 @@ import os
 import requests
 import base64
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+from background_model import BackgroundModelRegistry
+from config import load_config
+from roi import get_roi
+from image_quality import assess_image_quality, describe_quality
+from enhancement import enhance
+from phash_index import PerceptualHashIndex, dhash, rescale_detections
+from profiles import get_profile
+from cancellation import DetectionCancelled, NEVER_CANCELLED
+from multi_image import merge_image_results
+from client_pool import ClientPool
 
 class BetoneiraDetectorAPI:
     def __init__(self):
@@ -42,140 +90,129 @@ class BetoneiraDetectorAPI:
         
         # Configuração otimizada do cliente
         try:
-            self.CLIENT = InferenceHTTPClient(
-                api_url="https://detect.roboflow.com",
-                api_key=self.API_KEY
-            )
+            self.CLIENT = self.create_sdk_client()
             print("🚀 Detector Super Otimizado Configurado!")
         except Exception as e:
             print(f"⚠️  Cliente SDK falhou, usando HTTP direto: {e}")
             self.CLIENT = None
+        
+        # Clientes por chamada: process_image pode rodar em várias threads
+        pool_size = load_config()["api"]["clientes"]
+        self.sdk_clients = ClientPool(self.create_sdk_client, pool_size)
+        self.http_sessions = ClientPool(requests.Session, pool_size)
+        
+        # Modelos de fundo por câmera fixa (baias de devolução)
+        self.background_models = BackgroundModelRegistry()
+        
+        # Índice perceptual de imagens já processadas
+        self.duplicate_index = PerceptualHashIndex()
 
-    def super_enhance_image(self, image):
-        """Pré-processamento SUPER avançado para máxima detecção"""
+    def create_sdk_client(self):
+        return InferenceHTTPClient(
+            api_url="https://detect.roboflow.com",
+            api_key=self.API_KEY
+        )
+
+    def super_enhance_image(self, image, preset="completo", token=NEVER_CANCELLED):
+        """Pré-processamento SUPER avançado para máxima detecção
+
+        Executa o grafo de etapas de `enhancement.py`: só o que a imagem final
+        usa é calculado, e cada etapa reporta o seu custo.
+        """
         try:
-            original = image.copy()
             h, w = image.shape[:2]
-            print(f"🔧 Super processamento: {w}x{h}")
-            
-            # 1. CORREÇÃO DE ILUMINAÇÃO EXTREMA
-            # Multi-método de correção
-            lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-            l, a, b = cv2.split(lab)
-            
-            # CLAHE agressivo
-            clahe = cv2.createCLAHE(clipLimit=4.0, tileGridSize=(16, 16))
-            l_enhanced = clahe.apply(l)
-            
-            # Equalização de histograma adicional
-            l_enhanced = cv2.equalizeHist(l_enhanced)
-            
-            lab_enhanced = cv2.merge([l_enhanced, a, b])
-            image = cv2.cvtColor(lab_enhanced, cv2.COLOR_LAB2BGR)
-            
-            # 2. REDUÇÃO DE RUÍDO AVANÇADA
-            # Filtro bilateral para preservar bordas
-            image = cv2.bilateralFilter(image, 15, 80, 80)
-            # Filtro de mediana para ruído
-            image = cv2.medianBlur(image, 5)
-            
-            # 3. REALCE DE BORDAS SUPER EFETIVO
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Múltiplos métodos de detecção de bordas
-            edges_canny = cv2.Canny(gray, 20, 80)
-            edges_laplacian = cv2.Laplacian(gray, cv2.CV_64F)
-            edges_laplacian = np.uint8(np.absolute(edges_laplacian))
-            
-            # Combinar bordas
-            edges_combined = cv2.bitwise_or(edges_canny, edges_laplacian)
-            
-            # 4. SEGMENTAÇÃO POR COR HIPER-ESPECÍFICA
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            print(f"🔧 Super processamento ({preset if isinstance(preset, str) else 'personalizado'}): {w}x{h}")
             
-            # Cores MUITO específicas de betoneiras
-            color_masks = []
-            
-            # Laranja vibrante (betoneiras novas)
-            mask_orange1 = cv2.inRange(hsv, np.array([10, 100, 100]), np.array([20, 255, 255]))
-            mask_orange2 = cv2.inRange(hsv, np.array([20, 80, 80]), np.array([25, 255, 255]))
-            
-            # Vermelho (betoneiras vermelhas)
-            mask_red1 = cv2.inRange(hsv, np.array([0, 120, 70]), np.array([8, 255, 255]))
-            mask_red2 = cv2.inRange(hsv, np.array([172, 120, 70]), np.array([180, 255, 255]))
-            
-            # Azul (betoneiras azuis)
-            mask_blue = cv2.inRange(hsv, np.array([100, 80, 50]), np.array([130, 255, 255]))
-            
-            # Amarelo (betoneiras amarelas)
-            mask_yellow = cv2.inRange(hsv, np.array([25, 80, 80]), np.array([35, 255, 255]))
-            
-            # Tons metálicos
-            mask_metal = cv2.inRange(hsv, np.array([0, 0, 40]), np.array([180, 50, 200]))
-            
-            # Combinar todas as máscaras
-            combined_mask = mask_orange1 + mask_orange2 + mask_red1 + mask_red2 + mask_blue + mask_yellow + mask_metal
-            
-            # Operações morfológicas agressivas
-            kernel_large = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (15, 15))
-            kernel_medium = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (7, 7))
-            
-            combined_mask = cv2.morphologyEx(combined_mask, cv2.MORPH_CLOSE, kernel_large)
-            combined_mask = cv2.morphologyEx(combined_mask, cv2.MORPH_OPEN, kernel_medium)
-            combined_mask = cv2.dilate(combined_mask, kernel_medium, iterations=2)
-            
-            # Aplicar máscara de forma intensa
-            if np.sum(combined_mask) > 1000:
-                masked_image = cv2.bitwise_and(image, image, mask=combined_mask)
-                # Combinação agressiva
-                image = cv2.addWeighted(masked_image, 0.8, image, 0.2, 0)
-                print("   🎨 Segmentação hiper-efetiva aplicada")
-            
-            # 5. CONTRASTE FINAL
-            image = cv2.convertScaleAbs(image, alpha=1.2, beta=10)
+            enhanced, _, report = enhance(image, preset, token=token)
             
+            custos = " | ".join(f"{item['etapa']} {item['ms']:.0f}ms" for item in report)
+            print(f"   ⏱️  {custos}")
             print("✅ Super processamento concluído!")
-            return image
+            return enhanced
             
+        except DetectionCancelled:
+            raise
         except Exception as e:
             print(f"❌ Erro no super processamento: {e}")
-            return original
+            return image
+
+    def hyper_local_detection(self, image, regions=None, strategies=("color", "shape", "size"),
+                              area_scale=1.0, token=NEVER_CANCELLED):
+        """Detecção local HIPER-EFETIVA com múltiplas técnicas
 
-    def hyper_local_detection(self, image):
-        """Detecção local HIPER-EFETIVA com múltiplas técnicas"""
+        Com `regions` (x1, y1, x2, y2), só as regiões alteradas são analisadas
+        e as caixas voltam nas coordenadas da imagem completa.
+        """
         try:
             print("🔍 Iniciando detecção local hiper-efetiva...")
-            original = image.copy()
             h, w = image.shape[:2]
             
-            all_detections = []
+            if regions is None:
+                regions = [(0, 0, w, h)]
+            else:
+                print(f"   🧭 Analisando {len(regions)} região(ões) alterada(s)")
             
-            # ESTRATÉGIA 1: DETECÇÃO POR COR E FORMA
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            all_detections = []
+            for (x1, y1, x2, y2) in regions:
+                all_detections.extend(
+                    self.local_detection_pass(image[y1:y2, x1:x2], (h, w), (x1, y1),
+                                              strategies, area_scale, token)
+                )
             
-            # Máscaras de cor expandidas
-            masks = []
+            # REMOVER DUPLICATAS
+            unique_detections = self.remove_duplicate_detections(all_detections)
             
-            # Laranja (principal)
-            masks.append(cv2.inRange(hsv, np.array([8, 80, 80]), np.array([22, 255, 255])))
-            # Vermelho
-            masks.append(cv2.inRange(hsv, np.array([0, 100, 80]), np.array([10, 255, 255])))
-            masks.append(cv2.inRange(hsv, np.array([170, 100, 80]), np.array([180, 255, 255])))
-            # Azul
-            masks.append(cv2.inRange(hsv, np.array([95, 70, 60]), np.array([135, 255, 255])))
-            # Amarelo
-            masks.append(cv2.inRange(hsv, np.array([22, 70, 80]), np.array([38, 255, 255])))
+            print(f"   🎯 Detecção local hiper-efetiva: {len(unique_detections)} objetos")
+            return unique_detections
             
-            for mask in masks:
-                if np.sum(mask) > 1000:  # Se há pixels relevantes
+        except DetectionCancelled:
+            raise
+        except Exception as e:
+            print(f"❌ Erro na detecção local hiper-efetiva: {e}")
+            return []
+
+    def local_detection_pass(self, image, frame_shape, offset,
+                             strategies=("color", "shape", "size"), area_scale=1.0,
+                             token=NEVER_CANCELLED):
+        """Executa as estratégias locais do perfil em um recorte da imagem
+
+        `area_scale` ajusta as áreas mínimas quando a imagem foi reduzida
+        para a resolução de trabalho do perfil.
+        """
+        # Limites de área e de borda são sempre relativos à imagem completa
+        h, w = frame_shape
+        off_x, off_y = offset
+        min_color, min_shape, min_size = 5000 * area_scale, 3000 * area_scale, 8000 * area_scale
+        
+        all_detections = []
+        
+        if "color" in strategies:
+            token.raise_if_cancelled()
+            # ESTRATÉGIA 1: DETECÇÃO POR COR E FORMA
+            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        
+            # Faixas de cor expandidas
+            ranges = [
+                ([8, 80, 80], [22, 255, 255]),     # Laranja (principal)
+                ([0, 100, 80], [10, 255, 255]),    # Vermelho
+                ([170, 100, 80], [180, 255, 255]), # Vermelho
+                ([95, 70, 60], [135, 255, 255]),   # Azul
+                ([22, 70, 80], [38, 255, 255]),    # Amarelo
+            ]
+        
+            # Uma máscara por vez no mesmo buffer (não 5 quadros simultâneos)
+            mask = np.empty(hsv.shape[:2], dtype=np.uint8)
+            for lower, upper in ranges:
+                cv2.inRange(hsv, np.array(lower), np.array(upper), dst=mask)
+                if cv2.countNonZero(mask) * 255 > 1000:  # Se há pixels relevantes
                     contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                    
+                
                     for contour in contours:
                         area = cv2.contourArea(contour)
-                        if 5000 < area < (h * w * 0.2):  # Filtro de área
+                        if min_color < area < (h * w * 0.2):  # Filtro de área
                             x, y, w_rect, h_rect = cv2.boundingRect(contour)
                             aspect_ratio = w_rect / h_rect
-                            
+                        
                             # Betoneiras têm formato característico
                             if 0.4 <= aspect_ratio <= 2.2:
                                 # Análise de solidez
@@ -184,70 +221,69 @@ class BetoneiraDetectorAPI:
                                 if hull_area > 0:
                                     solidity = area / hull_area
                                     if solidity > 0.6:  # Formas sólidas
-                                        all_detections.append((x, y, w_rect, h_rect, area, "color"))
-            
-            # ESTRATÉGIA 2: DETECÇÃO POR TEXTURA E FORMA
+                                        all_detections.append((x + off_x, y + off_y, w_rect, h_rect, area, "color"))
+            del hsv, mask
+        
+        if "shape" in strategies or "size" in strategies:
             gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
+        
+        if "shape" in strategies:
+            token.raise_if_cancelled()
+            # ESTRATÉGIA 2: DETECÇÃO POR TEXTURA E FORMA
             # Suavizar e detectar bordas
             blurred = cv2.GaussianBlur(gray, (7, 7), 2)
             edges = cv2.Canny(blurred, 15, 45)
-            
-            # Operações morfológicas para conectar bordas
+            del blurred
+        
+            # Operações morfológicas para conectar bordas (no próprio buffer)
             kernel = np.ones((5, 5), np.uint8)
-            edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
-            edges = cv2.dilate(edges, kernel, iterations=2)
-            
+            cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel, dst=edges)
+            cv2.dilate(edges, kernel, dst=edges, iterations=2)
+        
             contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
+        
             for contour in contours:
                 area = cv2.contourArea(contour)
-                if 3000 < area < (h * w * 0.15):
+                if min_shape < area < (h * w * 0.15):
                     # Aproximar contorno
                     epsilon = 0.02 * cv2.arcLength(contour, True)
                     approx = cv2.approxPolyDP(contour, epsilon, True)
-                    
+                
                     # Betoneiras geralmente têm 4-8 lados
                     if 4 <= len(approx) <= 10:
                         x, y, w_rect, h_rect = cv2.boundingRect(contour)
                         aspect_ratio = w_rect / h_rect
-                        
+                    
                         if 0.5 <= aspect_ratio <= 1.8:
                             # Verificar se é retangular
                             rect_area = w_rect * h_rect
                             extent = area / rect_area if rect_area > 0 else 0
-                            
+                        
                             if extent > 0.5:  # Pelo menos 50% do retângulo
-                                all_detections.append((x, y, w_rect, h_rect, area, "shape"))
-            
+                                all_detections.append((x + off_x, y + off_y, w_rect, h_rect, area, "shape"))
+        
+        if "size" in strategies:
+            token.raise_if_cancelled()
             # ESTRATÉGIA 3: DETECÇÃO POR TAMANHO E POSIÇÃO
             # Buscar objetos grandes que podem ser betoneiras
-            large_contours, _ = cv2.findContours(
-                cv2.threshold(gray, 50, 255, cv2.THRESH_BINARY)[1],
-                cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-            )
-            
+            # Limiarização no próprio quadro cinza (última estratégia a usá-lo)
+            cv2.threshold(gray, 50, 255, cv2.THRESH_BINARY, dst=gray)
+            large_contours, _ = cv2.findContours(gray, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
             for contour in large_contours:
                 area = cv2.contourArea(contour)
-                if 8000 < area < (h * w * 0.25):
+                if min_size < area < (h * w * 0.25):
                     x, y, w_rect, h_rect = cv2.boundingRect(contour)
-                    
+                    x, y = x + off_x, y + off_y
+                
                     # Verificar proporções típicas de betoneiras
                     if 0.6 <= (w_rect / h_rect) <= 1.5:
                         # Análise de localização (não muito perto das bordas)
                         if (x > w * 0.05 and y > h * 0.05 and 
                             x + w_rect < w * 0.95 and y + h_rect < h * 0.95):
                             all_detections.append((x, y, w_rect, h_rect, area, "size"))
-            
-            # REMOVER DUPLICATAS
-            unique_detections = self.remove_duplicate_detections(all_detections)
-            
-            print(f"   🎯 Detecção local hiper-efetiva: {len(unique_detections)} objetos")
-            return unique_detections
-            
-        except Exception as e:
-            print(f"❌ Erro na detecção local hiper-efetiva: {e}")
-            return []
+        
+        return all_detections
 
     def remove_duplicate_detections(self, detections):
         """Remove detecções duplicadas usando IoU"""
@@ -294,23 +330,36 @@ class BetoneiraDetectorAPI:
         
         return [detections[i] for i in keep]
 
-    def force_api_detection(self, image_path):
-        """Força detecção da API com múltiplas estratégias"""
-        strategies = [
-            self.api_strategy_original,
-            self.api_strategy_enhanced,
-            self.api_strategy_small,
-            self.api_strategy_high_quality
-        ]
+    def force_api_detection(self, source, profile=None, token=NEVER_CANCELLED, progress=None):
+        """Força detecção da API com as estratégias do perfil
+
+        `source` é o caminho da foto ou a imagem já carregada (recorte).
+        O token é verificado antes de cada tentativa e durante as chamadas
+        HTTP; `progress(mensagem, percentual)` é chamado a cada tentativa.
+        """
+        profile = get_profile(profile)
+        available = {
+            'original': self.api_strategy_original,
+            'enhanced': self.api_strategy_enhanced,
+            'small': self.api_strategy_small,
+            'high_quality': self.api_strategy_high_quality
+        }
+        strategies = [available[name] for name in profile['estrategias_api'] if name in available]
         
         for i, strategy in enumerate(strategies, 1):
+            token.raise_if_cancelled()
             try:
-                print(f"🔄 Tentativa API {i}/4...")
-                result = strategy(image_path)
+                print(f"🔄 Tentativa API {i}/{len(strategies)}...")
+                if progress:
+                    progress(f"🌐 Tentativa API {i}/{len(strategies)}", 20 + 50 * (i - 1) // len(strategies))
+                result = strategy(source, profile, token)
                 if result and result.get('predictions'):
                     print(f"✅ API funcionou na tentativa {i}!")
                     return result
-                time.sleep(1)
+                if i < len(strategies):
+                    token.wait(profile['pausa_entre_tentativas'])
+            except DetectionCancelled:
+                raise
             except Exception as e:
                 print(f"❌ Tentativa {i} falhou: {e}")
                 continue
@@ -318,32 +367,49 @@ class BetoneiraDetectorAPI:
         print("🚨 Todas as tentativas da API falharam")
         return None
 
-    def api_strategy_original(self, image_path):
-        """Estratégia 1: Imagem original"""
+    # ==================== ENVIO À API (SEM ESTADO COMPARTILHADO) ====================
+
+    def load_source(self, source):
+        """Imagem a partir de um caminho ou de uma imagem já carregada"""
+        return cv2.imread(source) if isinstance(source, str) else source
+
+    def source_bytes(self, source, quality=95):
+        """Bytes JPEG em memória (arquivo lido como está; imagem codificada)"""
+        if isinstance(source, bytes):
+            return source
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                return f.read()
+        ok, buffer = cv2.imencode(".jpg", source, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise Exception("Falha ao codificar imagem para a API")
+        return buffer.tobytes()
+
+    def sdk_infer(self, image_data):
+        """Inferência pelo SDK com um cliente exclusivo do pool"""
+        with self.sdk_clients.acquire() as client:
+            return client.infer(base64.b64encode(image_data).decode("ascii"), model_id=self.MODEL_ID)
+
+    def send_to_api(self, image_data, profile, token):
+        """Envia bytes JPEG pelo SDK (se disponível) ou por HTTP direto"""
         if self.CLIENT:
-            return self.CLIENT.infer(image_path, model_id=self.MODEL_ID)
-        return self.direct_api_call(image_path)
+            return token.run(self.sdk_infer, image_data)
+        return self.direct_api_call(image_data, confidence=profile['confianca_minima'], token=token)
+
+    def api_strategy_original(self, source, profile, token=NEVER_CANCELLED):
+        """Estratégia 1: Imagem original"""
+        return self.send_to_api(self.source_bytes(source, 95), profile, token)
 
-    def api_strategy_enhanced(self, image_path):
+    def api_strategy_enhanced(self, source, profile, token=NEVER_CANCELLED):
         """Estratégia 2: Imagem otimizada"""
         # Carregar e otimizar imagem
-        image = cv2.imread(image_path)
-        enhanced = self.super_enhance_image(image)
-        
-        temp_path = "temp_enhanced.jpg"
-        cv2.imwrite(temp_path, enhanced, [cv2.IMWRITE_JPEG_QUALITY, 100])
-        
-        if self.CLIENT:
-            result = self.CLIENT.infer(temp_path, model_id=self.MODEL_ID)
-        else:
-            result = self.direct_api_call(temp_path)
-        
-        os.remove(temp_path)
-        return result
+        image = self.load_source(source)
+        enhanced = self.super_enhance_image(image, profile['realce'] or load_config()["realce"]["preset"], token)
+        return self.send_to_api(self.source_bytes(enhanced, 100), profile, token)
 
-    def api_strategy_small(self, image_path):
+    def api_strategy_small(self, source, profile, token=NEVER_CANCELLED):
         """Estratégia 3: Imagem redimensionada"""
-        image = cv2.imread(image_path)
+        image = self.load_source(source)
         h, w = image.shape[:2]
         
         # Redimensionar para tamanho ideal da API
@@ -351,37 +417,40 @@ class BetoneiraDetectorAPI:
         scale = new_size / max(h, w)
         new_w, new_h = int(w * scale), int(h * scale)
         
-        resized = cv2.resize(image, (new_w, new_h))
-        temp_path = "temp_resized.jpg"
-        cv2.imwrite(temp_path, resized, [cv2.IMWRITE_JPEG_QUALITY, 95])
-        
-        if self.CLIENT:
-            result = self.CLIENT.infer(temp_path, model_id=self.MODEL_ID)
-        else:
-            result = self.direct_api_call(temp_path)
+        resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA)
+        result = self.send_to_api(self.source_bytes(resized, 95), profile, token)
         
-        os.remove(temp_path)
+        # Predições voltam na escala reduzida: levar para a imagem enviada
+        if result and result.get('predictions'):
+            for pred in result['predictions']:
+                for key in ('x', 'y', 'width', 'height'):
+                    pred[key] = pred[key] / scale
         return result
 
-    def api_strategy_high_quality(self, image_path):
+    def api_strategy_high_quality(self, source, profile, token=NEVER_CANCELLED):
         """Estratégia 4: Qualidade máxima"""
-        return self.direct_api_call(image_path, quality=100)
+        return self.direct_api_call(source, quality=100, confidence=profile['confianca_minima'], token=token)
 
-    def direct_api_call(self, image_path, quality=95):
+    def http_post(self, url, **kwargs):
+        """POST com uma sessão exclusiva do pool (conexões reaproveitadas)"""
+        with self.http_sessions.acquire() as session:
+            return session.post(url, **kwargs)
+
+    def direct_api_call(self, source, quality=95, confidence=0.1, token=NEVER_CANCELLED):
         """Chamada direta à API com parâmetros otimizados"""
         try:
-            with open(image_path, "rb") as f:
-                image_data = f.read()
+            image_data = self.source_bytes(source, quality)
             
             url = f"https://detect.roboflow.com/{self.MODEL_ID}"
             params = {
                 "api_key": self.API_KEY,
-                "confidence": "0.1",  # Threshold MUITO baixo
+                "confidence": str(confidence),  # Threshold do perfil (0.1 na máxima detecção)
                 "overlap": "20",
                 "format": "json"
             }
             
-            response = requests.post(
+            response = token.run(
+                self.http_post,
                 url,
                 params=params,
                 data=image_data,
@@ -393,139 +462,367 @@ class BetoneiraDetectorAPI:
                 return response.json()
             return None
             
+        except DetectionCancelled:
+            raise
         except Exception as e:
             print(f"❌ API direta falhou: {e}")
             return None
 
-    def process_image(self, image_path, os_data):
-        """Processamento ULTRA-OTIMIZADO para máxima detecção"""
-        try:
-            # VERIFICAÇÕES INICIAIS
-            if not os.path.exists(image_path):
-                raise Exception(f"Arquivo não encontrado: {image_path}")
-            
-            image = cv2.imread(image_path)
-            if image is None:
-                raise Exception("Não foi possível carregar a imagem")
-            
-            original = image.copy()
-            print(f"🚀 PROCESSAMENTO ULTRA-OTIMIZADO INICIADO")
-            print(f"📷 Imagem: {image.shape[1]}x{image.shape[0]}")
-            
-            # 1. DETECÇÃO DA API (MÁXIMA PRIORIDADE)
-            print("🎯 FORÇANDO DETECÇÃO DA API...")
-            api_result = self.force_api_detection(image_path)
-            
-            betoneiras = []
-            result_image = original.copy()
-            
-            # 2. PROCESSAR RESULTADOS DA API
-            api_detections = 0
-            if api_result and 'predictions' in api_result:
-                predictions = api_result['predictions']
-                print(f"🔍 API detectou {len(predictions)} objetos")
+    def api_detection_in_region(self, image, region, profile=None, token=NEVER_CANCELLED, progress=None):
+        """Chama a API só no recorte da região e devolve predições na imagem completa"""
+        x1, y1, x2, y2 = region
+        result = self.force_api_detection(image[y1:y2, x1:x2], profile, token, progress)
+        
+        if result and result.get('predictions'):
+            for pred in result['predictions']:
+                pred['x'] += x1
+                pred['y'] += y1
+        return result
+
+    def api_predictions_to_betoneiras(self, api_result, image, min_conf=0.1):
+        """Converte predições da API em registros de betoneira"""
+        betoneiras = []
+        if not api_result or 'predictions' not in api_result:
+            return betoneiras
+        
+        predictions = api_result['predictions']
+        print(f"🔍 API detectou {len(predictions)} objetos")
+        h, w = image.shape[:2]
+        
+        for pred in predictions:
+            conf = pred['confidence']
+            
+            # THRESHOLD DO PERFIL (ULTRA BAIXO, 10%, NA MÁXIMA DETECÇÃO)
+            if conf > min_conf:
+                x = pred['x']
+                y = pred['y']
+                width = pred['width']
+                height = pred['height']
+                class_name = pred.get('class', 'betoneira')
                 
-                for pred in predictions:
-                    conf = pred['confidence']
-                    
-                    # THRESHOLD ULTRA BAIXO: 10%!
-                    if conf > 0.1:
-                        x = pred['x']
-                        y = pred['y']
-                        width = pred['width']
-                        height = pred['height']
-                        class_name = pred.get('class', 'betoneira')
-                        
-                        x1 = int(x - width/2)
-                        y1 = int(y - height/2)
-                        x2 = int(x + width/2)
-                        y2 = int(y + height/2)
-                        
-                        # Validar coordenadas
-                        h, w = image.shape[:2]
-                        x1, y1 = max(0, x1), max(0, y1)
-                        x2, y2 = min(w, x2), min(h, y2)
-                        
-                        if x2 > x1 and y2 > y1:
-                            cor = self.extract_dominant_color(original, (x1, y1, x2, y2))
-                            betoneira_id = f"API{len(betoneiras) + 1:03d}"
-                            
-                            betoneira_data = {
-                                'id': betoneira_id,
-                                'conf': conf,
-                                'cor': cor,
-                                'class': class_name,
-                                'local_detection': False,
-                                'bbox': (x1, y1, x2, y2)
-                            }
-                            betoneiras.append(betoneira_data)
-                            api_detections += 1
-                            
-                            # Desenhar em VERDE (API)
-                            color = (0, 255, 0)
-                            cv2.rectangle(result_image, (x1, y1), (x2, y2), color, 4)
-                            label = f"{betoneira_id} {conf:.2f}"
-                            cv2.putText(result_image, label, (x1, y1-15), 
-                                      cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-            
-            # 3. DETECÇÃO LOCAL HIPER-EFETIVA (SE API INSUFICIENTE)
-            if len(betoneiras) < 1:
-                print("🤖 ATIVANDO DETECÇÃO LOCAL HIPER-EFETIVA...")
-                local_detections = self.hyper_local_detection(image)
+                x1 = int(x - width/2)
+                y1 = int(y - height/2)
+                x2 = int(x + width/2)
+                y2 = int(y + height/2)
                 
-                for i, (x, y, w, h, area, method) in enumerate(local_detections):
-                    cor = self.extract_dominant_color(image, (x, y, x+w, y+h))
-                    betoneira_id = f"LOC{i+1:03d}"
-                    
-                    # Calcular confiança baseada no método e área
-                    if method == "color":
-                        confidence = 0.7
-                    elif method == "shape":
-                        confidence = 0.6
-                    else:  # size
-                        confidence = 0.5
-                    
-                    # Aumentar confiança baseado na área
-                    img_area = image.shape[0] * image.shape[1]
-                    area_ratio = area / img_area
-                    if area_ratio > 0.05:  # Objetos grandes
-                        confidence += 0.2
-                    
-                    betoneira_data = {
-                        'id': betoneira_id,
-                        'conf': min(0.9, confidence),
-                        'cor': cor,
-                        'class': 'betoneira_local',
-                        'local_detection': True,
-                        'bbox': (x, y, x+w, y+h)
-                    }
-                    betoneiras.append(betoneira_data)
-                    
-                    # Desenhar em AZUL (Local)
-                    color = (255, 0, 0)
-                    cv2.rectangle(result_image, (x, y), (x+w, y+h), color, 3)
-                    label = f"{betoneira_id} {method}"
-                    cv2.putText(result_image, label, (x, y-10), 
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-            
-            # 4. RESULTADO FINAL
-            resultado = {
-                'betoneiras': betoneiras,
-                'total_detected': len(betoneiras),
-                'processed_image': result_image,
-                'analysis_time': 5.0,
-                'api_detections': api_detections,
-                'local_detections': len(betoneiras) - api_detections,
-                'api_used': api_detections > 0
-            }
-            
-            print(f"🎉 PROCESSAMENTO CONCLUÍDO: {len(betoneiras)} BETONEIRAS!")
-            print(f"📊 API: {api_detections} | Local: {len(betoneiras) - api_detections}")
-            
-            return resultado
-            
+                # Validar coordenadas
+                x1, y1 = max(0, x1), max(0, y1)
+                x2, y2 = min(w, x2), min(h, y2)
+                
+                if x2 > x1 and y2 > y1:
+                    betoneiras.append({
+                        'id': f"API{len(betoneiras) + 1:03d}",
+                        'conf': conf,
+                        'cor': self.extract_dominant_color(image, (x1, y1, x2, y2)),
+                        'class': class_name,
+                        'local_detection': False,
+                        'bbox': (x1, y1, x2, y2)
+                    })
+        return betoneiras
+
+    def local_detections_to_betoneiras(self, local_detections, image):
+        """Converte detecções locais em registros de betoneira"""
+        betoneiras = []
+        img_area = image.shape[0] * image.shape[1]
+        
+        for i, (x, y, w, h, area, method) in enumerate(local_detections):
+            # Calcular confiança baseada no método e área
+            if method == "color":
+                confidence = 0.7
+            elif method == "shape":
+                confidence = 0.6
+            else:  # size
+                confidence = 0.5
+            
+            # Aumentar confiança baseado na área
+            if area / img_area > 0.05:  # Objetos grandes
+                confidence += 0.2
+            
+            betoneiras.append({
+                'id': f"LOC{i+1:03d}",
+                'conf': min(0.9, confidence),
+                'cor': self.extract_dominant_color(image, (x, y, x+w, y+h)),
+                'class': 'betoneira_local',
+                'local_detection': True,
+                'method': method,
+                'bbox': (x, y, x+w, y+h)
+            })
+        return betoneiras
+
+    def renumber_detections(self, betoneiras):
+        """Renumera IDs (API001..., LOC001...) após mesclar com o cache"""
+        counters = {'API': 0, 'LOC': 0}
+        for bet in betoneiras:
+            prefix = 'LOC' if bet.get('local_detection') else 'API'
+            counters[prefix] += 1
+            bet['id'] = f"{prefix}{counters[prefix]:03d}"
+        return betoneiras
+
+    def process_image(self, image_path, os_data, reuse_duplicates=True, profile=None,
+                      cancel_token=None, progress=None):
+        """Processamento ULTRA-OTIMIZADO para máxima detecção
+
+        Se `os_data` trouxer `camera_id`, a foto é comparada com o modelo de
+        fundo da câmera: só as regiões alteradas são reprocessadas e as
+        detecções das áreas sem mudança vêm do cache.
+
+        Com `reuse_duplicates`, uma foto quase idêntica a outra já processada
+        para a mesma O.S. devolve o resultado anterior (chave `duplicate_of`
+        no resultado). Câmeras fixas (`camera_id`) nunca usam esse atalho.
+
+        `profile` escolhe o perfil de desempenho (ver profiles.py); None usa
+        o perfil padrão da configuração.
+
+        `cancel_token` (cancellation.py) interrompe o processamento entre
+        etapas e abandona chamadas HTTP em andamento, levantando
+        DetectionCancelled. `progress(mensagem, percentual)` recebe o
+        andamento de cada etapa.
+        """
+        start = time.perf_counter()
+        profile = get_profile(profile)
+        token = cancel_token or NEVER_CANCELLED
+        progress = progress or (lambda message, percent: None)
+        try:
+            resultado = self.run_pipeline(image_path, os_data or {}, reuse_duplicates, profile,
+                                          token, progress)
+        except DetectionCancelled:
+            print(f"⛔ Processamento cancelado após {time.perf_counter() - start:.2f}s")
+            raise
         except Exception as e:
             raise Exception(f"Erro no processamento ultra-otimizado: {str(e)}")
+        
+        resultado['analysis_time'] = round(time.perf_counter() - start, 2)
+        resultado['profile'] = profile['chave']
+        print(f"⏱️  Perfil {profile['nome']}: {resultado['analysis_time']}s")
+        progress("✅ Concluído", 100)
+        return resultado
+
+    def process_images(self, image_paths, os_data, reuse_duplicates=True, profile=None,
+                       cancel_token=None, progress=None):
+        """Várias fotos da mesma O.S.: detecção em paralelo e contagem única
+
+        Cada foto passa por process_image em uma thread própria (até
+        "multi_imagem" → "max_trabalhadores"); depois as betoneiras que
+        aparecem em fotos sobrepostas são contadas uma única vez.
+        """
+        if len(image_paths) == 1:
+            return self.process_image(image_paths[0], os_data, reuse_duplicates, profile,
+                                      cancel_token, progress)
+        
+        start = time.perf_counter()
+        token = cancel_token or NEVER_CANCELLED
+        progress = progress or (lambda message, percent: None)
+        percents = [0] * len(image_paths)
+        
+        def image_progress(index):
+            def report(message, percent):
+                percents[index] = percent
+                progress(f"📸 Foto {index + 1}/{len(image_paths)}: {message}",
+                         int(sum(percents) / len(percents) * 0.9))
+            return report
+        
+        workers = min(len(image_paths), load_config()["multi_imagem"]["max_trabalhadores"])
+        print(f"📸 {len(image_paths)} fotos da O.S., {workers} em paralelo")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="foto") as pool:
+            futures = [
+                pool.submit(self.process_image, path, os_data, reuse_duplicates, profile,
+                            token, image_progress(i))
+                for i, path in enumerate(image_paths)
+            ]
+            results = [future.result() for future in futures]
+        
+        progress("🧩 Removendo betoneiras repetidas entre fotos", 92)
+        try:
+            resultado = merge_image_results(image_paths, results, token)
+        except DetectionCancelled:
+            raise
+        except Exception as e:
+            raise Exception(f"Erro ao combinar as fotos: {str(e)}")
+        
+        resultado['analysis_time'] = round(time.perf_counter() - start, 2)
+        resultado['profile'] = results[0].get('profile')
+        progress("✅ Concluído", 100)
+        return resultado
+
+    def run_pipeline(self, image_path, os_data, reuse_duplicates, profile,
+                     token=NEVER_CANCELLED, progress=lambda message, percent: None):
+        """Etapas do processamento de uma imagem com o perfil escolhido"""
+        # VERIFICAÇÕES INICIAIS
+        progress("📷 Carregando imagem", 2)
+        if not os.path.exists(image_path):
+            raise Exception(f"Arquivo não encontrado: {image_path}")
+        
+        image = cv2.imread(image_path)
+        if image is None:
+            raise Exception("Não foi possível carregar a imagem")
+        
+        original_shape = image.shape
+        print(f"🚀 PROCESSAMENTO ULTRA-OTIMIZADO INICIADO")
+        print(f"📷 Imagem: {image.shape[1]}x{image.shape[0]}")
+        
+        # 0. PORTÃO DE QUALIDADE (ANTES DE GASTAR API)
+        token.raise_if_cancelled()
+        progress("🚦 Verificando qualidade", 5)
+        quality = assess_image_quality(image)
+        print(f"🚦 Qualidade: {describe_quality(quality)} ({quality['tempo_ms']}ms)")
+        if not quality['aprovada']:
+            resultado = self.build_result(image_path, original_shape, [])
+            resultado.update({'rejected': True, 'quality': quality})
+            return resultado
+        
+        # 0.1 IMAGEM QUASE DUPLICADA (MESMA CENA, REENVIADA)
+        token.raise_if_cancelled()
+        progress("🧬 Procurando duplicatas", 8)
+        scope = os_data.get('camera_id') or os_data.get('site')
+        # Duplicatas só dentro da mesma O.S. (e local): nunca a contagem de outra O.S.
+        duplicate_scope = f"{os_data.get('site') or ''}|{os_data.get('numero_os') or ''}"
+        image_hash = dhash(image)
+        # Câmera fixa: o modelo de fundo já trata a cena repetida, e uma mudança
+        # pequena (uma betoneira chegando no canto) cabe na distância do dHash
+        if reuse_duplicates and not os_data.get('camera_id'):
+            previous = self.duplicate_index.find(image_hash, duplicate_scope)
+            if previous is not None:
+                print(f"🧬 Quase duplicada de {previous['image_path']} "
+                      f"(distância {previous['distance']}), reutilizando resultado")
+                size = (image.shape[1], image.shape[0])
+                cached = rescale_detections(previous['betoneiras'], previous['size'], size)
+                resultado = self.build_result(image_path, original_shape, cached, reused=True)
+                resultado.update({
+                    'quality': quality,
+                    'duplicate_of': {
+                        'image_path': previous['image_path'],
+                        'timestamp': previous['timestamp'],
+                        'distance': previous['distance'],
+                    }
+                })
+                return resultado
+        
+        # 0.2 RESOLUÇÃO DE TRABALHO DO PERFIL
+        token.raise_if_cancelled()
+        progress("📐 Preparando imagem", 12)
+        work_scale = 1.0
+        max_side = profile['lado_trabalho']
+        if max_side and max(image.shape[:2]) > max_side:
+            work_scale = max_side / max(image.shape[:2])
+            new_size = (int(image.shape[1] * work_scale), int(image.shape[0] * work_scale))
+            image = cv2.resize(image, new_size, interpolation=cv2.INTER_AREA)
+            print(f"📐 Resolução de trabalho: {new_size[0]}x{new_size[1]}")
+        
+        # 0.3 REGIÃO DE INTERESSE (RECORTA RUAS, PRÉDIOS, CAMINHÕES)
+        roi = get_roi(scope)
+        roi_offset = (0, 0)
+        if roi is not None:
+            image, roi_offset = roi.apply(image)
+            print(f"✂️  ROI aplicada: {image.shape[1]}x{image.shape[0]} a partir de {roi_offset}")
+        
+        # 0.4 MODELO DE FUNDO (CÂMERAS FIXAS)
+        token.raise_if_cancelled()
+        camera_id = os_data.get('camera_id')
+        background = None
+        if camera_id:
+            # Trava a câmera até o commit; o fundo só aprende a foto com a detecção concluída
+            background = self.background_models.get(camera_id).observe(image)
+        try:
+            return self.detect_and_merge(image, image_path, original_shape, profile, roi, roi_offset,
+                                         work_scale, background, camera_id, quality, token, progress,
+                                         image_hash, duplicate_scope)
+        finally:
+            if background is not None:
+                # Erro ou cancelamento: fundo e cache ficam como estavam
+                background.discard()
+
+    def detect_and_merge(self, image, image_path, original_shape, profile, roi, roi_offset, work_scale,
+                         background, camera_id, quality, token, progress, image_hash, duplicate_scope):
+        """Detecção (API, depois local) nas regiões alteradas e mescla com o cache da câmera"""
+        regions = None
+        if background is not None:
+            regions = background.regions
+            cached = background.cached
+            if cached is None:
+                regions = None
+            elif not regions:
+                print(f"♻️  Câmera {camera_id}: sem mudanças, reutilizando {len(cached)} detecções")
+                background.commit([])
+                resultado = self.build_result(image_path, original_shape, cached, roi_offset, work_scale,
+                                              reused=True)
+                resultado['quality'] = quality
+                return resultado
+            else:
+                print(f"🧭 Câmera {camera_id}: {len(regions)} região(ões) alterada(s)")
+        
+        # 1. DETECÇÃO DA API (MÁXIMA PRIORIDADE)
+        print("🎯 FORÇANDO DETECÇÃO DA API...")
+        api_regions = regions
+        if api_regions is None and (roi is not None or work_scale != 1.0):
+            # Envia só o recorte mascarado / reduzido, nunca a foto inteira
+            api_regions = [(0, 0, image.shape[1], image.shape[0])]
+        
+        min_conf = profile['confianca_minima']
+        if api_regions is None:
+            api_result = self.force_api_detection(image_path, profile, token, progress)
+            betoneiras = self.api_predictions_to_betoneiras(api_result, image, min_conf)
+        else:
+            betoneiras = []
+            for region in api_regions:
+                api_result = self.api_detection_in_region(image, region, profile, token, progress)
+                betoneiras.extend(self.api_predictions_to_betoneiras(api_result, image, min_conf))
+        
+        # 2. DETECÇÃO LOCAL HIPER-EFETIVA (SE API INSUFICIENTE)
+        if len(betoneiras) < 1:
+            print("🤖 ATIVANDO DETECÇÃO LOCAL HIPER-EFETIVA...")
+            progress("🤖 Detecção local", 75)
+            local_detections = self.hyper_local_detection(
+                image, regions, profile['estrategias_locais'], area_scale=work_scale ** 2, token=token
+            )
+            betoneiras = self.local_detections_to_betoneiras(local_detections, image)
+        
+        # 3. MESCLAR COM O CACHE DA CÂMERA (E SÓ AGORA ATUALIZAR O FUNDO)
+        token.raise_if_cancelled()
+        progress("🧾 Montando resultado", 90)
+        if background is not None:
+            betoneiras = background.commit(betoneiras)
+        
+        resultado = self.build_result(image_path, original_shape, betoneiras, roi_offset, work_scale)
+        resultado['quality'] = quality
+        self.duplicate_index.add(image_hash, image_path, original_shape, resultado, duplicate_scope)
+        return resultado
+
+    def build_result(self, image_path, image_shape, betoneiras, offset=(0, 0), scale=1.0, reused=False):
+        """Monta o dicionário de resultado final (detecções + referência da foto)
+
+        `offset` leva as caixas do recorte da ROI de volta à imagem de
+        trabalho e `scale` da resolução de trabalho à imagem completa.
+        A imagem anotada só é desenhada quando pedida (annotation.py).
+        """
+        off_x, off_y = offset
+        h, w = image_shape[:2]
+        betoneiras = [
+            dict(bet, bbox=(min(w, int((bet['bbox'][0] + off_x) / scale)),
+                            min(h, int((bet['bbox'][1] + off_y) / scale)),
+                            min(w, int((bet['bbox'][2] + off_x) / scale)),
+                            min(h, int((bet['bbox'][3] + off_y) / scale))))
+            for bet in betoneiras
+        ]
+        betoneiras = self.renumber_detections(betoneiras)
+        api_detections = sum(1 for bet in betoneiras if not bet.get('local_detection'))
+        
+        # 4. RESULTADO FINAL
+        resultado = {
+            'betoneiras': betoneiras,
+            'total_detected': len(betoneiras),
+            'image_path': image_path,
+            'image_size': (w, h),
+            'analysis_time': 0.0,
+            'api_detections': api_detections,
+            'local_detections': len(betoneiras) - api_detections,
+            'api_used': api_detections > 0,
+            'reused_from_cache': reused
+        }
+        
+        print(f"🎉 PROCESSAMENTO CONCLUÍDO: {len(betoneiras)} BETONEIRAS!")
+        print(f"📊 API: {api_detections} | Local: {len(betoneiras) - api_detections}")
+        
+        return resultado
     
     def extract_dominant_color(self, image, bbox):
         """Extrai cor predominante de forma ultra-precisa"""
@@ -597,13 +894,66 @@ class BetoneiraDetectorAPI:
             return "indefinida"
 
 # TESTE RÁPIDO DA DETECÇÃO (opcional)
+def detection_signature(result):
+    """Resumo comparável de um resultado (contagem, caixas, origem)"""
+    return (result['total_detected'],
+            sorted((bet['id'], tuple(bet['bbox']), bet.get('method', 'api')) for bet in result['betoneiras']))
+
+
+def stress_test(detector, image_paths, threads=8, rounds=3, profile=None):
+    """Roda N threads sobre a MESMA instância e compara com a execução sequencial
+
+    Retorna True se todos os resultados concorrentes forem idênticos aos
+    sequenciais. Duplicatas não são reaproveitadas para que toda chamada
+    percorra o pipeline completo.
+    """
+    os_data = {'numero_os': 'STRESS', 'quantidade_esperada': 0}
+    print(f"🧪 Referência sequencial: {len(image_paths)} imagem(ns)")
+    expected = {path: detection_signature(detector.process_image(path, os_data, reuse_duplicates=False,
+                                                                 profile=profile))
+                for path in image_paths}
+    
+    jobs = [path for _ in range(rounds) for path in image_paths]
+    print(f"🧪 {len(jobs)} chamadas em {threads} threads concorrentes")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        signatures = list(pool.map(
+            lambda path: (path, detection_signature(detector.process_image(path, os_data, reuse_duplicates=False,
+                                                                           profile=profile))),
+            jobs
+        ))
+    elapsed = time.perf_counter() - start
+    
+    divergences = [path for path, signature in signatures if signature != expected[path]]
+    for path in sorted(set(divergences)):
+        print(f"❌ Resultado divergente: {path}")
+    print(f"🧪 {len(jobs)} chamadas em {elapsed:.2f}s, {len(divergences)} divergência(s)")
+    return not divergences
+
+
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Teste do detector de betoneiras")
+    parser.add_argument("imagens", nargs="*", default=["test_image.jpg"])
+    parser.add_argument("--stress", action="store_true",
+                        help="várias threads na mesma instância x execução sequencial")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--rodadas", type=int, default=3)
+    parser.add_argument("--perfil", default=None)
+    args = parser.parse_args()
+    
     # Teste rápido do detector
     detector = BetoneiraDetectorAPI()
     
     # Testar com uma imagem de exemplo
-    test_image = "test_image.jpg"
-    if os.path.exists(test_image):
+    test_images = [path for path in args.imagens if os.path.exists(path)]
+    if args.stress and test_images:
+        ok = stress_test(detector, test_images, args.threads, args.rodadas, args.perfil)
+        print("✅ STRESS OK: resultados idênticos" if ok else "❌ STRESS FALHOU")
+        raise SystemExit(0 if ok else 1)
+    elif test_images:
+        test_image = test_images[0]
         os_data = {
             'quantidade_esperada': 5,
             'funcionario': 'Teste',
@@ -612,7 +962,7 @@ if __name__ == "__main__":
         }
         
         try:
-            result = detector.process_image(test_image, os_data)
+            result = detector.process_image(test_image, os_data, profile=args.perfil)
             print(f"🎯 TESTE CONCLUÍDO: {result['total_detected']} betoneiras detectadas")
         except Exception as e:
             print(f"❌ ERRO NO TESTE: {e}")
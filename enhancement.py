@@ -0,0 +1,268 @@
+# enhancement.py - GRAFO DE ETAPAS DO SUPER PROCESSAMENTO
+'''
+🧩 Grafo Declarativo
+    Cada etapa declara suas entradas e a função que a calcula
+    Só é calculado o que a saída final (ou um extra pedido) realmente usa
+    Etapa desligada repassa a sua primeira entrada sem custo
+    Etapa cuja dependência obrigatória está desligada também é desligada
+
+⏱️ Custo por Etapa
+    Cada execução devolve o tempo gasto em cada etapa calculada
+    Com tracemalloc ativo (memory_benchmark.py), também o pico de memória
+
+🧠 Memória
+    Resultado intermediário é liberado assim que a última etapa que o usa termina
+    Etapas reaproveitam os próprios buffers (dst=) em vez de alocar novos quadros
+
+🎛️ Presets
+    completo: pipeline original (CLAHE, bilateral, mediana, cores, contraste)
+    balanceado: sem mediana, máscara de cor em resolução reduzida
+    rapido: apenas iluminação e contraste
+    Presets extras podem ser definidos em config.json ("realce" → "presets")
+'''
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from config import load_config
+
+
+# ==================== ETAPAS ====================
+
+def stage_iluminacao(image, params):
+    """CLAHE agressivo + equalização no canal L"""
+    lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+    l, a, b = cv2.split(lab)
+    clahe = cv2.createCLAHE(clipLimit=4.0, tileGridSize=(16, 16))
+    clahe.apply(l, dst=l)
+    cv2.equalizeHist(l, dst=l)
+    # Canais voltam para o mesmo buffer LAB, convertido no lugar
+    cv2.merge([l, a, b], dst=lab)
+    del l, a, b
+    return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR, dst=lab)
+
+
+def stage_bilateral(image, params):
+    """Filtro bilateral para reduzir ruído preservando bordas"""
+    return cv2.bilateralFilter(image, params.get('bilateral_d', 15), 80, 80)
+
+
+def stage_mediana(image, params):
+    """Filtro de mediana para ruído impulsivo"""
+    return cv2.medianBlur(image, 5)
+
+
+def stage_bordas(image, params):
+    """Canny + Laplaciano (diagnóstico; não entra na imagem final)"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    edges_canny = cv2.Canny(gray, 20, 80)
+    edges_laplacian = cv2.convertScaleAbs(cv2.Laplacian(gray, cv2.CV_16S))
+    return cv2.bitwise_or(edges_canny, edges_laplacian)
+
+
+def stage_mascara_cor(image, params):
+    """Máscara combinada das 7 faixas de cor de betoneiras + morfologia"""
+    h, w = image.shape[:2]
+    max_side = params.get('mascara_lado_max')
+    scale = 1.0
+    if max_side and max(h, w) > max_side:
+        scale = max_side / max(h, w)
+        image = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    ranges = [
+        ([10, 100, 100], [20, 255, 255]),   # Laranja vibrante
+        ([20, 80, 80], [25, 255, 255]),     # Laranja
+        ([0, 120, 70], [8, 255, 255]),      # Vermelho
+        ([172, 120, 70], [180, 255, 255]),  # Vermelho
+        ([100, 80, 50], [130, 255, 255]),   # Azul
+        ([25, 80, 80], [35, 255, 255]),     # Amarelo
+        ([0, 0, 40], [180, 50, 200]),       # Tons metálicos
+    ]
+    combined_mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
+    band = np.empty_like(combined_mask)  # um buffer para todas as faixas
+    for lower, upper in ranges:
+        cv2.inRange(hsv, np.array(lower), np.array(upper), dst=band)
+        cv2.bitwise_or(combined_mask, band, dst=combined_mask)
+    del hsv, band
+
+    # Kernels proporcionais à escala para manter o mesmo efeito
+    large = max(3, int(15 * scale) | 1)
+    medium = max(3, int(7 * scale) | 1)
+    kernel_large = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (large, large))
+    kernel_medium = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (medium, medium))
+
+    cv2.morphologyEx(combined_mask, cv2.MORPH_CLOSE, kernel_large, dst=combined_mask)
+    cv2.morphologyEx(combined_mask, cv2.MORPH_OPEN, kernel_medium, dst=combined_mask)
+    cv2.dilate(combined_mask, kernel_medium, dst=combined_mask, iterations=2)
+
+    if scale != 1.0:
+        combined_mask = cv2.resize(combined_mask, (w, h), interpolation=cv2.INTER_NEAREST)
+    return combined_mask
+
+
+def stage_segmentacao(image, mask, params):
+    """Realça as regiões da máscara de cor (80% máscara + 20% imagem)"""
+    if cv2.countNonZero(mask) * 255 <= 1000:
+        return image
+    masked_image = cv2.bitwise_and(image, image, mask=mask)
+    print("   🎨 Segmentação hiper-efetiva aplicada")
+    return cv2.addWeighted(masked_image, 0.8, image, 0.2, 0, dst=masked_image)
+
+
+def stage_contraste(image, params):
+    """Contraste final"""
+    return cv2.convertScaleAbs(image, alpha=1.2, beta=10)
+
+
+# ==================== GRAFO ====================
+
+class Stage:
+    """Etapa do grafo: nome, entradas e função
+
+    `requires` lista as etapas que precisam estar ligadas (entradas que não
+    podem ser substituídas pelo repasse, ex.: a máscara da segmentação).
+    """
+
+    def __init__(self, name, inputs, func, requires=()):
+        self.name = name
+        self.inputs = inputs
+        self.func = func
+        self.requires = tuple(requires)
+
+
+class EnhancementGraph:
+    """Avalia o grafo sob demanda a partir da saída"""
+
+    def __init__(self, stages, output):
+        self.stages = {stage.name: stage for stage in stages}
+        self.output = output
+
+    def run(self, image, enabled, params=None, extras=(), token=None):
+        """Executa o grafo; retorna (imagem final, extras, relatório de custos)
+
+        Com `token` (cancellation.py), o cancelamento é verificado antes de
+        cada etapa calculada.
+        """
+        params = params or {}
+        enabled = self.effective(enabled)
+        values = {'entrada': image}
+        report = []
+        # Quantas etapas ainda vão ler cada resultado (saída e extras ficam até o fim)
+        pending = self.consumers(enabled, [self.output, *extras])
+        keep = {'entrada', self.output, *extras}
+        tracing = tracemalloc.is_tracing() and hasattr(tracemalloc, 'reset_peak')  # Python 3.9+
+        graph_base = tracemalloc.get_traced_memory()[0] if tracing else 0
+
+        def release(name):
+            pending[name] -= 1
+            if pending[name] <= 0 and name not in keep:
+                values.pop(name, None)
+
+        def evaluate(name):
+            if name in values:
+                return values[name]
+            stage = self.stages[name]
+            if name not in enabled:
+                # Etapa desligada: repassa a entrada principal
+                values[name] = evaluate(stage.inputs[0])
+                release(stage.inputs[0])
+                return values[name]
+            inputs = [evaluate(dep) for dep in stage.inputs]
+            if token is not None:
+                token.raise_if_cancelled()
+            if tracing:
+                tracemalloc.reset_peak()
+            start = time.perf_counter()
+            value = stage.func(*inputs, params)
+            item = {'etapa': name, 'ms': round((time.perf_counter() - start) * 1000, 2)}
+            if tracing:
+                # Pico acima do início do grafo: inclui os intermediários ainda vivos
+                item['pico_mb'] = round((tracemalloc.get_traced_memory()[1] - graph_base) / 2**20, 1)
+            report.append(item)
+            del inputs
+            values[name] = value
+            for dep in stage.inputs:
+                release(dep)
+            return value
+
+        result = evaluate(self.output)
+        extra_values = {name: evaluate(name) for name in extras}
+        return result, extra_values, report
+
+    def effective(self, enabled):
+        """Etapas ligadas, sem as que dependem de uma etapa desligada"""
+        enabled = set(enabled)
+        changed = True
+        while changed:
+            changed = False
+            for name in list(enabled):
+                stage = self.stages.get(name)
+                missing = [dep for dep in stage.requires if dep not in enabled] if stage else []
+                if missing:
+                    print(f"⚠️  Etapa {name} desligada: requer {', '.join(missing)}")
+                    enabled.discard(name)
+                    changed = True
+        return enabled
+
+    def consumers(self, enabled, targets):
+        """Número de etapas que leem cada resultado no grafo efetivo"""
+        counts = {}
+        visited = set()
+
+        def visit(name):
+            if name in visited or name == 'entrada':
+                return
+            visited.add(name)
+            stage = self.stages[name]
+            deps = stage.inputs if name in enabled else stage.inputs[:1]
+            for dep in deps:
+                counts[dep] = counts.get(dep, 0) + 1
+                visit(dep)
+
+        for target in targets:
+            visit(target)
+        return counts
+
+
+ENHANCEMENT_GRAPH = EnhancementGraph([
+    Stage('iluminacao', ['entrada'], stage_iluminacao),
+    Stage('bilateral', ['iluminacao'], stage_bilateral),
+    Stage('mediana', ['bilateral'], stage_mediana),
+    Stage('bordas', ['mediana'], stage_bordas),
+    Stage('mascara_cor', ['mediana'], stage_mascara_cor),
+    Stage('segmentacao', ['mediana', 'mascara_cor'], stage_segmentacao, requires=['mascara_cor']),
+    Stage('contraste', ['segmentacao'], stage_contraste),
+], output='contraste')
+
+PRESETS = {
+    'completo': {
+        'etapas': {'iluminacao', 'bilateral', 'mediana', 'mascara_cor', 'segmentacao', 'contraste'},
+        'params': {'bilateral_d': 15, 'mascara_lado_max': None},
+    },
+    'balanceado': {
+        'etapas': {'iluminacao', 'bilateral', 'mascara_cor', 'segmentacao', 'contraste'},
+        'params': {'bilateral_d': 9, 'mascara_lado_max': 1024},
+    },
+    'rapido': {
+        'etapas': {'iluminacao', 'contraste'},
+        'params': {},
+    },
+}
+
+
+def get_preset(name):
+    """Preset pelo nome: config.json ("realce" → "presets") ou embutido"""
+    custom = load_config()["realce"]["presets"]
+    if name in custom:
+        return custom[name]
+    return PRESETS[name]
+
+
+def enhance(image, preset='completo', extras=(), token=None):
+    """Executa o super processamento com um preset; retorna (imagem, extras, custos)"""
+    config = get_preset(preset) if isinstance(preset, str) else preset
+    enabled = set(config['etapas']) | set(extras)
+    return ENHANCEMENT_GRAPH.run(image, enabled, config.get('params'), extras, token)
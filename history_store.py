@@ -0,0 +1,368 @@
+# history_store.py - HISTÓRICO PERSISTENTE EM SQLITE
+'''
+🗄️ Histórico de Processamentos
+    SQLite em modo WAL (leituras não bloqueiam a escrita)
+    Índices por data, O.S., cliente e funcionário
+    Sobrevive a reinícios junto com os contadores do dashboard
+
+🧵 Escrita em Lote Fora da Interface
+    add() só enfileira o registro (não bloqueia a GUI)
+    Uma thread de escrita agrupa registros em uma única transação
+    snapshot() separa, sem esperar a escrita, o que já está no banco
+    (até um id) do que ainda está na fila
+
+📊 Agregados Incrementais (rollups.py)
+    Atualizados em O(1) por registro, na mesma transação do histórico
+    Contadores do dashboard nunca varrem a tabela
+
+📤 Consulta e Exportação Paginadas
+    query() e iter_records() leem em páginas, nunca o ano inteiro em RAM
+
+📦 Resultado Completo (result_schema.py)
+    Coluna "resultado" com as detecções no formato binário compacto
+    record_result(registro) devolve o dicionário de resultado (caixas incluídas)
+'''
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+
+from config import load_config
+from result_schema import SchemaError, pack_result, unpack_result
+from rollups import SCHEMA as ROLLUP_SCHEMA, RollupAggregates
+
+DISPLAY_FORMAT = "%d/%m/%Y %H:%M:%S"
+STORAGE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+COLUMNS = ['timestamp', 'os_number', 'cliente', 'funcionario', 'esperado',
+           'detectado', 'status', 'tempo_processamento', 'imagem_path', 'resultado']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS historico (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    os_number TEXT,
+    cliente TEXT,
+    funcionario TEXT,
+    esperado INTEGER,
+    detectado INTEGER,
+    status TEXT,
+    tempo_processamento REAL,
+    imagem_path TEXT,
+    resultado BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_historico_timestamp ON historico (timestamp);
+CREATE INDEX IF NOT EXISTS idx_historico_os ON historico (os_number);
+CREATE INDEX IF NOT EXISTS idx_historico_cliente ON historico (cliente);
+CREATE INDEX IF NOT EXISTS idx_historico_funcionario ON historico (funcionario);
+"""
+
+# Filtros aceitos em query()/count()/iter_records() e a coluna correspondente
+FILTERS = {
+    'os_number': "os_number = ?",
+    'cliente': "cliente = ?",
+    'funcionario': "funcionario = ?",
+    'status': "status = ?",
+    'desde': "timestamp >= ?",
+    'ate': "timestamp <= ?",
+    'max_id': "id <= ?",
+    'busca': "(os_number LIKE ? OR cliente LIKE ? OR funcionario LIKE ?)",
+}
+
+# Colunas aceitas como ordenação em page()
+SORT_COLUMNS = ('timestamp', 'os_number', 'cliente', 'funcionario', 'status', 'detectado', 'tempo_processamento')
+
+_STOP = object()
+
+
+def to_storage_timestamp(value):
+    """Converte data (datetime ou dd/mm/aaaa hh:mm:ss) para o formato ordenável"""
+    if isinstance(value, datetime):
+        return value.strftime(STORAGE_FORMAT)
+    try:
+        return datetime.strptime(value, DISPLAY_FORMAT).strftime(STORAGE_FORMAT)
+    except (TypeError, ValueError):
+        return value or datetime.now().strftime(STORAGE_FORMAT)
+
+
+def to_display_timestamp(value):
+    """Converte a data armazenada para o formato da interface"""
+    try:
+        return datetime.strptime(value, STORAGE_FORMAT).strftime(DISPLAY_FORMAT)
+    except (TypeError, ValueError):
+        return value
+
+
+def make_record(os_data, results, image_paths):
+    """Registro de histórico de um processamento (interface, pasta monitorada)"""
+    if isinstance(image_paths, str):
+        image_paths = [image_paths]
+    detectado = results.get('total_detected', 0)
+    esperado = os_data.get('quantidade_esperada', 0)
+    return {
+        'timestamp': datetime.now().strftime(DISPLAY_FORMAT),
+        'os_number': os_data.get('numero_os', 'N/A'),
+        'cliente': os_data.get('cliente', 'N/A'),
+        'funcionario': os_data.get('funcionario', 'N/A'),
+        'esperado': esperado,
+        'detectado': detectado,
+        'status': "SUCESSO" if detectado == esperado else "INCONSISTENTE",
+        'tempo_processamento': results.get('analysis_time', 0),
+        'imagem_path': ";".join(image_paths),
+        'resultado': pack_result(results),
+    }
+
+
+def record_result(record):
+    """Resultado completo de um registro (None em registros antigos ou ilegíveis)"""
+    data = record.get('resultado')
+    if not data:
+        return None
+    try:
+        return unpack_result(data)
+    except SchemaError as e:
+        print(f"⚠️  Resultado do registro {record.get('os_number')} ilegível: {e}")
+        return None
+
+
+class HistoryStore:
+    """Histórico de processamentos em SQLite com escrita assíncrona em lote"""
+
+    def __init__(self, path=None, batch_size=None, flush_interval=None, recent_size=50):
+        settings = load_config()["historico"]
+        self.path = path or settings["arquivo"]
+        self.batch_size = batch_size or settings["lote_escrita"]
+        self.flush_interval = flush_interval or settings["intervalo_escrita"]
+
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        # Conexão de leitura (GUI); a escrita tem conexão própria na thread
+        self.read_conn = self.connect()
+        self.read_conn.executescript(SCHEMA)
+        self.migrate(self.read_conn)
+        self.read_conn.executescript(ROLLUP_SCHEMA)
+        self.read_lock = threading.Lock()
+        
+        self.rollups = RollupAggregates()
+        self.rollups.load(self.read_conn)
+        if self.rollups.get('global')['total'] != self.count():
+            # Banco criado antes dos agregados: recalcula uma única vez
+            print("📊 Recalculando agregados do histórico...")
+            with self.read_conn:
+                self.rollups.rebuild(self.read_conn, self.read_conn.execute("SELECT * FROM historico"))
+
+        self.pending = queue.Queue()
+        # Registros ainda não gravados: (sequência, registro para exibição)
+        self.unwritten = deque()
+        self.unwritten_lock = threading.Lock()
+        self.sequence = itertools.count(1)
+        # (última sequência gravada, maior id no banco depois dessa gravação)
+        self.written = (0, self.max_id())
+        self.recent = deque(self.query(limit=recent_size, newest_first=True)[::-1], maxlen=recent_size)
+
+        self.writer = threading.Thread(target=self._writer_loop, name="HistoryWriter", daemon=True)
+        self.writer.start()
+
+    def migrate(self, conn):
+        """Colunas acrescentadas depois da criação do banco"""
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(historico)")}
+        if 'resultado' not in columns:
+            with conn:
+                conn.execute("ALTER TABLE historico ADD COLUMN resultado BLOB")
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ==================== ESCRITA ====================
+
+    def add(self, record):
+        """Enfileira um registro para gravação (retorna imediatamente)"""
+        record = dict(record)
+        record['timestamp'] = to_storage_timestamp(record.get('timestamp'))
+        display = dict(record, timestamp=to_display_timestamp(record['timestamp']))
+        self.recent.append(display)
+        self.rollups.apply(record)
+        # Sequência e fila na mesma ordem (add pode vir de várias threads)
+        with self.unwritten_lock:
+            record['_seq'] = next(self.sequence)
+            self.unwritten.append((record['_seq'], display))
+            self.pending.put(record)
+
+    def snapshot(self):
+        """(maior id gravado, registros ainda na fila) sem esperar a escrita
+
+        Os registros do banco até esse id e os da fila não se repetem.
+        """
+        with self.unwritten_lock:
+            return self.written[1], [display for _, display in self.unwritten]
+
+    def flush(self, timeout=10):
+        """Aguarda a gravação de tudo que já foi enfileirado"""
+        done = threading.Event()
+        self.pending.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """Grava pendências e encerra a thread de escrita"""
+        self.pending.put(_STOP)
+        self.writer.join(timeout=10)
+        with self.read_lock:
+            self.read_conn.close()
+
+    def _writer_loop(self):
+        conn = self.connect()
+        running = True
+        retry, retry_events = [], []
+        while running:
+            # Lote que falhou volta na frente (continua em `unwritten` até gravar)
+            batch, events = retry, retry_events
+            retry, retry_events = [], []
+            try:
+                item = self.pending.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if not batch:
+                    continue
+                item = None
+
+            # Junta tudo que chegar até completar o lote
+            while item is not None:
+                if item is _STOP:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size or not running:
+                    break
+                try:
+                    item = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    with conn:
+                        self.write_batch(conn, batch)
+                        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM historico").fetchone()[0]
+                except Exception as e:
+                    if running:
+                        print(f"❌ Erro ao gravar histórico ({len(batch)} registros), nova tentativa: {e}")
+                        retry, retry_events = batch, events
+                        continue
+                    else:
+                        print(f"❌ Erro ao gravar histórico no encerramento, {len(batch)} registros perdidos: {e}")
+                else:
+                    # Só avança depois do commit
+                    with self.unwritten_lock:
+                        self.written = (batch[-1]['_seq'], last_id)
+                        while self.unwritten and self.unwritten[0][0] <= batch[-1]['_seq']:
+                            self.unwritten.popleft()
+            for event in events:
+                event.set()
+        conn.close()
+
+    def write_batch(self, conn, batch):
+        """Grava um lote de registros dentro da transação corrente"""
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        conn.executemany(
+            f"INSERT INTO historico ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+            [tuple(record.get(column) for column in COLUMNS) for record in batch]
+        )
+        for record in batch:
+            self.rollups.persist(conn, record)
+
+    # ==================== LEITURA ====================
+
+    def _where(self, filters):
+        clauses, params = [], []
+        for key, value in (filters or {}).items():
+            if key in FILTERS and value not in (None, ""):
+                clauses.append(FILTERS[key])
+                if key in ('desde', 'ate'):
+                    value = to_storage_timestamp(value)
+                elif key == 'busca':
+                    value = f"%{value}%"
+                params.extend([value] * FILTERS[key].count("?"))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _row_to_record(self, row):
+        record = dict(row)
+        record['timestamp'] = to_display_timestamp(record['timestamp'])
+        return record
+
+    def query(self, filters=None, limit=100, offset=0, newest_first=True):
+        """Página de registros filtrados"""
+        where, params = self._where(filters)
+        order = "DESC" if newest_first else "ASC"
+        sql = f"SELECT * FROM historico{where} ORDER BY timestamp {order}, id {order} LIMIT ? OFFSET ?"
+        with self.read_lock:
+            rows = self.read_conn.execute(sql, params + [limit, offset]).fetchall()
+        return [self._row_to_record(row) for row in rows]
+
+    def count(self, filters=None):
+        """Quantidade de registros filtrados"""
+        where, params = self._where(filters)
+        with self.read_lock:
+            return self.read_conn.execute(f"SELECT COUNT(*) FROM historico{where}", params).fetchone()[0]
+
+    def page(self, filters=None, sort_column='timestamp', newest_first=True, after=None, limit=200):
+        """Página por chave (coluna, id) a partir da última chave lida
+
+        Retorna (registros, última chave). Cada página custa o mesmo,
+        independentemente de quantas já foram lidas.
+        """
+        if sort_column not in SORT_COLUMNS:
+            sort_column = 'timestamp'
+        where, params = self._where(filters)
+        order = "DESC" if newest_first else "ASC"
+        if after is not None:
+            compare = "<" if newest_first else ">"
+            where += (" AND " if where else " WHERE ") + f"({sort_column}, id) {compare} (?, ?)"
+            params = params + list(after)
+        sql = (f"SELECT * FROM historico{where} "
+               f"ORDER BY {sort_column} {order}, id {order} LIMIT ?")
+        with self.read_lock:
+            rows = self.read_conn.execute(sql, params + [limit]).fetchall()
+        last_key = (rows[-1][sort_column], rows[-1]['id']) if rows else after
+        return [self._row_to_record(row) for row in rows], last_key
+
+    def max_id(self):
+        """Maior id gravado (fotografia do histórico para paginação estável)"""
+        with self.read_lock:
+            return self.read_conn.execute("SELECT COALESCE(MAX(id), 0) FROM historico").fetchone()[0]
+
+    def iter_records(self, filters=None, page_size=1000, newest_first=False):
+        """Percorre todos os registros filtrados em páginas (exportação)"""
+        last_key = None
+        while True:
+            records, last_key = self.page(filters, newest_first=newest_first, after=last_key, limit=page_size)
+            if not records:
+                return
+            yield from records
+
+    def recent_records(self, limit=10):
+        """Últimos registros (inclui os que ainda estão na fila de escrita)"""
+        return list(self.recent)[-limit:]
+
+    def totals(self):
+        """Contadores globais do dashboard (O(1), vindos dos agregados)"""
+        values = self.rollups.get('global')
+        return {
+            'total_processamentos': values['total'],
+            'deteccoes_bem_sucedidas': values['sucessos'],
+            'inconsistencias': values['inconsistencias'],
+            'tempo_total_processamento': values['tempo_total'],
+        }
+
+    def rollup(self, dimension, key=''):
+        """Agregado de um cliente, funcionário, dia (AAAA-MM-DD) ou hora (AAAA-MM-DD HH)"""
+        return self.rollups.get(dimension, key)
@@ -0,0 +1,327 @@
+# history_view.py - HISTÓRICO VIRTUALIZADO (MODEL/VIEW)
+'''
+📋 Modelo sobre o SQLite
+    Páginas carregadas sob demanda conforme a lista rola (fetchMore)
+    Filtro e ordenação executados no banco, não em widgets
+    Novo registro = uma linha inserida na posição da ordenação atual
+    Registros ainda na fila de escrita entram por cima da fotografia do banco
+
+🎨 Delegate
+    Cada linha é desenhada pelo delegate; só as linhas visíveis são pintadas
+    Nenhum QWidget/stylesheet por registro
+'''
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QRect, QSize, QTimer
+from PyQt5.QtGui import QColor, QFont, QPen
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QListView, QLineEdit,
+                             QComboBox, QPushButton, QLabel, QStyledItemDelegate, QStyle)
+
+from history_store import to_storage_timestamp
+
+RECORD_ROLE = Qt.UserRole + 1
+
+COLUMNS = [
+    ('timestamp', "📅 Data"),
+    ('os_number', "📄 O.S."),
+    ('cliente', "🏢 Cliente"),
+    ('funcionario', "👤 Funcionário"),
+    ('detectado', "🎯 Detectado"),
+    ('esperado', "Esperado"),
+    ('status', "Status"),
+    ('tempo_processamento', "⏱️ Tempo"),
+]
+
+
+class HistoryTableModel(QAbstractTableModel):
+    """Histórico paginado a partir do HistoryStore"""
+
+    def __init__(self, store, page_size=200, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.page_size = page_size
+        self.filters = {}
+        self.sort_column = 'timestamp'
+        self.newest_first = True
+
+        # Linhas exibidas na ordem atual: páginas do banco + registros novos
+        self.rows = []
+        # Novos que ficam depois da última página carregada (entram com ela)
+        self.held = []
+        self.total = 0
+        self.last_key = None
+        self.exhausted = False
+        self.reload()
+
+    # ==================== CARGA ====================
+
+    def reload(self):
+        """Recarrega do banco com os filtros e a ordenação atuais
+
+        Não espera a thread de escrita: o banco é lido até o id da fotografia
+        e os registros ainda na fila entram por cima, sem repetir.
+        """
+        self.beginResetModel()
+        max_id, unwritten = self.store.snapshot()
+        # Fotografia do histórico: páginas seguintes nunca repetem registros novos
+        self.snapshot_filters = dict(self.filters, max_id=max_id)
+        self.rows = []
+        self.held = [record for record in unwritten if self.matches(record)]
+        self.total = self.store.count(self.snapshot_filters) + len(self.held)
+        self.last_key = None
+        self.exhausted = False
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent):
+        if parent.isValid() or self.exhausted:
+            return
+        records, self.last_key = self.store.page(
+            self.snapshot_filters, self.sort_column, self.newest_first,
+            after=self.last_key, limit=self.page_size
+        )
+        if len(records) < self.page_size:
+            self.exhausted = True
+        # Novos que cabem até o fim desta página entram junto, na ordem certa
+        if self.exhausted:
+            arriving, self.held = self.held, []
+        elif records:
+            limit = self.sort_key(records[-1])
+            arriving = [record for record in self.held if not self.comes_after(self.sort_key(record), limit)]
+            self.held = [record for record in self.held if self.comes_after(self.sort_key(record), limit)]
+        else:
+            arriving = []
+        records = sorted(records + arriving, key=self.sort_key, reverse=self.newest_first)
+        if not records:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(records) - 1)
+        self.rows.extend(records)
+        self.endInsertRows()
+
+    def append_record(self, record):
+        """Novo processamento: inserido na posição da ordenação atual"""
+        if not self.matches(record):
+            return
+        self.total += 1
+        key = self.sort_key(record)
+        if self.rows and not self.exhausted and self.comes_after(key, self.sort_key(self.rows[-1])):
+            self.held.append(record)  # aparece quando a rolagem chegar lá
+            return
+        position = self.insert_position(key)
+        self.beginInsertRows(QModelIndex(), position, position)
+        self.rows.insert(position, record)
+        self.endInsertRows()
+
+    # ==================== ORDENAÇÃO ====================
+
+    def sort_key(self, record):
+        """Mesma ordem do banco: (coluna, id); registros sem id são os mais novos"""
+        value = record.get(self.sort_column)
+        if self.sort_column == 'timestamp':
+            value = to_storage_timestamp(value)
+        record_id = record.get('id')
+        # NULL vem antes de qualquer valor no SQLite
+        return (value is not None, value if value is not None else 0,
+                float('inf') if record_id is None else record_id)
+
+    def comes_after(self, key, other):
+        return key < other if self.newest_first else key > other
+
+    def insert_position(self, key):
+        """Busca binária da posição de um registro nas linhas carregadas"""
+        low, high = 0, len(self.rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self.comes_after(key, self.sort_key(self.rows[middle])):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def matches(self, record):
+        """Aplica os filtros atuais a um registro que ainda não está no banco"""
+        for key in ('status', 'cliente', 'funcionario', 'os_number'):
+            if self.filters.get(key) and record.get(key) != self.filters[key]:
+                return False
+        busca = (self.filters.get('busca') or "").lower()
+        if busca and not any(busca in str(record.get(key, "")).lower()
+                             for key in ('os_number', 'cliente', 'funcionario')):
+            return False
+        return True
+
+    def set_filters(self, **filters):
+        self.filters = {key: value for key, value in filters.items() if value}
+        self.reload()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sort_column = COLUMNS[column][0]
+        self.newest_first = order == Qt.DescendingOrder
+        self.reload()
+
+    # ==================== ACESSO ====================
+
+    def record(self, row):
+        return self.rows[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section][1]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.record(index.row())
+        if role == RECORD_ROLE:
+            return record
+        if role == Qt.DisplayRole:
+            value = record.get(COLUMNS[index.column()][0])
+            return "" if value is None else str(value)
+        if role == Qt.ForegroundRole and COLUMNS[index.column()][0] == 'status':
+            return QColor("#27ae60") if record.get('status') == "SUCESSO" else QColor("#e74c3c")
+        return None
+
+
+class HistoryItemDelegate(QStyledItemDelegate):
+    """Desenha um registro em três linhas, no estilo dos cartões do dashboard"""
+
+    ROW_HEIGHT = 74
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.bold = QFont()
+        self.bold.setBold(True)
+        self.small = QFont()
+        self.small.setPointSize(max(7, self.small.pointSize() - 1))
+        self.border = QPen(QColor("#bdc3c7"))
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        record = index.data(RECORD_ROLE)
+        if record is None:
+            return
+        painter.save()
+
+        card = option.rect.adjusted(4, 3, -4, -3)
+        selected = option.state & QStyle.State_Selected
+        painter.setPen(self.border)
+        painter.setBrush(QColor("#eaf2f8") if selected else QColor("white"))
+        painter.drawRoundedRect(card, 6, 6)
+
+        inner = card.adjusted(10, 6, -10, -6)
+        line_h = inner.height() // 3
+        line1 = QRect(inner.left(), inner.top(), inner.width(), line_h)
+        line2 = line1.translated(0, line_h)
+        line3 = line2.translated(0, line_h)
+
+        # Linha 1: O.S. e Status
+        painter.setFont(self.bold)
+        painter.setPen(QColor("#2c3e50"))
+        painter.drawText(line1, Qt.AlignLeft | Qt.AlignVCenter, f"📄 O.S.: {record.get('os_number')}")
+        sucesso = record.get('status') == "SUCESSO"
+        painter.setPen(QColor("#27ae60") if sucesso else QColor("#e74c3c"))
+        painter.drawText(line1, Qt.AlignRight | Qt.AlignVCenter, str(record.get('status')))
+
+        # Linha 2: Cliente e Funcionário
+        painter.setFont(option.font)
+        painter.setPen(QColor("#34495e"))
+        painter.drawText(line2, Qt.AlignLeft | Qt.AlignVCenter, f"🏢 {record.get('cliente')}")
+        painter.drawText(line2, Qt.AlignRight | Qt.AlignVCenter, f"👤 {record.get('funcionario')}")
+
+        # Linha 3: Estatísticas
+        painter.setFont(self.small)
+        painter.setPen(QColor("#7f8c8d"))
+        painter.drawText(line3, Qt.AlignLeft | Qt.AlignVCenter,
+                         f"🎯 {record.get('detectado')}/{record.get('esperado')} betoneiras   "
+                         f"⏱️ {record.get('tempo_processamento')}s")
+        painter.drawText(line3, Qt.AlignRight | Qt.AlignVCenter, f"📅 {record.get('timestamp')}")
+
+        painter.restore()
+
+
+class HistoryPanel(QWidget):
+    """Barra de filtros + lista virtualizada do histórico"""
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.model = HistoryTableModel(store, parent=self)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        # Filtros e ordenação
+        bar = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("🔎 Buscar por O.S., cliente ou funcionário")
+        self.status_combo = QComboBox()
+        self.status_combo.addItem("Todos os status", "")
+        self.status_combo.addItem("✅ SUCESSO", "SUCESSO")
+        self.status_combo.addItem("⚠️ INCONSISTENTE", "INCONSISTENTE")
+        self.sort_combo = QComboBox()
+        for column, (_, title) in enumerate(COLUMNS):
+            self.sort_combo.addItem(f"Ordenar: {title}", column)
+        self.order_button = QPushButton("⬇️")
+        self.order_button.setCheckable(True)
+        self.order_button.setToolTip("Alternar ordem crescente/decrescente")
+        self.order_button.setMaximumWidth(40)
+        self.count_label = QLabel()
+        self.count_label.setStyleSheet("color: #7f8c8d; font-size: 11px;")
+
+        bar.addWidget(self.search_input, 2)
+        bar.addWidget(self.status_combo)
+        bar.addWidget(self.sort_combo)
+        bar.addWidget(self.order_button)
+        layout.addLayout(bar)
+
+        # Lista: só as linhas visíveis são pintadas
+        self.view = QListView()
+        self.view.setModel(self.model)
+        self.view.setItemDelegate(HistoryItemDelegate(self.view))
+        self.view.setUniformItemSizes(True)
+        self.view.setMinimumHeight(300)
+        self.view.setStyleSheet("QListView { border: none; background-color: #f8f9fa; }")
+        layout.addWidget(self.view)
+        layout.addWidget(self.count_label)
+
+        # Busca com pequeno atraso para não recarregar a cada tecla
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(self.apply_filters)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.status_combo.currentIndexChanged.connect(self.apply_filters)
+        self.sort_combo.currentIndexChanged.connect(self.apply_sort)
+        self.order_button.toggled.connect(self.apply_sort)
+
+        self.model.rowsInserted.connect(self.update_count)
+        self.model.modelReset.connect(self.update_count)
+        self.update_count()
+
+    def apply_filters(self):
+        self.model.set_filters(busca=self.search_input.text().strip(),
+                               status=self.status_combo.currentData())
+
+    def apply_sort(self):
+        ascending = self.order_button.isChecked()
+        self.order_button.setText("⬆️" if ascending else "⬇️")
+        self.model.sort(self.sort_combo.currentData(), Qt.AscendingOrder if ascending else Qt.DescendingOrder)
+
+    def append_record(self, record):
+        self.model.append_record(record)
+
+    def update_count(self, *args):
+        # Total mantido pelo modelo: nenhuma contagem no banco a cada inserção
+        self.count_label.setText(f"{self.model.rowCount()} de {self.model.total} registros carregados")
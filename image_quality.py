@@ -0,0 +1,91 @@
+# image_quality.py - PORTÃO DE QUALIDADE ANTES DA DETECÇÃO
+'''
+🚦 Avaliação Rápida (milissegundos)
+    Calculada sobre uma cópia reduzida da imagem
+    Resolução mínima: lado menor da foto original
+    Nitidez: variância do Laplaciano
+    Exposição: histograma de brilho (escura / estourada)
+
+⛔ Rejeitar: imagem sem chance de detecção (não gasta API)
+⚠️ Alertar: processa normalmente, mas avisa o operador
+'''
+import time
+
+import cv2
+import numpy as np
+
+from config import load_config
+
+
+def assess_image_quality(image, config=None):
+    """Avalia nitidez, exposição e resolução; retorna o laudo da imagem"""
+    start = time.perf_counter()
+    limits = (config or load_config())["qualidade"]
+
+    h, w = image.shape[:2]
+    rejeicoes = []
+    alertas = []
+
+    # 1. RESOLUÇÃO MÍNIMA (não precisa de pixels)
+    if min(h, w) < limits["lado_minimo"]:
+        rejeicoes.append(f"Resolução muito baixa ({w}x{h}, mínimo {limits['lado_minimo']}px no menor lado)")
+
+    # 2. CÓPIA REDUZIDA PARA AS MÉTRICAS
+    # Amostragem por passo (sem cópia) antes do INTER_AREA em fotos grandes
+    step = max(1, max(h, w) // (limits["lado_analise"] * 2))
+    sampled = image[::step, ::step]
+    sh, sw = sampled.shape[:2]
+    scale = min(1.0, limits["lado_analise"] / max(sh, sw))
+    small = cv2.resize(sampled, (max(1, int(sw * scale)), max(1, int(sh * scale))),
+                       interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    # 3. NITIDEZ: VARIÂNCIA DO LAPLACIANO
+    nitidez = float(cv2.Laplacian(gray, cv2.CV_32F).var())
+    if nitidez < limits["nitidez_rejeitar"]:
+        rejeicoes.append(f"Imagem muito borrada (nitidez {nitidez:.0f})")
+    elif nitidez < limits["nitidez_alerta"]:
+        alertas.append(f"Imagem pouco nítida (nitidez {nitidez:.0f})")
+
+    # 4. EXPOSIÇÃO: HISTOGRAMA DE BRILHO
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()
+    total = max(1.0, float(hist.sum()))
+    brilho_medio = float(np.dot(hist, np.arange(256)) / total)
+    fracao_escura = float(hist[:limits["pixel_escuro"]].sum() / total)
+    fracao_estourada = float(hist[limits["pixel_estourado"]:].sum() / total)
+
+    if fracao_escura > limits["fracao_escura_rejeitar"]:
+        rejeicoes.append(f"Imagem escura demais ({fracao_escura:.0%} dos pixels sem informação)")
+    elif brilho_medio < limits["brilho_minimo_alerta"]:
+        alertas.append(f"Imagem escura (brilho médio {brilho_medio:.0f})")
+
+    if fracao_estourada > limits["fracao_estourada_rejeitar"]:
+        rejeicoes.append(f"Imagem superexposta ({fracao_estourada:.0%} dos pixels estourados)")
+    elif brilho_medio > limits["brilho_maximo_alerta"]:
+        alertas.append(f"Imagem muito clara (brilho médio {brilho_medio:.0f})")
+
+    return {
+        'aprovada': not rejeicoes,
+        'motivos': rejeicoes,
+        'alertas': alertas,
+        'metricas': {
+            'largura': w,
+            'altura': h,
+            'nitidez': round(nitidez, 1),
+            'brilho_medio': round(brilho_medio, 1),
+            'fracao_escura': round(fracao_escura, 3),
+            'fracao_estourada': round(fracao_estourada, 3),
+        },
+        'tempo_ms': round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+def describe_quality(quality):
+    """Resumo em texto do laudo (para status da interface e saídas em lote)"""
+    if not quality:
+        return ""
+    if not quality['aprovada']:
+        return "Imagem rejeitada: " + "; ".join(quality['motivos'])
+    if quality['alertas']:
+        return "Atenção: " + "; ".join(quality['alertas'])
+    return "Qualidade OK"
@@ -0,0 +1,247 @@
+# image_viewer.py - VISUALIZADOR COM ZOOM PARA RESULTADOS GRANDES
+'''
+🔍 Visualizador (QGraphicsView)
+    Roda do mouse: zoom no ponto do cursor | Arrastar: mover
+    Duplo clique: volta a mostrar a imagem inteira
+
+🧱 Pirâmide de Blocos
+    A foto original é decodificada e reduzida pela metade sucessivamente
+    em segundo plano (a interface não trava com fotos de 48 MP)
+    Só os blocos visíveis, no nível de detalhe do zoom atual, são
+    convertidos e desenhados; blocos recentes ficam em cache LRU
+
+📐 Caixas Vetoriais
+    Detecções são itens da cena por cima da foto (não pixels queimados)
+    Traço com espessura constante em qualquer zoom
+    Cores iguais às da imagem anotada: verde = API, azul = local
+'''
+import math
+from collections import OrderedDict
+
+import cv2
+from PyQt5.QtCore import QRectF, QRunnable, QThreadPool, Qt, pyqtSignal
+from PyQt5.QtGui import QBrush, QColor, QImage, QPainter, QPen
+from PyQt5.QtWidgets import (QComboBox, QDialog, QGraphicsItem, QGraphicsRectItem,
+                             QGraphicsScene, QGraphicsSimpleTextItem, QGraphicsView,
+                             QHBoxLayout, QLabel, QPushButton, QStyleOptionGraphicsItem,
+                             QVBoxLayout)
+
+TILE_SIZE = 256
+MAX_CACHED_TILES = 256
+API_COLOR = QColor(0, 200, 0)
+LOCAL_COLOR = QColor(0, 0, 255)
+
+
+# ==================== PIRÂMIDE ====================
+
+def build_pyramid(image, tile_size=TILE_SIZE):
+    """Níveis da imagem, cada um com metade do anterior, até caber em um bloco"""
+    levels = [image]
+    while max(levels[-1].shape[:2]) > tile_size:
+        h, w = levels[-1].shape[:2]
+        levels.append(cv2.resize(levels[-1], ((w + 1) // 2, (h + 1) // 2), interpolation=cv2.INTER_AREA))
+    return levels
+
+
+class _PyramidRunnable(QRunnable):
+    def __init__(self, viewer, request_id, source):
+        super().__init__()
+        self.viewer = viewer
+        self.request_id = request_id
+        self.source = source
+
+    def run(self):
+        image = cv2.imread(self.source) if isinstance(self.source, str) else self.source
+        levels = build_pyramid(image) if image is not None else None
+        try:
+            self.viewer.pyramid_ready.emit(self.request_id, levels)
+        except RuntimeError:
+            pass  # visualizador fechado antes de a pirâmide ficar pronta
+
+
+class TiledImageItem(QGraphicsItem):
+    """Foto em coordenadas da resolução original, desenhada por blocos"""
+
+    def __init__(self, levels):
+        super().__init__()
+        self.levels = levels
+        self.height, self.width = levels[0].shape[:2]
+        self.tiles = OrderedDict()
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
+
+    def boundingRect(self):
+        return QRectF(0, 0, self.width, self.height)
+
+    def level_for(self, lod):
+        """Nível mais reduzido que ainda tem ao menos 1 pixel por pixel de tela"""
+        if lod >= 1.0:
+            return 0
+        return min(len(self.levels) - 1, int(math.floor(math.log2(1.0 / lod))))
+
+    def tile(self, level, tx, ty):
+        key = (level, tx, ty)
+        cached = self.tiles.get(key)
+        if cached is not None:
+            self.tiles.move_to_end(key)
+            return cached[0]
+        image = self.levels[level]
+        block = image[ty * TILE_SIZE:(ty + 1) * TILE_SIZE, tx * TILE_SIZE:(tx + 1) * TILE_SIZE]
+        rgb = cv2.cvtColor(block, cv2.COLOR_BGR2RGB)
+        h, w = rgb.shape[:2]
+        qimage = QImage(rgb.data, w, h, 3 * w, QImage.Format_RGB888)
+        # O array fica junto do QImage no cache (QImage não copia os pixels)
+        self.tiles[key] = (qimage, rgb)
+        while len(self.tiles) > MAX_CACHED_TILES:
+            self.tiles.popitem(last=False)
+        return qimage
+
+    def paint(self, painter, option, widget=None):
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        level = self.level_for(lod)
+        level_h, level_w = self.levels[level].shape[:2]
+        fx, fy = self.width / level_w, self.height / level_h
+
+        exposed = option.exposedRect.intersected(self.boundingRect())
+        first_x = max(0, int(exposed.left() / fx) // TILE_SIZE)
+        last_x = min((level_w - 1) // TILE_SIZE, int(exposed.right() / fx) // TILE_SIZE)
+        first_y = max(0, int(exposed.top() / fy) // TILE_SIZE)
+        last_y = min((level_h - 1) // TILE_SIZE, int(exposed.bottom() / fy) // TILE_SIZE)
+
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, level > 0 or lod < 1.0)
+        for ty in range(first_y, last_y + 1):
+            for tx in range(first_x, last_x + 1):
+                qimage = self.tile(level, tx, ty)
+                target = QRectF(tx * TILE_SIZE * fx, ty * TILE_SIZE * fy,
+                                qimage.width() * fx, qimage.height() * fy)
+                painter.drawImage(target, qimage)
+
+
+# ==================== VISUALIZADOR ====================
+
+class ImageViewer(QGraphicsView):
+    """Foto com zoom/arraste e caixas de detecção vetoriais"""
+
+    pyramid_ready = pyqtSignal(int, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setScene(QGraphicsScene(self))
+        self.setDragMode(QGraphicsView.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+        self.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
+        self.setBackgroundBrush(QBrush(QColor("#2c3e50")))
+        self.request_id = 0
+        self.betoneiras = []
+        self.image_item = None
+        self.pyramid_ready.connect(self.on_pyramid_ready)
+
+    def show_image(self, source, betoneiras):
+        """Mostra uma foto (caminho ou array BGR) e as caixas das detecções"""
+        self.request_id += 1
+        self.betoneiras = betoneiras
+        self.scene().clear()
+        self.image_item = None
+        loading = self.scene().addSimpleText("⏳ Carregando imagem em alta resolução...")
+        loading.setBrush(QBrush(Qt.white))
+        self.resetTransform()
+        QThreadPool.globalInstance().start(_PyramidRunnable(self, self.request_id, source))
+
+    def on_pyramid_ready(self, request_id, levels):
+        if request_id != self.request_id:
+            return  # outra foto já foi pedida
+        self.scene().clear()
+        if levels is None:
+            error = self.scene().addSimpleText("❌ Não foi possível abrir a imagem")
+            error.setBrush(QBrush(Qt.white))
+            return
+        self.image_item = TiledImageItem(levels)
+        self.scene().addItem(self.image_item)
+        self.scene().setSceneRect(self.image_item.boundingRect())
+        for bet in self.betoneiras:
+            self.add_box(bet)
+        self.fit()
+
+    def add_box(self, bet):
+        x1, y1, x2, y2 = bet['bbox']
+        local = bet.get('local_detection')
+        color = LOCAL_COLOR if local else API_COLOR
+        pen = QPen(color, 3 if local else 4)
+        pen.setCosmetic(True)  # mesma espessura em qualquer zoom
+        rect = QGraphicsRectItem(x1, y1, x2 - x1, y2 - y1)
+        rect.setPen(pen)
+        rect.setZValue(1)
+        self.scene().addItem(rect)
+
+        label = f"{bet['id']} {bet.get('method', 'local')}" if local else f"{bet['id']} {bet.get('conf', 0):.2f}"
+        text = QGraphicsSimpleTextItem(label)
+        text.setBrush(QBrush(color))
+        # Texto no canto da caixa, sempre do mesmo tamanho na tela
+        text.setFlag(QGraphicsItem.ItemIgnoresTransformations, True)
+        text.setPos(x1, y1)
+        text.setZValue(2)
+        self.scene().addItem(text)
+        # Fundo para o texto ficar legível sobre a foto
+        background = QGraphicsRectItem(text.boundingRect().adjusted(-2, -1, 2, 1), text)
+        background.setBrush(QBrush(QColor(255, 255, 255, 200)))
+        background.setPen(QPen(Qt.NoPen))
+        background.setFlag(QGraphicsItem.ItemStacksBehindParent, True)
+        return rect
+
+    def fit(self):
+        if self.image_item is not None:
+            self.fitInView(self.image_item, Qt.KeepAspectRatio)
+
+    def zoom(self, factor):
+        current = self.transform().m11()
+        # Limites: imagem inteira com folga até 8 pixels de tela por pixel da foto
+        if self.image_item is not None:
+            minimum = min(self.viewport().width() / self.image_item.width,
+                          self.viewport().height() / self.image_item.height) * 0.5
+            factor = max(minimum / current, min(8.0 / current, factor))
+        self.scale(factor, factor)
+
+    def wheelEvent(self, event):
+        self.zoom(1.25 if event.angleDelta().y() > 0 else 0.8)
+
+    def mouseDoubleClickEvent(self, event):
+        self.fit()
+
+
+class ResultViewerDialog(QDialog):
+    """Janela com o resultado em resolução total (uma ou várias fotos)"""
+
+    def __init__(self, sources, parent=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.setWindowTitle("🔍 Resultado em Alta Resolução")
+        self.resize(1200, 850)
+        self.sources = sources  # [(título, caminho ou array, betoneiras)]
+
+        layout = QVBoxLayout(self)
+        toolbar = QHBoxLayout()
+        self.photo_combo = QComboBox()
+        for title, _, betoneiras in sources:
+            self.photo_combo.addItem(f"{title} ({len(betoneiras)} betoneiras)")
+        self.photo_combo.setVisible(len(sources) > 1)
+        self.photo_combo.currentIndexChanged.connect(self.show_photo)
+        toolbar.addWidget(self.photo_combo)
+        toolbar.addWidget(QLabel("🖱️ Roda: zoom | Arrastar: mover | Duplo clique: ajustar"))
+        toolbar.addStretch()
+        for text, slot in (("➖", lambda: self.viewer.zoom(0.8)), ("➕", lambda: self.viewer.zoom(1.25)),
+                           ("⛶ Ajustar", lambda: self.viewer.fit())):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            toolbar.addWidget(button)
+        layout.addLayout(toolbar)
+
+        self.viewer = ImageViewer(self)
+        layout.addWidget(self.viewer)
+        self.show_photo(0)
+
+    def show_photo(self, index):
+        _, source, betoneiras = self.sources[index]
+        self.viewer.show_image(source, betoneiras)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.viewer.fit()
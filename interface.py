@@ -6,13 +6,26 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QListWidget, QTabWidget, QFrame, QMessageBox,
                              QFileDialog, QProgressBar, QGroupBox, QFormLayout,
                              QScrollArea, QSplitter, QSizePolicy, QGridLayout,
-                             QApplication, QDesktopWidget)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSize, QTimer
-from PyQt5.QtGui import QPixmap, QImage, QFont, QIcon, QPalette, QColor
+                             QApplication, QDesktopWidget, QComboBox, QTableView,
+                             QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import Qt, QSize, QTimer
+from PyQt5.QtGui import QPixmap, QFont, QIcon, QPalette, QColor
 import cv2
 import json
 from datetime import datetime
 
+from config import load_config
+from artifact_store import ArtifactStore
+from history_store import HistoryStore, make_record, record_result
+from result_schema import format_boxes
+from history_view import HistoryPanel
+from dashboard_metrics import DashboardMetrics, MetricCard, METRIC_CARDS
+from job_queue import JobQueue, JobTableModel
+from report_worker import ReportWorker
+from thumbnails import ThumbnailService
+from image_viewer import ResultViewerDialog
+from profiles import available_profiles
+
 # Importações condicionais para evitar erros
 def import_detector():
     try:
@@ -24,30 +37,11 @@ def import_detector():
 
 def import_utils():
     try:
-        from utils import generate_pdf_report
-        return generate_pdf_report
+        from utils import generate_pdf_report, generate_batch_report
+        return generate_pdf_report, generate_batch_report
     except ImportError as e:
         print(f"⚠️  Erro ao importar utils: {e}")
-        return None
-
-class DetectionThread(QThread):
-    finished = pyqtSignal(dict)
-    error = pyqtSignal(str)
-    progress = pyqtSignal(str)
-    
-    def __init__(self, detector, image_path, os_data):
-        super().__init__()
-        self.detector = detector
-        self.image_path = image_path
-        self.os_data = os_data
-    
-    def run(self):
-        try:
-            self.progress.emit("🔄 Iniciando pré-processamento...")
-            results = self.detector.process_image(self.image_path, self.os_data)
-            self.finished.emit(results)
-        except Exception as e:
-            self.error.emit(str(e))
+        return None, None
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -56,14 +50,39 @@ class MainWindow(QMainWindow):
         self.current_results = None
         self.detector_class = import_detector()
         self.detector = None
-        self.generate_pdf_report = import_utils()
+        self.generate_pdf_report, self.generate_batch_report = import_utils()
+
+        # NOVO: Sistema de histórico (persistente em SQLite, sobrevive a reinícios)
+        self.history_store = HistoryStore()
+        # Métricas do dashboard: lidas dos agregados, atualizações agrupadas
+        self.metrics = DashboardMetrics(self.history_store, parent=self)
+        self.metrics.changed.connect(self.on_metrics_changed)
+        
+        # Fotos e prévias anotadas guardadas por hash: o histórico reabre sem nova detecção
+        self.artifact_store = ArtifactStore() if load_config()["artefatos"]["ativo"] else None
+        
+        # Fila de detecções: vários pares O.S. + imagem processados em paralelo
+        self.job_queue = JobQueue(None, parent=self, artifact_store=self.artifact_store)
+        self.job_queue.job_finished.connect(self.on_job_finished)
+        self.job_queue.job_failed.connect(self.on_job_failed)
+        self.job_queue.job_changed.connect(self.atualizar_progresso_fila)
+        self.current_os_data = {}
+        # Duplicatas aguardando confirmação do operador (perguntadas com a fila vazia)
+        self.duplicatas_pendentes = []
+        self.confirmando_duplicatas = False
 
-        # NOVO: Sistema de histórico
-        self.historico_processamentos = []
-        self.total_processamentos = 0
-        self.deteccoes_bem_sucedidas = 0
-        self.inconsistencias = 0
-        self.tempo_total_processamento = 0
+        # Relatórios PDF gerados fora da thread da interface
+        self.report_worker = None
+        if self.generate_pdf_report:
+            self.report_worker = ReportWorker(self.generate_pdf_report, parent=self)
+            self.report_worker.finished.connect(self.on_report_finished)
+            self.report_worker.error.connect(self.on_report_error)
+        
+        # Miniaturas decodificadas em segundo plano (original e processada)
+        self.thumbnails = ThumbnailService(parent=self)
+        self.thumbnails.ready.connect(self.on_thumbnail_ready)
+        self.thumbnail_tags = {}
+        self.thumbnail_seq = 0
         
         # CONFIGURAÇÃO DE TELA CHEIA
         self.setWindowTitle("🏗️ Sistema Inteligente de Gestão de Betoneiras")
@@ -75,6 +94,20 @@ class MainWindow(QMainWindow):
         self.init_ui()
         self.init_detector()
         
+        # Histórico de sessões anteriores já aparece no dashboard
+        self.metrics.refresh()
+        
+    def closeEvent(self, event):
+        """Encerra a fila e grava o histórico pendente antes de fechar"""
+        self.job_queue.shutdown()
+        self.thumbnails.shutdown()
+        if self.report_worker:
+            self.report_worker.shutdown()
+        self.history_store.close()
+        if self.artifact_store:
+            self.artifact_store.close()
+        super().closeEvent(event)
+
     def showEvent(self, event):
         """Ajusta a interface quando a janela é mostrada"""
         super().showEvent(event)
@@ -157,41 +190,51 @@ class MainWindow(QMainWindow):
             print(f"❌ Erro ao inicializar detector: {e}")
             # Criar detector mock para demonstração
             self.detector = self.create_mock_detector()
+        self.job_queue.detector = self.detector
     
     def create_mock_detector(self):
         """Cria um detector mock para demonstração quando o real não está disponível"""
         class MockDetector:
-            def process_image(self, image_path, os_data):
+            def process_image(self, image_path, os_data, **kwargs):
                 # Simular processamento
                 import random
                 expected = os_data.get('quantidade_esperada', 5)
                 detected = random.randint(max(1, expected-2), expected+1)
                 
-                # Carregar imagem para demonstração
+                # Caixas simuladas sobre a foto (anotação desenhada sob demanda)
                 image = cv2.imread(image_path)
-                if image is not None:
-                    # Adicionar anotações simuladas
-                    h, w = image.shape[:2]
-                    for i in range(detected):
-                        x = random.randint(50, w-150)
-                        y = random.randint(50, h-150)
-                        cv2.rectangle(image, (x, y), (x+100, y+100), (0, 255, 0), 3)
-                        cv2.putText(image, f'Betoneira {i+1}', (x, y-10), 
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                h, w = image.shape[:2] if image is not None else (400, 400)
+                betoneiras = []
+                for i in range(detected):
+                    x = random.randint(0, max(0, w-150))
+                    y = random.randint(0, max(0, h-150))
+                    betoneiras.append({
+                        'id': f"DEMO{i+1:03d}",
+                        'conf': round(random.uniform(0.7, 0.95), 2),
+                        'cor': random.choice(['Azul', 'Vermelho', 'Amarelo', 'Verde']),
+                        'local_detection': random.choice([True, False]),
+                        'method': 'demo',
+                        'bbox': (x, y, min(w, x+100), min(h, y+100))
+                    })
                 
                 return {
                     'total_detected': detected,
-                    'betoneiras': [
-                        {
-                            'id': i+1,
-                            'conf': round(random.uniform(0.7, 0.95), 2),
-                            'cor': random.choice(['Azul', 'Vermelho', 'Amarelo', 'Verde']),
-                            'local_detection': random.choice([True, False])
-                        } for i in range(detected)
-                    ],
-                    'processed_image': image,
+                    'betoneiras': betoneiras,
+                    'image_path': image_path,
+                    'image_size': (w, h),
                     'analysis_time': round(random.uniform(1.5, 3.5), 2)
                 }
+            
+            def process_images(self, image_paths, os_data, **kwargs):
+                # Simulação: contagem da primeira foto
+                resultado = self.process_image(image_paths[0], os_data)
+                for bet in resultado['betoneiras']:
+                    bet['imagem'] = 0
+                resultado['imagens'] = [{'image_path': path, 'image_size': resultado['image_size'] if i == 0 else None,
+                                         'total_detected': resultado['total_detected'] if i == 0 else 0,
+                                         'duplicadas': 0, 'rejected': False}
+                                        for i, path in enumerate(image_paths)]
+                return resultado
         
         return MockDetector()
     
@@ -271,6 +314,10 @@ class MainWindow(QMainWindow):
         self.quantidade_input.setPlaceholderText("🔢 Quantidade total de betoneiras alugadas")
         self.quantidade_input.setMinimumHeight(35)
         
+        self.camera_input = QLineEdit()
+        self.camera_input.setPlaceholderText("📷 Identificador da câmera fixa (opcional, ex.: baia1)")
+        self.camera_input.setMinimumHeight(35)
+        
         # Estilizar campos
         input_style = """
             QLineEdit {
@@ -289,13 +336,14 @@ class MainWindow(QMainWindow):
             }
         """
         
-        for input_field in [self.funcionario_input, self.os_input, self.cliente_input, self.quantidade_input]:
+        for input_field in [self.funcionario_input, self.os_input, self.cliente_input, self.quantidade_input, self.camera_input]:
             input_field.setStyleSheet(input_style)
         
         form_layout.addRow("👤 Nome do Funcionário:", self.funcionario_input)
         form_layout.addRow("📄 Número da O.S.:", self.os_input)
         form_layout.addRow("🏢 Cliente:", self.cliente_input)
         form_layout.addRow("🔢 Quantidade de Betoneiras:", self.quantidade_input)
+        form_layout.addRow("📷 Câmera Fixa:", self.camera_input)
         
         group_os.setLayout(form_layout)
         
@@ -428,7 +476,7 @@ class MainWindow(QMainWindow):
         
         upload_layout = QVBoxLayout()
         
-        self.btn_upload = QPushButton("📸 Selecionar Imagem")
+        self.btn_upload = QPushButton("📸 Selecionar Imagem(ns)")
         self.btn_upload.clicked.connect(self.upload_image)
         self.btn_upload.setMinimumHeight(45)
         self.btn_upload.setStyleSheet("""
@@ -467,9 +515,39 @@ class MainWindow(QMainWindow):
         upload_layout.addWidget(self.image_path_label)
         upload_group.setLayout(upload_layout)
         
+        # Perfil de desempenho (latência x recall)
+        profile_group = QGroupBox("🏎️ Perfil de Detecção")
+        profile_group.setStyleSheet("""
+            QGroupBox {
+                font-weight: bold;
+                border: 2px solid #16a085;
+                border-radius: 8px;
+                margin-top: 8px;
+                padding-top: 12px;
+                background-color: #e8f8f5;
+            }
+            QGroupBox::title {
+                color: #117a65;
+            }
+        """)
+        profile_layout = QVBoxLayout()
+        
+        self.profile_combo = QComboBox()
+        self.profile_combo.setMinimumHeight(32)
+        for key, profile in available_profiles().items():
+            self.profile_combo.addItem(profile.get('nome', key), key)
+        default_index = self.profile_combo.findData(load_config()["perfil_padrao"])
+        if default_index >= 0:
+            self.profile_combo.setCurrentIndex(default_index)
+        self.profile_combo.setToolTip("⚡ Rápido: menos tentativas e imagem reduzida\n"
+                                      "🎯 Máxima Detecção: todas as estratégias em resolução total")
+        
+        profile_layout.addWidget(self.profile_combo)
+        profile_group.setLayout(profile_layout)
+        
         # Botão de detecção
         self.btn_detect = QPushButton("🤖 Detectar Betoneiras (IA)")
-        self.btn_detect.clicked.connect(self.detect_betoneiras)
+        self.btn_detect.clicked.connect(lambda: self.detect_betoneiras())
         self.btn_detect.setEnabled(False)
         self.btn_detect.setMinimumHeight(50)
         self.btn_detect.setStyleSheet("""
@@ -534,9 +612,11 @@ class MainWindow(QMainWindow):
         self.status_label.setWordWrap(True)
         
         left_layout.addWidget(upload_group)
+        left_layout.addWidget(profile_group)
         left_layout.addWidget(self.btn_detect)
         left_layout.addWidget(self.progress_bar)
         left_layout.addWidget(self.status_label)
+        left_layout.addWidget(self.criar_painel_fila())
         left_layout.addStretch()
         
         # Right panel - Resultados
@@ -583,7 +663,7 @@ class MainWindow(QMainWindow):
                 color: #7f8c8d;
             }
         """)
-        self.original_image_label.setText("Imagem será exibida aqui\n\n📁 Clique em 'Selecionar Imagem'")
+        self.original_image_label.setText("Imagem será exibida aqui\n\n📁 Clique em 'Selecionar Imagem(ns)'")
         self.original_image_label.setScaledContents(False)
         orig_layout.addWidget(self.original_image_label)
         orig_group.setLayout(orig_layout)
@@ -607,6 +687,12 @@ class MainWindow(QMainWindow):
         self.processed_image_label.setText("Resultados aparecerão aqui\n\n🤖 Após a detecção por IA")
         self.processed_image_label.setScaledContents(False)
         proc_layout.addWidget(self.processed_image_label)
+        
+        # Resultado em resolução total, com zoom e caixas vetoriais
+        self.btn_ampliar = QPushButton("🔍 Ampliar Resultado")
+        self.btn_ampliar.clicked.connect(self.abrir_visualizador)
+        self.btn_ampliar.setEnabled(False)
+        proc_layout.addWidget(self.btn_ampliar)
         proc_group.setLayout(proc_layout)
         
         image_splitter.addWidget(orig_group)
@@ -760,38 +846,24 @@ class MainWindow(QMainWindow):
         metrics_layout = QHBoxLayout(metrics_container)
         metrics_layout.setSpacing(10)
         
-        # Métricas iniciais
-        metrics = [
-            ("📈 Total Processado", "0", "#3498db"),
-            ("✅ Detecções Bem-sucedidas", "0", "#27ae60"), 
-            ("⚠️ Inconsistências", "0", "#e74c3c"),
-            ("⏱️ Tempo Médio", "0s", "#f39c12")
-        ]
-        
-        for title, value, color in metrics:
-            metric_widget = QWidget()
-            metric_widget.setStyleSheet(f"""
-                QWidget {{
-                    background-color: {color};
-                    border-radius: 8px;
-                    padding: 12px;
-                    min-width: 120px;
-                }}
-            """)
-            metric_layout = QVBoxLayout(metric_widget)
-            
-            title_label = QLabel(title)
-            title_label.setStyleSheet("color: white; font-size: 12px; font-weight: bold;")
-            title_label.setAlignment(Qt.AlignCenter)
-            title_label.setWordWrap(True)
-            
-            value_label = QLabel(value)
-            value_label.setStyleSheet("color: white; font-size: 18px; font-weight: bold;")
-            value_label.setAlignment(Qt.AlignCenter)
-            
-            metric_layout.addWidget(title_label)
-            metric_layout.addWidget(value_label)
-            metrics_layout.addWidget(metric_widget)
+        # Cartões persistentes: atualizados no lugar pelo modelo de métricas
+        self.metric_cards = [MetricCard(key, title, color) for key, title, color in METRIC_CARDS]
+        for card in self.metric_cards:
+            metrics_layout.addWidget(card)
+        
+        # Resumo por dia / cliente / funcionário (agregados incrementais)
+        self.resumo_label = QLabel("📅 Hoje: nenhum processamento")
+        self.resumo_label.setWordWrap(True)
+        self.resumo_label.setStyleSheet("""
+            QLabel {
+                background-color: white;
+                border: 1px solid #bdc3c7;
+                border-radius: 6px;
+                padding: 10px;
+                font-size: 12px;
+                color: #2c3e50;
+            }
+        """)
         
         # Área de histórico COM ID
         history_group = QGroupBox("📋 Histórico de Processamentos")
@@ -812,17 +884,53 @@ class MainWindow(QMainWindow):
         
         history_layout = QVBoxLayout()
         
-        # Mensagem inicial
-        initial_text = QLabel("Nenhum processamento realizado ainda.\n\nRealize a primeira detecção para ver estatísticas aqui.")
-        initial_text.setStyleSheet("color: #7f8c8d; font-size: 12px; padding: 20px; text-align: center;")
-        initial_text.setAlignment(Qt.AlignCenter)
-        history_layout.addWidget(initial_text)
+        # Lista virtualizada: páginas lidas do banco conforme a rolagem
+        self.history_panel = HistoryPanel(self.history_store)
+        self.history_panel.view.doubleClicked.connect(self.abrir_registro)
+        self.history_panel.view.setToolTip("Duplo clique para reabrir o resultado")
+        history_layout.addWidget(self.history_panel)
         
         history_group.setLayout(history_layout)
         
+        # Exportação do histórico completo (lido do banco em páginas)
+        export_container = QWidget()
+        export_layout = QHBoxLayout(export_container)
+        export_layout.addStretch()
+        
+        btn_exportar = QPushButton("📤 Exportar Histórico (CSV)")
+        btn_exportar.clicked.connect(self.exportar_historico)
+        btn_exportar.setMinimumHeight(40)
+        btn_exportar.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                    stop:0 #34495e, stop:1 #2c3e50);
+                color: white;
+                border: none;
+                padding: 10px 16px;
+                font-size: 13px;
+                font-weight: bold;
+                border-radius: 6px;
+            }
+            QPushButton:hover {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                    stop:0 #2c3e50, stop:1 #1c2833);
+            }
+        """)
+        export_layout.addWidget(btn_exportar)
+
+        # Relatório consolidado (fechamento do mês) com os filtros do histórico
+        btn_consolidado = QPushButton("📑 Relatório Consolidado (PDF)")
+        btn_consolidado.clicked.connect(self.gerar_relatorio_consolidado)
+        btn_consolidado.setMinimumHeight(40)
+        btn_consolidado.setStyleSheet(btn_exportar.styleSheet())
+        btn_consolidado.setEnabled(self.report_worker is not None)
+        export_layout.addWidget(btn_consolidado)
+        
         layout.addWidget(header)
         layout.addWidget(metrics_container)
+        layout.addWidget(self.resumo_label)
         layout.addWidget(history_group)
+        layout.addWidget(export_container)
         layout.addStretch()
         
         self.tabs.addTab(tab_dashboard, "📊 Dashboard")
@@ -830,7 +938,9 @@ class MainWindow(QMainWindow):
     def exportar_historico(self):
         """Exporta o histórico para CSV"""
         try:
-            if not self.historico_processamentos:
+            # Garante que registros ainda na fila de escrita entrem na exportação
+            self.history_store.flush()
+            if not self.history_store.count():
                 QMessageBox.information(self, "Exportar", "Nenhum dado disponível para exportar.")
                 return
                 
@@ -841,10 +951,14 @@ class MainWindow(QMainWindow):
             if file_path:
                 import csv
                 with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                    fieldnames = ['timestamp', 'os_number', 'cliente', 'funcionario', 'esperado', 'detectado', 'status', 'tempo_processamento']
-                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                    fieldnames = ['timestamp', 'os_number', 'cliente', 'funcionario', 'esperado', 'detectado', 'status',
+                                  'tempo_processamento', 'imagem_path', 'betoneiras']
+                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
                     writer.writeheader()
-                    for registro in self.historico_processamentos:
+                    for registro in self.history_store.iter_records():
+                        # Caixas de cada betoneira ("id:x1,y1,x2,y2;...") vindas do resultado compacto
+                        resultado = record_result(registro)
+                        registro['betoneiras'] = format_boxes(resultado) if resultado else ""
                         writer.writerow(registro)
                         
                 QMessageBox.information(self, "Sucesso", f"Histórico exportado:\n{file_path}")
@@ -852,6 +966,17 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Erro", f"Falha ao exportar histórico:\n{str(e)}")
 
+    def gerar_relatorio_consolidado(self):
+        """Um único PDF com todas as O.S. do histórico (filtros atuais do painel)"""
+        filters = dict(self.history_panel.model.filters)
+        self.history_store.flush()
+        total = self.history_store.count(filters)
+        if not total:
+            QMessageBox.information(self, "Relatório", "Nenhum registro no histórico para os filtros atuais.")
+            return
+        self.report_worker.submit_batch(self.generate_batch_report, self.history_store, filters)
+        self.status_label.setText(f"⏳ Gerando relatório consolidado de {total} O.S. em segundo plano...")
+
     def validar_os(self):
         """Valida e processa os dados da Ordem de Serviço"""
         if not all([
@@ -880,39 +1005,82 @@ class MainWindow(QMainWindow):
             'data_cadastro': datetime.now().strftime("%d/%m/%Y %H:%M:%S")
         }
         
+        # Câmera fixa: habilita o modelo de fundo (só regiões alteradas são reprocessadas)
+        camera_id = self.camera_input.text().strip()
+        if camera_id:
+            self.os_data['camera_id'] = camera_id
+        
         self.tabs.setCurrentIndex(1)
         self.statusBar().showMessage(f"O.S. {self.os_data['numero_os']} cadastrada - Aguardando imagem...")
         QMessageBox.information(self, "Sucesso", "✅ O.S. cadastrada com sucesso!\n\nAgora selecione uma imagem para processar.")
 
     def upload_image(self):
-        """Faz upload da imagem para processamento"""
-        file_path, _ = QFileDialog.getOpenFileName(
+        """Faz upload das fotos da O.S. (uma ou várias) para processamento"""
+        file_paths, _ = QFileDialog.getOpenFileNames(
             self, 
-            "Selecionar Imagem", 
+            "Selecionar Imagens da O.S.", 
             "", 
             "Imagens (*.jpg *.jpeg *.png *.bmp *.tiff)"
         )
         
-        if file_path:
+        if file_paths:
+            file_path = file_paths[0]
+            self.image_paths = file_paths
             self.image_path = file_path
-            filename = os.path.basename(file_path)
-            self.image_path_label.setText(f"📷 Imagem: {filename}\n📍 {file_path}")
+            if len(file_paths) == 1:
+                filename = os.path.basename(file_path)
+                self.image_path_label.setText(f"📷 Imagem: {filename}\n📍 {file_path}")
+                self.status_label.setText("🟢 Imagem carregada - Pronto para detecção")
+            else:
+                nomes = "\n".join(f"📷 {os.path.basename(path)}" for path in file_paths)
+                self.image_path_label.setText(f"📸 {len(file_paths)} fotos (contagem única):\n{nomes}")
+                self.status_label.setText(f"🟢 {len(file_paths)} imagens carregadas - Pronto para detecção")
             self.btn_detect.setEnabled(True)
-            self.status_label.setText("🟢 Imagem carregada - Pronto para detecção")
             self.status_label.setStyleSheet("background-color: #d4edda; border: 2px solid #c3e6cb; color: #155724;")
             
-            # Exibir imagem original
-            pixmap = QPixmap(file_path)
-            if not pixmap.isNull():
-                # Redimensionar mantendo aspect ratio
-                pixmap = pixmap.scaled(300, 220, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                self.original_image_label.setPixmap(pixmap)
-                self.original_image_label.setText("")
+            # Exibir imagem original (miniatura decodificada em segundo plano)
+            self.original_image_label.setText("⏳ Carregando imagem...")
+            self.pedir_miniatura('original', path=file_path)
+
+    def abrir_visualizador(self):
+        """Abre o resultado atual no visualizador com zoom (uma janela por clique)"""
+        results = self.current_results
+        if not results:
+            return
+        betoneiras = results.get('betoneiras', [])
+        if results.get('imagens'):
+            sources = [(f"Foto {i + 1}: {os.path.basename(foto['image_path'])}", foto['image_path'],
+                        [bet for bet in betoneiras if bet.get('imagem') == i])
+                       for i, foto in enumerate(results['imagens'])]
+        elif results.get('image_path'):
+            sources = [(os.path.basename(results['image_path']), results['image_path'], betoneiras)]
+        else:
+            return
+        ResultViewerDialog(sources, parent=self).show()
+
+    def pedir_miniatura(self, role, path=None, results=None):
+        """Pede a miniatura de um rótulo; só o pedido mais recente é exibido"""
+        self.thumbnail_seq += 1
+        tag = f"{role}:{self.thumbnail_seq}"
+        self.thumbnail_tags[role] = tag
+        if path is not None:
+            self.thumbnails.request_path(tag, path)
+        else:
+            self.thumbnails.request_result(tag, results)
+
+    def on_thumbnail_ready(self, tag, image):
+        labels = {'original': self.original_image_label, 'processada': self.processed_image_label}
+        for role, label in labels.items():
+            if self.thumbnail_tags.get(role) != tag:
+                continue
+            if image.isNull():
+                label.setText("❌ Erro ao carregar imagem")
             else:
-                self.original_image_label.setText("❌ Erro ao carregar imagem")
+                label.setPixmap(QPixmap.fromImage(image))
+                label.setText("")
 
-    def detect_betoneiras(self):
-        """Executa a detecção de betoneiras na imagem"""
+    def detect_betoneiras(self, reuse_duplicates=True):
+        """Enfileira a detecção da imagem atual para a O.S. atual"""
         if not hasattr(self, 'image_path'):
             QMessageBox.warning(self, "Aviso", "❌ Selecione uma imagem primeiro!")
             return
@@ -920,70 +1088,238 @@ class MainWindow(QMainWindow):
         if not self.detector:
             QMessageBox.warning(self, "Aviso", "❌ Detector não disponível!")
             return
-            
+        
+        self.enfileirar_deteccao(getattr(self, 'image_paths', [self.image_path]), self.os_data, reuse_duplicates)
+
+    def enfileirar_deteccao(self, image_paths, os_data, reuse_duplicates=True):
+        """Envia a O.S. e suas fotos para a fila (não bloqueia o operador)"""
+        job = self.job_queue.submit(image_paths, os_data,
+                                    profile=self.profile_combo.currentData(),
+                                    reuse_duplicates=reuse_duplicates)
+        self.statusBar().showMessage(f"📥 Trabalho #{job.id} enfileirado: O.S. {os_data.get('numero_os', 'N/A')}")
+        self.atualizar_progresso_fila()
+        return job
+
+    def criar_painel_fila(self):
+        """Lista de trabalhos da fila com progresso e cancelamento"""
+        queue_group = QGroupBox("📥 Fila de Detecções")
+        queue_group.setStyleSheet("""
+            QGroupBox {
+                font-weight: bold;
+                border: 2px solid #2980b9;
+                border-radius: 8px;
+                margin-top: 8px;
+                padding-top: 12px;
+                background-color: #ebf5fb;
+            }
+            QGroupBox::title {
+                color: #1f618d;
+            }
+        """)
+        queue_layout = QVBoxLayout()
+        
+        self.job_model = JobTableModel(self.job_queue, self)
+        self.job_view = QTableView()
+        self.job_view.setModel(self.job_model)
+        self.job_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.job_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.job_view.verticalHeader().setVisible(False)
+        self.job_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.job_view.horizontalHeader().setStretchLastSection(True)
+        self.job_view.setMinimumHeight(150)
+        self.job_view.doubleClicked.connect(self.mostrar_trabalho)
+        
+        buttons = QHBoxLayout()
+        btn_cancelar = QPushButton("⛔ Cancelar Selecionados")
+        btn_cancelar.clicked.connect(self.cancelar_trabalhos)
+        btn_limpar = QPushButton("🧹 Limpar Finalizados")
+        btn_limpar.clicked.connect(self.job_model.clear_finished)
+        buttons.addWidget(btn_cancelar)
+        buttons.addWidget(btn_limpar)
+        
+        queue_layout.addWidget(self.job_view)
+        queue_layout.addLayout(buttons)
+        queue_group.setLayout(queue_layout)
+        return queue_group
+
+    def cancelar_trabalhos(self):
+        """Cancela os trabalhos selecionados na fila"""
+        rows = {index.row() for index in self.job_view.selectionModel().selectedRows()}
+        for row in rows:
+            job = self.job_model.job_at(row)
+            if job is not None:
+                self.job_queue.cancel(job.id)
+        self.atualizar_progresso_fila()
+        self.fila_esvaziou()
+
+    def mostrar_trabalho(self, index):
+        """Duplo clique: exibe o resultado de um trabalho concluído"""
+        job = self.job_model.job_at(index.row())
+        if job is not None and job.result is not None:
+            self.exibir_resultado(job.result, job.os_data)
+
+    def abrir_registro(self, index):
+        """Duplo clique no histórico: reabre o resultado guardado (sem nova detecção)"""
+        registro = self.history_panel.model.record(index.row())
+        results = record_result(registro)
+        if results is None:
+            QMessageBox.information(self, "Histórico",
+                                    "Este registro é anterior ao armazenamento dos resultados completos.")
+            return
+        preview_path = None
+        if self.artifact_store:
+            # Fotos apontam para as cópias guardadas, mesmo que a original tenha sumido
+            results = self.artifact_store.restore(results)
+            preview_path = self.artifact_store.preview_path(results)
+        os_data = {
+            'numero_os': registro['os_number'],
+            'cliente': registro['cliente'],
+            'funcionario': registro['funcionario'],
+            'quantidade_esperada': registro['esperado'],
+        }
+        self.exibir_resultado(results, os_data, preview_path)
+        fotos = results.get('imagens') or [results]
+        if fotos[0].get('image_path'):
+            self.pedir_miniatura('original', path=fotos[0]['image_path'])
+        self.tabs.setCurrentIndex(1)
+        self.statusBar().showMessage(f"Resultado da O.S. {registro['os_number']} de {registro['timestamp']}")
+
+    def atualizar_progresso_fila(self, *args):
+        """Barra de progresso = trabalhos finalizados / enviados desde a última fila vazia"""
+        counts = self.job_queue.counts()
+        ativos = counts['na_fila'] + counts['processando']
+        if not ativos:
+            self.progress_bar.setVisible(False)
+            self.lote_inicio = sum(counts.values())
+            return
+        total = sum(counts.values()) - getattr(self, 'lote_inicio', 0)
         self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, 0)
-        self.btn_detect.setEnabled(False)
-        self.btn_pdf.setEnabled(False)
-        self.status_label.setText("🔄 Processando imagem...\n• Pré-processamento\n• Detecção por IA\n• Análise de cores")
-        self.status_label.setStyleSheet("background-color: #fff3cd; border: 2px solid #ffeaa7; color: #856404;")
-        
-        self.detection_thread = DetectionThread(self.detector, self.image_path, self.os_data)
-        self.detection_thread.finished.connect(self.on_detection_finished)
-        self.detection_thread.error.connect(self.on_detection_error)
-        self.detection_thread.progress.connect(self.on_detection_progress)
-        self.detection_thread.start()
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(total - ativos)
+        self.progress_bar.setFormat(f"%v/%m concluídos • {counts['processando']} em processamento")
 
-    def on_detection_progress(self, message):
-        """Atualiza o status durante o processamento"""
-        self.status_label.setText(message)
+    def on_job_finished(self, job):
+        """Resultado de um trabalho da fila (pode chegar fora de ordem)"""
+        self.on_detection_finished(job.result, job)
+        self.fila_esvaziou()
 
-    def on_detection_finished(self, results):
+    def on_job_failed(self, job):
+        self.on_detection_error(job.error, job)
+        self.fila_esvaziou()
+
+    def fila_esvaziou(self):
+        """Perguntas adiadas (duplicatas) só quando não há mais trabalhos ativos"""
+        if self.duplicatas_pendentes and self.job_queue.pending_count() == 0:
+            self.confirmar_duplicatas()
+
+    def on_detection_finished(self, results, job):
         """Processa os resultados da detecção e atualiza histórico"""
-        self.progress_bar.setVisible(False)
-        self.btn_detect.setEnabled(True)
-        self.current_results = results
+        fila_vazia = self.job_queue.pending_count() == 0
         
-        # Exibir imagem processada
-        processed_image = results.get('processed_image')
-        if processed_image is not None:
-            rgb_image = cv2.cvtColor(processed_image, cv2.COLOR_BGR2RGB)
-            h, w, ch = rgb_image.shape
-            bytes_per_line = ch * w
-            qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(qt_image)
-            pixmap = pixmap.scaled(300, 220, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.processed_image_label.setPixmap(pixmap)
-            self.processed_image_label.setText("")
-        
-        # Dados para estatísticas
-        detected_count = results.get('total_detected', 0)
-        expected_count = self.os_data.get('quantidade_esperada', 0)
-        analysis_time = results.get('analysis_time', 0)
-        status = "SUCESSO" if detected_count == expected_count else "INCONSISTENTE"
+        # Imagem barrada no portão de qualidade: nada foi detectado nem gasto
+        quality = results.get('quality') or {}
+        if results.get('rejected'):
+            motivos = "\n• ".join(quality.get('motivos', []))
+            self.status_label.setText(f"⛔ Imagem rejeitada:\n• {motivos}")
+            self.status_label.setStyleSheet("background-color: #f8d7da; border: 2px solid #f5c6cb; color: #721c24;")
+            self.statusBar().showMessage(f"Trabalho #{job.id}: imagem rejeitada no controle de qualidade")
+            if fila_vazia:
+                QMessageBox.warning(self, "Imagem Rejeitada",
+                                    f"⛔ A imagem não tem qualidade suficiente para detecção:\n\n• {motivos}\n\n"
+                                    f"Tire uma nova foto e tente novamente.")
+            return
+        
+        # Foto quase idêntica a uma já processada: a pergunta espera a fila esvaziar
+        if results.get('duplicate_of'):
+            self.duplicatas_pendentes.append((results, job))
+            self.statusBar().showMessage(f"Trabalho #{job.id}: imagem quase idêntica a uma já processada "
+                                         f"(confirmação ao fim da fila)")
+            return
+        
+        self.registrar_resultado(results, job, mostrar_conclusao=fila_vazia)
+
+    def confirmar_duplicatas(self):
+        """Pergunta, com a fila vazia, se cada duplicata reaproveita o resultado anterior"""
+        if self.confirmando_duplicatas:
+            return
+        self.confirmando_duplicatas = True
+        try:
+            while self.duplicatas_pendentes:
+                results, job = self.duplicatas_pendentes.pop(0)
+                duplicate = results['duplicate_of']
+                resposta = QMessageBox.question(
+                    self, "Imagem Já Processada",
+                    f"🧬 A imagem da O.S. {job.os_data.get('numero_os', 'N/A')} é quase idêntica a uma já processada:\n\n"
+                    f"📷 {os.path.basename(duplicate['image_path'])}\n"
+                    f"📅 {duplicate['timestamp']}\n\n"
+                    f"Usar o resultado anterior ({results.get('total_detected', 0)} betoneiras)?\n"
+                    f"Escolha 'Não' para processar novamente.",
+                    QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes
+                )
+                if resposta == QMessageBox.No:
+                    self.enfileirar_deteccao(job.image_paths, job.os_data, reuse_duplicates=False)
+                else:
+                    self.registrar_resultado(results, job, mostrar_conclusao=False)
+        finally:
+            self.confirmando_duplicatas = False
+
+    def registrar_resultado(self, results, job, mostrar_conclusao):
+        """Grava no histórico e exibe um resultado aceito"""
+        os_data = job.os_data
         
         # NOVO: Salvar no histórico
-        registro_historico = {
-            'timestamp': datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
-            'os_number': self.os_data.get('numero_os', 'N/A'),
-            'cliente': self.os_data.get('cliente', 'N/A'),
-            'funcionario': self.os_data.get('funcionario', 'N/A'),
-            'esperado': expected_count,
-            'detectado': detected_count,
-            'status': status,
-            'tempo_processamento': analysis_time,
-            'imagem_path': getattr(self, 'image_path', 'N/A')
-        }
+        registro_historico = make_record(os_data, results, job.image_paths)
+        detected_count = registro_historico['detectado']
+        expected_count = registro_historico['esperado']
+        status = registro_historico['status']
         
-        self.historico_processamentos.append(registro_historico)
-        self.total_processamentos += 1
+        self.history_store.add(registro_historico)
+        self.history_panel.append_record(registro_historico)
         
-        if status == "SUCESSO":
-            self.deteccoes_bem_sucedidas += 1
+        self.exibir_resultado(results, os_data)
+        self.statusBar().showMessage(f"Trabalho #{job.id} concluído: {detected_count} betoneiras detectadas "
+                                     f"(O.S. {os_data.get('numero_os', 'N/A')})")
+        
+        # NOVO: Atualizar dashboard automaticamente
+        self.atualizar_dashboard()
+        
+        # Mensagem de conclusão só quando a fila esvazia (não interrompe o lote)
+        if not mostrar_conclusao:
+            return
+        
+        # NOVO: Mostrar mensagem de sucesso com link para dashboard
+        msg = QMessageBox()
+        msg.setIcon(QMessageBox.Information)
+        msg.setWindowTitle("Processamento Concluído")
+        msg.setText(f"✅ Detecção concluída com sucesso!\n\n"
+                    f"• {detected_count} betoneiras detectadas\n"
+                    f"• {expected_count} betoneiras esperadas\n"
+                    f"• Status: {status}\n\n"
+                    f"Clique em '📊 Dashboard' para ver estatísticas detalhadas.")
+        msg.addButton("Continuar", QMessageBox.AcceptRole)
+        dashboard_btn = msg.addButton("Ir para Dashboard", QMessageBox.ActionRole)
+        msg.exec_()
+        
+        if msg.clickedButton() == dashboard_btn:
+            self.tabs.setCurrentIndex(2)  # Vai para a dashboard
+
+    def exibir_resultado(self, results, os_data, preview_path=None):
+        """Mostra um resultado na aba de processamento (imagem, contagem e lista)"""
+        self.current_results = results
+        self.current_os_data = os_data
+        self.btn_ampliar.setEnabled(True)
+        quality = results.get('quality') or {}
+        
+        # Exibir imagem processada (anotada sob demanda, já no tamanho da miniatura;
+        # resultados do histórico usam a prévia guardada, sem redesenhar)
+        if preview_path:
+            self.pedir_miniatura('processada', path=preview_path)
         else:
-            self.inconsistencias += 1
-            
-        self.tempo_total_processamento += analysis_time
+            self.pedir_miniatura('processada', results=results)
+        
+        detected_count = results.get('total_detected', 0)
+        expected_count = os_data.get('quantidade_esperada', 0)
+        analysis_time = results.get('analysis_time', 0)
         
         # Atualizar estatísticas na aba de processamento
         self.count_label.setText(f"Betoneiras detectadas: {detected_count}")
@@ -1003,8 +1339,17 @@ class MainWindow(QMainWindow):
             self.status_label.setText("🔴 STATUS: INCONSISTENTE - Quantidade incorreta")
             self.status_label.setStyleSheet("background-color: #f8d7da; border: 2px solid #f5c6cb; color: #721c24;")
         
+        # Alertas de qualidade (imagem processada, mas com ressalvas)
+        if quality.get('alertas'):
+            alertas = "\n".join(f"⚠️ {alerta}" for alerta in quality['alertas'])
+            self.status_label.setText(f"{self.status_label.text()}\n{alertas}")
+        
         # Listar betoneiras detectadas
         self.betoneiras_list.clear()
+        for i, imagem in enumerate(results.get('imagens', []), 1):
+            situacao = "⛔ rejeitada" if imagem['rejected'] else (
+                f"{imagem['total_detected']} detectadas, {imagem['duplicadas']} repetidas")
+            self.betoneiras_list.addItem(f"📸 Foto {i} ({os.path.basename(imagem['image_path'])}): {situacao}")
         betoneiras = results.get('betoneiras', [])
         for betoneira in betoneiras:
             detection_type = " [LOCAL]" if betoneira.get('local_detection', False) else ""
@@ -1013,207 +1358,49 @@ class MainWindow(QMainWindow):
             self.betoneiras_list.addItem(item_text)
             
         self.btn_pdf.setEnabled(True)
-        self.statusBar().showMessage(f"Processamento concluído: {detected_count} betoneiras detectadas")
-        
-        # NOVO: Atualizar dashboard automaticamente
-        self.atualizar_dashboard()
-        
-        # NOVO: Mostrar mensagem de sucesso com link para dashboard
-        msg = QMessageBox()
-        msg.setIcon(QMessageBox.Information)
-        msg.setWindowTitle("Processamento Concluído")
-        msg.setText(f"✅ Detecção concluída com sucesso!\n\n"
-                    f"• {detected_count} betoneiras detectadas\n"
-                    f"• {expected_count} betoneiras esperadas\n"
-                    f"• Status: {status}\n\n"
-                    f"Clique em '📊 Dashboard' para ver estatísticas detalhadas.")
-        msg.addButton("Continuar", QMessageBox.AcceptRole)
-        dashboard_btn = msg.addButton("Ir para Dashboard", QMessageBox.ActionRole)
-        msg.exec_()
-        
-        if msg.clickedButton() == dashboard_btn:
-            self.tabs.setCurrentIndex(2)  # Vai para a dashboard
-
-
 
     def atualizar_dashboard(self):
-        """Atualiza a dashboard com estatísticas em tempo real"""
+        """Agenda a atualização da dashboard (resultados em sequência viram uma só)"""
+        self.metrics.notify()
+
+    def on_metrics_changed(self, values):
+        """Atualiza cartões e resumo no lugar, sem recriar widgets"""
         try:
-            # Atualizar métricas principais
-            tempo_medio = self.tempo_total_processamento / max(1, self.total_processamentos)
-            
-            # Encontrar os widgets de métricas
-            metrics_container = self.findChild(QWidget, "metrics_container")
-            if not metrics_container:
-                return
-                
-            # Atualizar valores das métricas
-            metrics = [
-                ("📈 Total Processado", str(self.total_processamentos), "#3498db"),
-                ("✅ Detecções Bem-sucedidas", str(self.deteccoes_bem_sucedidas), "#27ae60"), 
-                ("⚠️ Inconsistências", str(self.inconsistencias), "#e74c3c"),
-                ("⏱️ Tempo Médio", f"{tempo_medio:.1f}s", "#f39c12")
-            ]
+            for card in self.metric_cards:
+                card.update_value(values)
             
-            # Limpar container existente
-            for i in reversed(range(metrics_container.layout().count())):
-                widget = metrics_container.layout().itemAt(i).widget()
-                if widget:
-                    widget.deleteLater()
-            
-            # Recriar métricas atualizadas
-            for title, value, color in metrics:
-                metric_widget = QWidget()
-                metric_widget.setStyleSheet(f"""
-                    QWidget {{
-                        background-color: {color};
-                        border-radius: 8px;
-                        padding: 12px;
-                        min-width: 120px;
-                    }}
-                """)
-                metric_layout = QVBoxLayout(metric_widget)
-                
-                title_label = QLabel(title)
-                title_label.setStyleSheet("color: white; font-size: 12px; font-weight: bold;")
-                title_label.setAlignment(Qt.AlignCenter)
-                title_label.setWordWrap(True)
-                
-                value_label = QLabel(value)
-                value_label.setStyleSheet("color: white; font-size: 18px; font-weight: bold;")
-                value_label.setAlignment(Qt.AlignCenter)
-                
-                metric_layout.addWidget(title_label)
-                metric_layout.addWidget(value_label)
-                metrics_container.layout().addWidget(metric_widget)
-            
-            # Atualizar histórico na interface
-            self.atualizar_historico_interface()
+            # Resumo por dia, cliente e funcionário (consultas O(1) nos agregados)
+            self.atualizar_resumo_agregados()
 
         except Exception as e:
             print(f"⚠️ Erro ao atualizar dashboard: {e}")
 
 
-    def atualizar_historico_interface(self):
-        """Atualiza a exibição do histórico na dashboard"""
-        try:
-            # Encontrar o widget de histórico
-            history_widget = self.findChild(QGroupBox, "history_group")
-            if not history_widget:
-                return
-                
-            # Limpar layout existente
-            for i in reversed(range(history_widget.layout().count())):
-                item = history_widget.layout().itemAt(i)
-                if item.widget():
-                    item.widget().deleteLater()
-            
-            # Criar scroll area para histórico
-            scroll_area = QScrollArea()
-            scroll_area.setWidgetResizable(True)
-            scroll_area.setMaximumHeight(300)
-            scroll_area.setStyleSheet("border: none;")
-            
-            scroll_content = QWidget()
-            scroll_layout = QVBoxLayout(scroll_content)
-            scroll_layout.setSpacing(8)
-            
-            # Adicionar título
-            title_label = QLabel("📋 Últimos Processamentos")
-            title_label.setStyleSheet("font-weight: bold; font-size: 14px; color: #2c3e50;")
-            scroll_layout.addWidget(title_label)
-            
-            # Adicionar itens do histórico (últimos 10)
-            historico_recente = self.historico_processamentos[-10:]  # Últimos 10 registros
-            
-            if not historico_recente:
-                empty_label = QLabel("Nenhum processamento realizado ainda.")
-                empty_label.setStyleSheet("color: #7f8c8d; font-style: italic; padding: 10px;")
-                scroll_layout.addWidget(empty_label)
-            else:
-                for registro in reversed(historico_recente):  # Mais recentes primeiro
-                    historico_item = self.criar_widget_historico(registro)
-                    scroll_layout.addWidget(historico_item)
-            
-            scroll_layout.addStretch()
-            scroll_area.setWidget(scroll_content)
-            history_widget.layout().addWidget(scroll_area)
-            
-        except Exception as e:
-            print(f"⚠️ Erro ao atualizar histórico: {e}")
-
-
-    def criar_widget_historico(self, registro):
-        """Cria um widget individual para cada item do histórico"""
-        widget = QWidget()
-        widget.setStyleSheet("""
-            QWidget {
-                background-color: white;
-                border: 1px solid #bdc3c7;
-                border-radius: 6px;
-                padding: 8px;
-            }
-        """)
-        
-        layout = QVBoxLayout(widget)
-        
-        # Linha 1: O.S. e Status
-        linha1 = QHBoxLayout()
-        
-        os_label = QLabel(f"📄 O.S.: {registro['os_number']}")
-        os_label.setStyleSheet("font-weight: bold; color: #2c3e50;")
-        
-        status_label = QLabel(registro['status'])
-        status_style = "color: #27ae60;" if registro['status'] == "SUCESSO" else "color: #e74c3c;"
-        status_label.setStyleSheet(f"font-weight: bold; {status_style}")
-        
-        linha1.addWidget(os_label)
-        linha1.addStretch()
-        linha1.addWidget(status_label)
-        
-        # Linha 2: Cliente e Funcionário
-        linha2 = QHBoxLayout()
-        
-        cliente_label = QLabel(f"🏢 {registro['cliente']}")
-        cliente_label.setStyleSheet("color: #34495e; font-size: 11px;")
-        
-        func_label = QLabel(f"👤 {registro['funcionario']}")
-        func_label.setStyleSheet("color: #34495e; font-size: 11px;")
-        
-        linha2.addWidget(cliente_label)
-        linha2.addStretch()
-        linha2.addWidget(func_label)
-        
-        # Linha 3: Estatísticas
-        linha3 = QHBoxLayout()
-        
-        stats_label = QLabel(f"🎯 {registro['detectado']}/{registro['esperado']} betoneiras")
-        stats_label.setStyleSheet("color: #7f8c8d; font-size: 10px;")
-        
-        time_label = QLabel(f"⏱️ {registro['tempo_processamento']}s")
-        time_label.setStyleSheet("color: #7f8c8d; font-size: 10px;")
-        
-        date_label = QLabel(f"📅 {registro['timestamp']}")
-        date_label.setStyleSheet("color: #7f8c8d; font-size: 10px;")
-        
-        linha3.addWidget(stats_label)
-        linha3.addWidget(time_label)
-        linha3.addStretch()
-        linha3.addWidget(date_label)
-        
-        layout.addLayout(linha1)
-        layout.addLayout(linha2)
-        layout.addLayout(linha3)
-        
-        return widget
+    def atualizar_resumo_agregados(self):
+        """Mostra os agregados de hoje, do cliente e do funcionário atuais"""
+        def resumo(titulo, agregado):
+            if not agregado['total']:
+                return f"{titulo}: nenhum processamento"
+            return (f"{titulo}: {agregado['total']} processamentos • "
+                    f"{agregado['taxa_sucesso']:.0%} OK • "
+                    f"{agregado['inconsistencias']} inconsistências • "
+                    f"⏱️ {agregado['tempo_medio']:.1f}s em média")
+        
+        linhas = [resumo("📅 Hoje", self.history_store.rollup('dia', datetime.now().strftime("%Y-%m-%d")))]
+        if self.os_data.get('cliente'):
+            linhas.append(resumo(f"🏢 {self.os_data['cliente']}",
+                                 self.history_store.rollup('cliente', self.os_data['cliente'])))
+        if self.os_data.get('funcionario'):
+            linhas.append(resumo(f"👤 {self.os_data['funcionario']}",
+                                 self.history_store.rollup('funcionario', self.os_data['funcionario'])))
+        self.resumo_label.setText("\n".join(linhas))
 
-    def on_detection_error(self, error_msg):
+    def on_detection_error(self, error_msg, job):
         """Trata erros durante a detecção"""
-        self.progress_bar.setVisible(False)
-        self.btn_detect.setEnabled(True)
-        self.status_label.setText(f"❌ Erro na detecção: {error_msg}")
+        self.status_label.setText(f"❌ Erro na detecção (trabalho #{job.id}): {error_msg}")
         self.status_label.setStyleSheet("background-color: #f8d7da; border: 2px solid #f5c6cb; color: #721c24;")
-        QMessageBox.critical(self, "Erro", f"Falha na detecção:\n{error_msg}")
+        if self.job_queue.pending_count() == 0:
+            QMessageBox.critical(self, "Erro", f"Falha na detecção:\n{error_msg}")
 
     def gerar_relatorio_pdf(self):
         """Gera relatório PDF com os resultados"""
@@ -1221,18 +1408,32 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Aviso", "❌ Nenhum resultado disponível para gerar relatório!")
             return
             
-        try:
-            if self.generate_pdf_report:
-                # Usar a função importada
-                pdf_path = self.generate_pdf_report(self.current_results, self.os_data)
-                QMessageBox.information(self, "Sucesso", f"✅ Relatório PDF gerado:\n{pdf_path}")
-            else:
-                # Modo de demonstração
-                pdf_path = f"relatorio_{self.os_data['numero_os']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-                QMessageBox.information(self, "Demo", f"📄 Relatório demo criado:\n{pdf_path}\n\n(Modo demonstração - função PDF não disponível)")
-                
-        except Exception as e:
-            QMessageBox.critical(self, "Erro", f"❌ Falha ao gerar PDF:\n{str(e)}")
+        if self.report_worker:
+            # Geração em segundo plano; o aviso chega por on_report_finished
+            self.report_worker.submit(self.current_results, self.current_os_data)
+            self.btn_pdf.setText("⏳ Gerando Relatório PDF...")
+        else:
+            # Modo de demonstração
+            pdf_path = f"relatorio_{self.current_os_data.get('numero_os', 'N/A')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+            QMessageBox.information(self, "Demo", f"📄 Relatório demo criado:\n{pdf_path}\n\n(Modo demonstração - função PDF não disponível)")
+
+    def restaurar_botao_pdf(self):
+        if not self.report_worker.busy:
+            self.btn_pdf.setText("📄 Gerar Relatório PDF Completo")
+
+    def on_report_finished(self, pdf_path, os_data):
+        """Relatório pronto (sinal do ReportWorker)"""
+        self.restaurar_botao_pdf()
+        if os_data.get('consolidado'):
+            self.status_label.setText(f"📑 Relatório consolidado gerado: {pdf_path}")
+            QMessageBox.information(self, "Sucesso", f"✅ Relatório consolidado gerado:\n{pdf_path}")
+            return
+        QMessageBox.information(self, "Sucesso",
+                                f"✅ Relatório PDF da O.S. {os_data.get('numero_os', 'N/A')} gerado:\n{pdf_path}")
+
+    def on_report_error(self, error_msg, os_data):
+        self.restaurar_botao_pdf()
+        QMessageBox.critical(self, "Erro", f"❌ Falha ao gerar PDF:\n{error_msg}")
 
 # Função principal para executar a aplicação
 def main():
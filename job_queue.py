@@ -0,0 +1,327 @@
+# job_queue.py - FILA DE DETECÇÕES EM SEGUNDO PLANO
+'''
+📥 Fila de Trabalhos
+    Cada par O.S. + imagem(ns) vira um trabalho independente
+    Várias fotos da mesma O.S. formam um único trabalho (process_images)
+    O operador enfileira vários sem esperar o anterior terminar
+
+🧵 Pool Limitado (QThreadPool)
+    Número de trabalhadores = config.json ("fila" → "max_trabalhadores")
+    Padrão: núcleos disponíveis; trabalhos excedentes aguardam na fila
+
+📊 Progresso por Trabalho
+    Status: na fila → processando → concluído / erro / cancelado
+    Resultados chegam fora de ordem, cada um com a sua O.S.
+
+⛔ Cancelamento (cancellation.py)
+    Na fila: removido do pool sem executar
+    Em execução: o token interrompe process_image na próxima verificação
+    (ou abandona a chamada HTTP em andamento) e o trabalhador fica livre
+
+🗃️ Artefatos (artifact_store.py)
+    Foto e prévia anotada guardadas por hash na própria thread do trabalho,
+    antes do resultado chegar à interface
+'''
+import itertools
+import os
+import time
+
+from PyQt5.QtCore import (QObject, QRunnable, QThreadPool, QAbstractTableModel,
+                          QModelIndex, Qt, pyqtSignal)
+from PyQt5.QtGui import QColor
+
+from cancellation import CancellationToken, DetectionCancelled
+from config import load_config
+
+QUEUED = "na_fila"
+RUNNING = "processando"
+DONE = "concluido"
+FAILED = "erro"
+CANCELLED = "cancelado"
+
+STATUS_LABELS = {
+    QUEUED: "⏳ Na fila",
+    RUNNING: "🔄 Processando",
+    DONE: "✅ Concluído",
+    FAILED: "❌ Erro",
+    CANCELLED: "⛔ Cancelado",
+}
+
+STATUS_COLORS = {
+    QUEUED: "#7f8c8d",
+    RUNNING: "#2980b9",
+    DONE: "#27ae60",
+    FAILED: "#e74c3c",
+    CANCELLED: "#95a5a6",
+}
+
+_job_ids = itertools.count(1)
+
+
+class DetectionJob:
+    """Uma O.S. e suas fotos na fila"""
+
+    def __init__(self, image_paths, os_data, profile=None, reuse_duplicates=True):
+        self.id = next(_job_ids)
+        self.image_paths = [image_paths] if isinstance(image_paths, str) else list(image_paths)
+        self.image_path = self.image_paths[0]
+        self.os_data = dict(os_data)  # cópia: o formulário pode mudar enquanto processa
+        self.profile = profile
+        self.reuse_duplicates = reuse_duplicates
+        self.status = QUEUED
+        self.message = "Aguardando trabalhador livre"
+        self.percent = 0
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.token = CancellationToken()
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+
+class JobSignals(QObject):
+    """Sinais do QRunnable (QRunnable não é QObject)"""
+    started = pyqtSignal(int)
+    progress = pyqtSignal(int, str, int)
+    finished = pyqtSignal(int, dict)
+    error = pyqtSignal(int, str)
+    done = pyqtSignal(int)
+
+
+class DetectionRunnable(QRunnable):
+    """Executa process_image de um trabalho em uma thread do pool"""
+
+    def __init__(self, detector, job, artifact_store=None):
+        super().__init__()
+        self.setAutoDelete(False)  # a fila mantém a referência para tryTake()
+        self.detector = detector
+        self.job = job
+        self.artifact_store = artifact_store
+        self.signals = JobSignals()
+
+    def run(self):
+        job = self.job
+        try:
+            if job.cancelled:
+                return
+            self.signals.started.emit(job.id)
+            self.signals.progress.emit(job.id, "🔄 Iniciando pré-processamento...", 0)
+            options = dict(
+                reuse_duplicates=job.reuse_duplicates,
+                profile=job.profile,
+                cancel_token=job.token,
+                progress=lambda message, percent: self.signals.progress.emit(job.id, message, int(percent))
+            )
+            if len(job.image_paths) > 1:
+                results = self.detector.process_images(job.image_paths, job.os_data, **options)
+            else:
+                results = self.detector.process_image(job.image_path, job.os_data, **options)
+            if self.artifact_store and not results.get('rejected') and not job.cancelled:
+                try:
+                    self.artifact_store.archive(results, job.image_paths)
+                except Exception as e:
+                    print(f"⚠️  Artefatos do trabalho #{job.id} não guardados: {e}")
+            self.signals.finished.emit(job.id, results)
+        except DetectionCancelled:
+            pass
+        except Exception as e:
+            self.signals.error.emit(job.id, str(e))
+        finally:
+            self.signals.done.emit(job.id)
+
+
+class JobQueue(QObject):
+    """Fila de detecções sobre um QThreadPool limitado"""
+
+    job_added = pyqtSignal(object)
+    job_changed = pyqtSignal(object)
+    job_finished = pyqtSignal(object)
+    job_failed = pyqtSignal(object)
+
+    def __init__(self, detector, max_workers=None, parent=None, artifact_store=None):
+        super().__init__(parent)
+        self.detector = detector
+        self.artifact_store = artifact_store
+        self.pool = QThreadPool(self)
+        max_workers = max_workers or load_config()["fila"]["max_trabalhadores"] or os.cpu_count() or 2
+        self.pool.setMaxThreadCount(max_workers)
+        self.jobs = {}
+        self.runnables = {}
+        self.retired = []
+
+    # ==================== ENVIO ====================
+
+    def submit(self, image_paths, os_data, profile=None, reuse_duplicates=True):
+        """Enfileira um trabalho (uma foto ou lista de fotos) e retorna imediatamente"""
+        job = DetectionJob(image_paths, os_data, profile, reuse_duplicates)
+        runnable = DetectionRunnable(self.detector, job, self.artifact_store)
+        runnable.signals.started.connect(self._on_started)
+        runnable.signals.progress.connect(self._on_progress)
+        runnable.signals.finished.connect(self._on_finished)
+        runnable.signals.error.connect(self._on_error)
+        runnable.signals.done.connect(self._on_done)
+
+        self.jobs[job.id] = job
+        self.runnables[job.id] = runnable
+        self.job_added.emit(job)
+        self.pool.start(runnable)
+        return job
+
+    def cancel(self, job_id):
+        """Cancela um trabalho na fila ou em execução"""
+        job = self.jobs.get(job_id)
+        if job is None or not job.active:
+            return False
+        job.token.cancel()
+        runnable = self.runnables.get(job_id)
+        if job.status == QUEUED and runnable is not None and self.pool.tryTake(runnable):
+            job.message = "Removido da fila"
+            self.runnables.pop(job_id, None)
+        else:
+            job.message = "Interrompido em execução"
+        self._finish(job, CANCELLED)
+        return True
+
+    def cancel_all(self):
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+
+    def shutdown(self, timeout_ms=5000):
+        """Cancela pendências e aguarda os trabalhadores (fechamento da janela)"""
+        self.cancel_all()
+        self.pool.waitForDone(timeout_ms)
+
+    # ==================== ESTADO ====================
+
+    def pending_count(self):
+        return sum(1 for job in self.jobs.values() if job.active)
+
+    def counts(self):
+        counts = dict.fromkeys(STATUS_LABELS, 0)
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        return counts
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+        self.job_changed.emit(job)
+
+    def _on_done(self, job_id):
+        # "done" sai de dentro de run(): o runnable só é liberado quando
+        # nenhuma thread do pool está mais executando
+        self.retired.append(self.runnables.pop(job_id, None))
+        if self.pool.activeThreadCount() == 0:
+            self.retired.clear()
+
+    def _on_started(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.cancelled:
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.message = "Iniciado"
+        self.job_changed.emit(job)
+
+    def _on_progress(self, job_id, message, percent):
+        job = self.jobs.get(job_id)
+        if job is None or job.cancelled:
+            return
+        job.message = message
+        job.percent = percent
+        self.job_changed.emit(job)
+
+    def _on_finished(self, job_id, results):
+        job = self.jobs.get(job_id)
+        if job is None or job.cancelled:
+            return
+        job.result = results
+        job.message = f"{results.get('total_detected', 0)} betoneiras"
+        job.percent = 100
+        self._finish(job, DONE)
+        self.job_finished.emit(job)
+
+    def _on_error(self, job_id, error_msg):
+        job = self.jobs.get(job_id)
+        if job is None or job.cancelled:
+            return
+        job.error = error_msg
+        job.message = error_msg
+        self._finish(job, FAILED)
+        self.job_failed.emit(job)
+
+
+class JobTableModel(QAbstractTableModel):
+    """Trabalhos da fila para exibição (mais recente primeiro)"""
+
+    COLUMNS = ["#", "📄 O.S.", "📷 Imagem", "Status", "%", "Detalhe"]
+
+    def __init__(self, queue, parent=None):
+        super().__init__(parent)
+        self.queue = queue
+        self.rows = []
+        queue.job_added.connect(self.add_job)
+        queue.job_changed.connect(self.update_job)
+
+    def add_job(self, job):
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self.rows.insert(0, job)
+        self.endInsertRows()
+
+    def update_job(self, job):
+        for row, candidate in enumerate(self.rows):
+            if candidate is job:
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS) - 1))
+                return
+
+    def clear_finished(self):
+        self.beginResetModel()
+        self.rows = [job for job in self.rows if job.active]
+        self.endResetModel()
+
+    def job_at(self, row):
+        return self.rows[row] if 0 <= row < len(self.rows) else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        job = self.rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return str(job.id)
+            if column == 1:
+                return str(job.os_data.get('numero_os', 'N/A'))
+            if column == 2:
+                extra = f" (+{len(job.image_paths) - 1})" if len(job.image_paths) > 1 else ""
+                return os.path.basename(job.image_path) + extra
+            if column == 3:
+                return STATUS_LABELS[job.status]
+            if column == 4:
+                return f"{job.percent}%"
+            if column == 5:
+                return job.message
+        if role == Qt.ForegroundRole and column == 3:
+            return QColor(STATUS_COLORS[job.status])
+        if role == Qt.ToolTipRole:
+            return "\n".join(job.image_paths)
+        return None
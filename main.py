@@ -87,6 +87,8 @@ def main():
     os.makedirs('reports', exist_ok=True)
     os.makedirs('temp', exist_ok=True)
     os.makedirs('logs', exist_ok=True)
+    os.makedirs('cache', exist_ok=True)
+    os.makedirs('data', exist_ok=True)
     
     # ✅ 6. Importar e criar interface (com tratamento de erro)
     splash.showMessage("🎨 Carregando interface...", Qt.AlignBottom | Qt.AlignCenter, Qt.black)
@@ -122,6 +124,8 @@ def main():
         print(f"   • reports/ - Relatórios PDF") 
         print(f"   • temp/ - Arquivos temporários")
         print(f"   • logs/ - Logs do sistema")
+        print(f"   • cache/ - Índices e caches de processamento")
+        print(f"   • data/ - Histórico de processamentos (SQLite)")
         print("🔧 Módulos carregados:")
         print("   • Interface gráfica PyQt5")
         print("   • Visão computacional (OpenCV)")
@@ -0,0 +1,182 @@
+# memory_benchmark.py - PICO DE MEMÓRIA POR ETAPA DA DETECÇÃO
+'''
+📏 Medição
+    tracemalloc: pico de bytes alocados em cada etapa (arrays numpy/OpenCV)
+    RSS: memória residente do processo após cada etapa e pico do processo
+    (psutil se instalado; senão /proc ou resource, conforme o sistema)
+
+🧪 Etapas (as mesmas do run_pipeline, sem chamar a API)
+    leitura → qualidade → dhash → resolução de trabalho → ROI
+    → realce (cada etapa do grafo) → detecção local → codificação JPEG
+
+▶️ Uso
+    python memory_benchmark.py foto_48mp.jpg [--perfil maxima_deteccao] [--camera baia1]
+    Quanto menor o "× imagem", mais detecções cabem em paralelo
+'''
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import cv2
+
+from config import load_config
+from detector_roboflow_api import BetoneiraDetectorAPI
+from enhancement import enhance
+from image_quality import assess_image_quality
+from phash_index import dhash
+from profiles import get_profile
+from roi import get_roi
+
+# Importações condicionais: RSS por psutil (qualquer sistema) ou resource (Unix)
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+MB = 1024 * 1024
+
+
+def rss_mb():
+    """Memória residente atual do processo (None se indisponível)"""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss / MB
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / MB
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb():
+    """Maior RSS do processo até agora (None se indisponível)"""
+    if RESOURCE_AVAILABLE:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa em KB; macOS em bytes
+        return peak / MB if sys.platform == "darwin" else peak / 1024
+    if PSUTIL_AVAILABLE and hasattr(psutil.Process().memory_info(), "peak_wset"):
+        return psutil.Process().memory_info().peak_wset / MB  # Windows
+    return None
+
+
+class MemoryMeter:
+    """Registra tempo, pico alocado e RSS de cada etapa"""
+
+    def __init__(self):
+        self.rows = []
+
+    @contextmanager
+    def stage(self, name):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        yield
+        current, peak = tracemalloc.get_traced_memory()
+        self.rows.append({
+            'etapa': name,
+            'ms': (time.perf_counter() - start) * 1000,
+            'pico_mb': (peak - base) / MB,
+            'retido_mb': (current - base) / MB,
+            'rss_mb': rss_mb(),
+        })
+
+    def add(self, name, ms, pico_mb):
+        """Linha vinda de outro relatório (etapas do grafo de realce)"""
+        self.rows.append({'etapa': name, 'ms': ms, 'pico_mb': pico_mb, 'retido_mb': None, 'rss_mb': None})
+
+
+def benchmark_image(detector, image_path, profile, camera=None):
+    """Percorre as etapas locais do pipeline medindo a memória de cada uma"""
+    meter = MemoryMeter()
+    tracemalloc.start()
+    try:
+        with meter.stage("leitura"):
+            image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError("não foi possível carregar a imagem")
+        frame_mb = image.nbytes / MB
+
+        with meter.stage("qualidade"):
+            assess_image_quality(image)
+        with meter.stage("dhash"):
+            dhash(image)
+
+        work_scale = 1.0
+        max_side = profile['lado_trabalho']
+        with meter.stage("resolucao_trabalho"):
+            if max_side and max(image.shape[:2]) > max_side:
+                work_scale = max_side / max(image.shape[:2])
+                new_size = (int(image.shape[1] * work_scale), int(image.shape[0] * work_scale))
+                image = cv2.resize(image, new_size, interpolation=cv2.INTER_AREA)
+
+        roi = get_roi(camera)
+        if roi is not None:
+            with meter.stage("roi"):
+                image, _ = roi.apply(image)
+
+        preset = profile['realce'] or load_config()["realce"]["preset"]
+        with meter.stage(f"realce ({preset})"):
+            enhanced, _, report = enhance(image, preset)
+        # O grafo zera o pico a cada etapa: o pico do realce é o maior entre elas
+        meter.rows[-1]['pico_mb'] = max([meter.rows[-1]['pico_mb']] + [item.get('pico_mb', 0) for item in report])
+        for item in report:
+            meter.add(f"  └ {item['etapa']}", item['ms'], item.get('pico_mb'))
+
+        with meter.stage("deteccao_local"):
+            detector.hyper_local_detection(image, None, profile['estrategias_locais'],
+                                           area_scale=work_scale ** 2)
+        with meter.stage("codificacao_api"):
+            detector.source_bytes(enhanced, 100)
+        del enhanced, image
+
+        total_peak = max(row['pico_mb'] or 0 for row in meter.rows)
+    finally:
+        tracemalloc.stop()
+    return meter.rows, frame_mb, total_peak
+
+
+def print_report(image_path, rows, frame_mb, total_peak):
+    def fmt(value):
+        return f"{value:9.1f}" if value is not None else f"{'-':>9}"
+
+    print(f"\n📷 {os.path.basename(image_path)}: quadro BGR {frame_mb:.1f} MB")
+    print(f"{'etapa':<26}{'ms':>9}{'pico MB':>9}{'retido':>9}{'RSS MB':>9}")
+    for row in rows:
+        print(f"{row['etapa']:<26}{fmt(row['ms'])}{fmt(row['pico_mb'])}{fmt(row['retido_mb'])}{fmt(row['rss_mb'])}")
+    print(f"📈 Maior pico por etapa: {total_peak:.1f} MB ({total_peak / frame_mb:.1f}× imagem)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pico de memória por etapa da detecção (sem chamar a API)")
+    parser.add_argument("imagens", nargs="+")
+    parser.add_argument("--perfil", default=None)
+    parser.add_argument("--camera", default=None, help="aplica a ROI configurada para a câmera")
+    args = parser.parse_args()
+
+    if not hasattr(tracemalloc, "reset_peak"):
+        print("❌ Requer Python 3.9+ (tracemalloc.reset_peak)")
+        return
+    profile = get_profile(args.perfil)
+    detector = BetoneiraDetectorAPI()
+    print(f"🏎️  Perfil {profile['nome']}")
+    for image_path in args.imagens:
+        try:
+            print_report(image_path, *benchmark_image(detector, image_path, profile, args.camera))
+        except Exception as e:
+            print(f"❌ {image_path}: {e}")
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"\n🧠 Pico de RSS do processo: {peak:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# multi_image.py - VÁRIAS FOTOS POR O.S.
+'''
+📸 Fotos Complementares
+    Uma O.S. pode ter 2-3 fotos cobrindo o caminhão ou a pilha inteira
+    Cada foto é detectada em paralelo; a contagem é única para o conjunto
+
+🧩 Deduplicação Entre Fotos (ORB + Homografia)
+    Pontos ORB em resolução reduzida, razão de Lowe e RANSAC
+    Caixas de uma foto são projetadas na outra pela homografia
+    IoU alto com uma caixa da outra foto = a mesma betoneira
+    Fotos sem sobreposição (poucos inliers) não são comparadas
+
+🖼️ Resultado
+    Detecções únicas + repetidas ('duplicatas') com a foto de origem
+    Mosaico anotado desenhado sob demanda (annotation.py)
+    Total único comparado uma única vez com a quantidade esperada
+'''
+import cv2
+import numpy as np
+
+from config import load_config
+
+# ==================== CORRESPONDÊNCIA ====================
+
+def image_features(image_path, max_side):
+    """Pontos ORB em resolução reduzida; retorna (pontos, descritores, escala)"""
+    gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None
+    scale = 1.0
+    if max(gray.shape) > max_side:
+        scale = max_side / max(gray.shape)
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    orb = cv2.ORB_create(nfeatures=2000)
+    keypoints, descriptors = orb.detectAndCompute(gray, None)
+    if descriptors is None or len(keypoints) < 8:
+        return None
+    points = np.float32([kp.pt for kp in keypoints])
+    return points, descriptors, scale
+
+
+def find_homography(features_src, features_dst, min_inliers, ratio=0.75):
+    """Homografia da foto de origem para a de destino (coordenadas originais)"""
+    if features_src is None or features_dst is None:
+        return None
+    pts_src, desc_src, scale_src = features_src
+    pts_dst, desc_dst, scale_dst = features_dst
+
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+    pairs = matcher.knnMatch(desc_src, desc_dst, k=2)
+    good = [pair[0] for pair in pairs if len(pair) == 2 and pair[0].distance < ratio * pair[1].distance]
+    if len(good) < min_inliers:
+        return None
+
+    src = pts_src[[m.queryIdx for m in good]].reshape(-1, 1, 2)
+    dst = pts_dst[[m.trainIdx for m in good]].reshape(-1, 1, 2)
+    homography, inliers = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
+    if homography is None or int(inliers.sum()) < min_inliers:
+        return None
+    # Homografia espelhada/degenerada não é sobreposição real
+    if np.linalg.det(homography[:2, :2]) <= 0:
+        return None
+
+    # Leva da escala reduzida para as coordenadas das fotos originais
+    to_small = np.diag([scale_src, scale_src, 1.0])
+    to_full = np.diag([1.0 / scale_dst, 1.0 / scale_dst, 1.0])
+    return to_full @ homography @ to_small
+
+
+def project_box(bbox, homography):
+    """Retângulo envolvente da caixa projetada pela homografia"""
+    x1, y1, x2, y2 = bbox
+    corners = np.float32([[x1, y1], [x2, y1], [x2, y2], [x1, y2]]).reshape(-1, 1, 2)
+    projected = cv2.perspectiveTransform(corners, homography).reshape(-1, 2)
+    return (*projected.min(axis=0), *projected.max(axis=0))
+
+
+def box_iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+# ==================== MESCLA ====================
+
+def merge_image_results(image_paths, results, token=None):
+    """Junta os resultados das fotos de uma O.S. sem contar a mesma betoneira duas vezes"""
+    settings = load_config()["multi_imagem"]
+    valid = [i for i, result in enumerate(results) if not result.get('rejected')]
+
+    features = {}
+    for i in valid:
+        if token is not None:
+            token.raise_if_cancelled()
+        features[i] = image_features(image_paths[i], settings["lado_correspondencia"])
+
+    homographies = {}
+    betoneiras = []
+    duplicatas = []
+    duplicates_per_image = {i: 0 for i in range(len(results))}
+    for position, i in enumerate(valid):
+        boxes = results[i]['betoneiras']
+        matched = {}  # betoneira da foto i -> "Fj:id" da mesma betoneira em uma foto anterior
+        for j in valid[:position] if boxes else []:
+            if (i, j) not in homographies:
+                if token is not None:
+                    token.raise_if_cancelled()
+                homographies[(i, j)] = find_homography(features[i], features[j], settings["min_inliers"])
+            homography = homographies[(i, j)]
+            if homography is None:
+                continue
+            candidates = []
+            for a, bet in enumerate(boxes):
+                if a in matched:
+                    continue
+                projected = project_box(bet['bbox'], homography)
+                for b, other in enumerate(results[j]['betoneiras']):
+                    iou = box_iou(projected, other['bbox'])
+                    if iou >= settings["iou_duplicata"]:
+                        candidates.append((iou, a, b))
+            # Atribuição gulosa por IoU: cada caixa da foto j responde por uma só caixa da
+            # foto i (betoneiras lado a lado não viram todas a mesma)
+            claimed = set()
+            for _, a, b in sorted(candidates, reverse=True):
+                if a in matched or b in claimed:
+                    continue
+                matched[a] = f"F{j + 1}:{results[j]['betoneiras'][b]['id']}"
+                claimed.add(b)
+
+        for a, bet in enumerate(boxes):
+            if a in matched:
+                duplicates_per_image[i] += 1
+                duplicatas.append({'imagem': i, 'bbox': bet['bbox'], 'de': matched[a]})
+                continue
+            betoneiras.append(dict(bet, id=f"F{i + 1}:{bet['id']}", imagem=i, imagem_path=image_paths[i]))
+
+    alertas, motivos = [], []
+    for i, result in enumerate(results):
+        quality = result.get('quality') or {}
+        alertas.extend(f"Foto {i + 1}: {alerta}" for alerta in quality.get('alertas', []))
+        if result.get('rejected'):
+            motivos.extend(f"Foto {i + 1}: {motivo}" for motivo in quality.get('motivos', []))
+
+    api_detections = sum(1 for bet in betoneiras if not bet.get('local_detection'))
+    duplicates = sum(duplicates_per_image.values())
+    print(f"🧩 {len(image_paths)} fotos: {len(betoneiras)} betoneiras únicas, "
+          f"{duplicates} repetidas entre fotos")
+    return {
+        'betoneiras': betoneiras,
+        'total_detected': len(betoneiras),
+        'analysis_time': 0.0,
+        'api_detections': api_detections,
+        'local_detections': len(betoneiras) - api_detections,
+        'api_used': api_detections > 0,
+        'reused_from_cache': all(results[i].get('reused_from_cache') for i in valid) if valid else False,
+        'rejected': not valid,
+        'quality': {'alertas': alertas, 'motivos': motivos},
+        'duplicadas_entre_imagens': duplicates,
+        'duplicatas': duplicatas,
+        'imagens': [
+            {
+                'image_path': image_paths[i],
+                'image_size': result.get('image_size'),
+                'total_detected': result.get('total_detected', 0),
+                'duplicadas': duplicates_per_image[i],
+                'rejected': bool(result.get('rejected')),
+            }
+            for i, result in enumerate(results)
+        ],
+    }
@@ -0,0 +1,185 @@
+# phash_index.py - ÍNDICE DE IMAGENS QUASE DUPLICADAS
+'''
+🧬 Hash Perceptual (dHash 64 bits)
+    Imagem reduzida para 9x8 em tons de cinza
+    Cada bit compara um pixel com o vizinho da direita
+    Sobrevive a recompressão (WhatsApp), redimensionamento e pequenos ajustes
+
+🔎 Busca por Distância de Hamming
+    Todos os hashes ficam em um vetor uint64
+    XOR + contagem de bits vetorizada sobre o índice inteiro
+
+♻️ Reaproveitamento
+    Foto quase idêntica a uma já processada devolve o resultado anterior
+    Caixas são reescaladas para a resolução da nova foto
+    Detecções gravadas como linhas do JSON compacto (result_schema.py)
+
+💾 Gravação em Segundo Plano
+    add() só marca o índice como alterado (não grava o arquivo inteiro)
+    Uma thread grava a cada "intervalo_gravacao" segundos, fora do lock da busca
+    close() (ou o encerramento do processo) grava o que faltar
+'''
+import atexit
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from config import load_config
+from result_schema import SCHEMA_VERSION, from_compact, to_compact
+
+# Contagem de bits por byte (popcount vetorizado sem depender do numpy 2)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def dhash(image, hash_size=8):
+    """dHash de 64 bits da imagem BGR"""
+    h, w = image.shape[:2]
+    # Amostragem por passo antes do resize para não varrer fotos enormes
+    step = max(1, min(h, w) // 256)
+    gray = cv2.cvtColor(image[::step, ::step], cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming_distances(hashes, value):
+    """Distância de Hamming entre um hash e todos os hashes do vetor"""
+    xor = np.bitwise_xor(hashes, np.uint64(value))
+    return _POPCOUNT[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class PerceptualHashIndex:
+    """Índice persistente de hashes perceptuais com os resultados associados"""
+
+    def __init__(self, path=None, max_distance=None, max_entries=None, persist=True, save_interval=None):
+        settings = load_config()["duplicatas"]
+        self.path = path or settings["arquivo"]
+        # persist=False: lê o índice do disco mas não grava (vários processos)
+        self.persist = persist
+        self.max_distance = settings["distancia_maxima"] if max_distance is None else max_distance
+        self.max_entries = max_entries or settings["max_entradas"]
+        self.save_interval = settings["intervalo_gravacao"] if save_interval is None else save_interval
+
+        self.entries = []
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.dirty = False
+        self.closed = threading.Event()
+        self.load()
+
+        if persist:
+            self.writer = threading.Thread(target=self._writer_loop, name="PhashWriter", daemon=True)
+            self.writer.start()
+            atexit.register(self.close)
+
+    def load(self):
+        """Carrega o índice do disco (índice vazio se não existir)"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+            self.hashes = np.array([int(e['hash'], 16) for e in self.entries], dtype=np.uint64)
+            print(f"🧬 Índice de duplicatas: {len(self.entries)} imagens")
+        except Exception as e:
+            print(f"⚠️  Índice de duplicatas corrompido, recriando: {e}")
+            self.entries = []
+            self.hashes = np.zeros(0, dtype=np.uint64)
+
+    def save(self, entries=None):
+        """Grava o índice de forma atômica"""
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries if entries is None else entries, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def flush(self):
+        """Grava o índice se houve inclusões desde a última gravação"""
+        if not self.persist:
+            return
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                entries = list(self.entries)  # entradas não mudam depois de incluídas
+                self.dirty = False
+            try:
+                self.save(entries)
+            except Exception as e:
+                print(f"⚠️  Erro ao salvar índice de duplicatas: {e}")
+                with self.lock:
+                    self.dirty = True
+
+    def close(self):
+        """Encerra a gravação periódica e grava o que faltar (idempotente)"""
+        self.closed.set()
+        self.flush()
+
+    def _writer_loop(self):
+        while not self.closed.wait(self.save_interval):
+            self.flush()
+
+    def find(self, image_hash, scope=None):
+        """Entrada mais parecida dentro do limite (ou None)"""
+        with self.lock:
+            if not len(self.hashes):
+                return None
+            distances = hamming_distances(self.hashes, image_hash)
+            for index in np.argsort(distances, kind="stable"):
+                distance = int(distances[index])
+                if distance > self.max_distance:
+                    return None
+                entry = self.entries[index]
+                if entry.get('scope') == scope:
+                    return dict(entry, betoneiras=entry_detections(entry), distance=distance)
+        return None
+
+    def add(self, image_hash, image_path, image_shape, results, scope=None):
+        """Registra uma imagem processada e o seu resultado"""
+        entry = {
+            'hash': f"{image_hash:016x}",
+            'image_path': image_path,
+            'timestamp': time.strftime("%d/%m/%Y %H:%M:%S"),
+            'size': [int(image_shape[1]), int(image_shape[0])],
+            'scope': scope,
+            'v': SCHEMA_VERSION,
+            'deteccoes': to_compact({'betoneiras': results.get('betoneiras', [])})['deteccoes']['linhas'],
+        }
+        with self.lock:
+            self.entries.append(entry)
+            self.hashes = np.append(self.hashes, np.uint64(image_hash))
+            if len(self.entries) > self.max_entries:
+                excess = len(self.entries) - self.max_entries
+                self.entries = self.entries[excess:]
+                self.hashes = self.hashes[excess:]
+            self.dirty = True
+
+
+def entry_detections(entry):
+    """Betoneiras de uma entrada (formato compacto ou o antigo, com dicts)"""
+    if 'deteccoes' in entry:
+        compact = {'v': entry['v'], 'deteccoes': {'linhas': entry['deteccoes']}}
+        return from_compact(compact)['betoneiras']
+    return entry.get('betoneiras', [])
+
+
+def rescale_detections(betoneiras, from_size, to_size):
+    """Reescala caixas de uma resolução (largura, altura) para outra"""
+    sx = to_size[0] / max(1, from_size[0])
+    sy = to_size[1] / max(1, from_size[1])
+    rescaled = []
+    for bet in betoneiras:
+        x1, y1, x2, y2 = bet['bbox']
+        rescaled.append(dict(bet, bbox=(int(x1 * sx), int(y1 * sy), int(x2 * sx), int(y2 * sy))))
+    return rescaled
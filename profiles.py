@@ -0,0 +1,67 @@
+# profiles.py - PERFIS DE DESEMPENHO DA DETECÇÃO
+'''
+🏎️ Perfis (latência x recall)
+    rapido: 1 tentativa de API, só detecção local por cor, imagem reduzida
+    balanceado: 3 tentativas, cor + forma, resolução intermediária
+    maxima_deteccao: comportamento original (4 tentativas, 3 estratégias,
+                     resolução total, confiança 0.1, realce completo)
+
+⚙️ Seleção
+    Por chamada: process_image(..., profile="rapido")
+    Interface: seletor de perfil na aba de processamento
+    Padrão: config.json ("perfil_padrao"); perfis extras em "perfis"
+'''
+from config import load_config
+
+# Estratégias de API disponíveis: original, enhanced, small, high_quality
+# Estratégias locais disponíveis: color, shape, size
+PROFILES = {
+    'rapido': {
+        'nome': '⚡ Rápido',
+        'estrategias_api': ['small'],
+        'estrategias_locais': ['color'],
+        'lado_trabalho': 1280,
+        'confianca_minima': 0.3,
+        'realce': 'rapido',
+        'pausa_entre_tentativas': 0,
+    },
+    'balanceado': {
+        'nome': '⚖️ Balanceado',
+        'estrategias_api': ['small', 'original', 'enhanced'],
+        'estrategias_locais': ['color', 'shape'],
+        'lado_trabalho': 2048,
+        'confianca_minima': 0.2,
+        'realce': 'balanceado',
+        'pausa_entre_tentativas': 0.5,
+    },
+    'maxima_deteccao': {
+        'nome': '🎯 Máxima Detecção',
+        'estrategias_api': ['original', 'enhanced', 'small', 'high_quality'],
+        'estrategias_locais': ['color', 'shape', 'size'],
+        'lado_trabalho': None,
+        'confianca_minima': 0.1,
+        'realce': None,  # None = preset de config.json ("realce" → "preset")
+        'pausa_entre_tentativas': 1,
+    },
+}
+
+
+def available_profiles():
+    """Perfis embutidos + perfis definidos em config.json"""
+    profiles = dict(PROFILES)
+    profiles.update(load_config()["perfis"])
+    return profiles
+
+
+def get_profile(name=None):
+    """Resolve um perfil pelo nome (None = perfil padrão da configuração)"""
+    if isinstance(name, dict):
+        return name
+    config = load_config()
+    profiles = available_profiles()
+    name = name or config["perfil_padrao"]
+    if name not in profiles:
+        print(f"⚠️  Perfil '{name}' não existe, usando 'maxima_deteccao'")
+        name = 'maxima_deteccao'
+    # Campos ausentes em perfis personalizados herdam do perfil de máxima detecção
+    return dict(PROFILES['maxima_deteccao'], **profiles[name], chave=name)
@@ -0,0 +1,183 @@
+# report_maintenance.py - MANUTENÇÃO DA PASTA DE RELATÓRIOS
+'''
+🗂️ Política de Retenção (config.json → "retencao_relatorios")
+    Relatórios mais antigos que "dias" são apagados
+    Acima de "max_total_mb", os mais antigos saem primeiro
+
+🗜️ Recompressão
+    Relatórios antigos (gerados antes do orçamento de tamanho) guardam a
+    foto na resolução da câmera; a imagem é reduzida ao tamanho impresso
+    com as mesmas regras de config.json → "relatorio"
+    Requer pikepdf (opcional); cada arquivo é marcado para não repetir
+
+▶️ Uso
+    python report_maintenance.py podar [--dias N] [--max-mb M] [--simular]
+    python report_maintenance.py recomprimir [--simular]
+    python report_maintenance.py tudo
+'''
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+from reportlab.lib.units import inch
+
+from config import load_config
+from utils import compress_image
+
+# Importação condicional: só a recompressão precisa do pikepdf
+try:
+    import pikepdf
+    PIKEPDF_AVAILABLE = True
+except ImportError:
+    PIKEPDF_AVAILABLE = False
+
+RECOMPRESSED_KEY = "/BetoneiraRecomprimido"
+
+
+def list_reports(folder):
+    """PDFs da pasta, do mais antigo para o mais novo: (caminho, tamanho, mtime)"""
+    reports = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(".pdf"):
+                stat = entry.stat()
+                reports.append((entry.path, stat.st_size, stat.st_mtime))
+    return sorted(reports, key=lambda item: item[2])
+
+
+def format_mb(size):
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+# ==================== PODA ====================
+
+def prune_reports(folder, max_age_days, max_total_mb, dry_run=False):
+    """Apaga por idade e depois por tamanho total; retorna (arquivos, bytes) removidos"""
+    reports = list_reports(folder)
+    cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+    total = sum(size for _, size, _ in reports)
+    limit = max_total_mb * 1024 * 1024 if max_total_mb else None
+
+    removed, freed = 0, 0
+    for path, size, mtime in reports:
+        too_old = cutoff is not None and mtime < cutoff
+        over_limit = limit is not None and total > limit
+        if not (too_old or over_limit):
+            continue
+        motivo = "antigo" if too_old else "acima do limite"
+        print(f"🗑️  {os.path.basename(path)} ({format_mb(size)}, {motivo})")
+        if not dry_run:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"⚠️  Não foi possível apagar {os.path.basename(path)}: {e}")
+                continue
+        total -= size
+        removed += 1
+        freed += size
+    return removed, freed
+
+
+# ==================== RECOMPRESSÃO ====================
+
+def _jpeg_images(page):
+    """Fotos JPEG (DCTDecode) desenhadas diretamente na página"""
+    xobjects = page.Resources.get("/XObject") or {}
+    for _, raw in xobjects.items():
+        if raw.get("/Subtype") != pikepdf.Name.Image or "/SMask" in raw:
+            continue
+        filters = raw.get("/Filter")
+        filters = list(filters) if isinstance(filters, pikepdf.Array) else [filters]
+        if pikepdf.Name.DCTDecode in filters:
+            yield raw
+
+
+def recompress_pdf(path, settings, dry_run=False):
+    """Reduz as fotos JPEG embutidas; retorna bytes economizados (estimados se simulado)"""
+    stat = os.stat(path)
+    with pikepdf.open(path, allow_overwriting_input=True) as pdf:
+        if RECOMPRESSED_KEY in pdf.docinfo:
+            return 0
+        estimated = 0
+        for page in pdf.pages:
+            for raw in _jpeg_images(page):
+                old_size = len(raw.read_raw_bytes())
+                # ReportLab grava [/ASCII85Decode /DCTDecode]; PdfImage trata os dois
+                rgb = np.asarray(pikepdf.PdfImage(raw).as_pil_image().convert("RGB"))
+                image = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+                new_data = compress_image(image, 6*inch, 4.5*inch, settings["dpi"], settings["qualidade"],
+                                          settings["qualidade_minima"], settings["orcamento_bytes"])
+                if len(new_data) >= old_size:
+                    continue
+                estimated += old_size - len(new_data)
+                if dry_run:
+                    continue
+                height, width = cv2.imdecode(np.frombuffer(new_data, np.uint8), cv2.IMREAD_GRAYSCALE).shape
+                raw.write(new_data, filter=pikepdf.Name.DCTDecode)
+                raw.Width, raw.Height = width, height
+                raw.ColorSpace = pikepdf.Name.DeviceRGB
+                raw.BitsPerComponent = 8
+                if "/DecodeParms" in raw:
+                    del raw["/DecodeParms"]
+
+        if dry_run:
+            return estimated
+        pdf.docinfo[RECOMPRESSED_KEY] = "1"
+        pdf.save(path, compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    # Mantém a data original: a poda por idade continua valendo
+    os.utime(path, (stat.st_atime, stat.st_mtime))
+    return max(0, stat.st_size - os.path.getsize(path))
+
+
+def recompress_reports(folder, min_age_days, dry_run=False):
+    """Recomprime relatórios mais antigos que min_age_days; retorna bytes economizados"""
+    if not PIKEPDF_AVAILABLE:
+        print("⚠️  Recompressão indisponível: instale 'pikepdf'")
+        return 0
+    settings = load_config()["relatorio"]
+    cutoff = time.time() - min_age_days * 86400
+    saved = 0
+    for path, size, mtime in list_reports(folder):
+        if mtime > cutoff:
+            continue
+        try:
+            economia = recompress_pdf(path, settings, dry_run)
+        except Exception as e:
+            print(f"⚠️  {os.path.basename(path)}: {e}")
+            continue
+        if economia:
+            print(f"🗜️  {os.path.basename(path)}: {format_mb(size)} → {format_mb(size - economia)}")
+        saved += economia
+    return saved
+
+
+def main():
+    settings = load_config()["retencao_relatorios"]
+    parser = argparse.ArgumentParser(description="Manutenção da pasta de relatórios PDF")
+    parser.add_argument("acao", choices=["podar", "recomprimir", "tudo"])
+    parser.add_argument("--pasta", default=settings["pasta"])
+    parser.add_argument("--dias", type=int, default=settings["dias"], help="idade máxima (0 = sem limite)")
+    parser.add_argument("--max-mb", type=float, default=settings["max_total_mb"], help="tamanho total máximo (0 = sem limite)")
+    parser.add_argument("--recomprimir-apos", type=int, default=settings["recomprimir_apos_dias"])
+    parser.add_argument("--simular", action="store_true", help="só mostra o que seria feito")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.pasta):
+        print(f"❌ Pasta não encontrada: {args.pasta}")
+        return
+    reports = list_reports(args.pasta)
+    print(f"📂 {args.pasta}: {len(reports)} relatórios, {format_mb(sum(size for _, size, _ in reports))}"
+          f"{' (simulação)' if args.simular else ''}")
+
+    if args.acao in ("recomprimir", "tudo"):
+        saved = recompress_reports(args.pasta, args.recomprimir_apos, args.simular)
+        print(f"🗜️  Recompressão: {format_mb(saved)} economizados")
+    if args.acao in ("podar", "tudo"):
+        removed, freed = prune_reports(args.pasta, args.dias, args.max_mb, args.simular)
+        print(f"🗑️  Poda: {removed} relatórios, {format_mb(freed)} liberados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# report_worker.py - RELATÓRIOS PDF EM SEGUNDO PLANO
+'''
+📄 Geração Fora da Thread da Interface
+    generate_pdf_report roda em um QThreadPool próprio (1 trabalhador)
+    A janela continua respondendo enquanto o ReportLab monta o documento
+    Conclusão/erro chegam por sinal, já na thread da interface
+
+📑 Relatório Consolidado
+    Várias O.S. do histórico em um único PDF (utils.generate_batch_report)
+    Usa a mesma fila, sem competir com o relatório individual
+
+📌 Instantâneo dos Dados
+    O pedido guarda os resultados e a O.S. do momento do clique;
+    uma detecção que termine nesse meio tempo não troca o relatório
+'''
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class ReportRunnable(QRunnable):
+    """Um pedido de relatório"""
+
+    def __init__(self, worker, generate, args, info):
+        super().__init__()
+        # Sinais ficam no ReportWorker (vive enquanto a janela existir)
+        self.worker = worker
+        self.generate = generate
+        self.args = args
+        self.info = info
+
+    def run(self):
+        try:
+            pdf_path = self.generate(*self.args)
+        except Exception as e:
+            self.worker._error.emit(str(e), self.info)
+            return
+        if pdf_path:
+            self.worker._finished.emit(pdf_path, self.info)
+        else:
+            self.worker._error.emit("o ReportLab não conseguiu montar o documento", self.info)
+
+
+class ReportWorker(QObject):
+    """Fila de relatórios PDF, um por vez"""
+
+    finished = pyqtSignal(str, dict)  # caminho do PDF, O.S. (ou filtros do consolidado)
+    error = pyqtSignal(str, dict)
+    _finished = pyqtSignal(str, dict)
+    _error = pyqtSignal(str, dict)
+
+    def __init__(self, generate, parent=None):
+        super().__init__(parent)
+        self.generate = generate
+        self._finished.connect(self._on_finished)
+        self._error.connect(self._on_error)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.pending = 0
+
+    def submit(self, results, os_data):
+        """Relatório de uma O.S."""
+        os_data = dict(os_data)
+        self._start(self.generate, (results, os_data), os_data)
+
+    def submit_batch(self, generate_batch, history_store, filters):
+        """Relatório consolidado de várias O.S. do histórico"""
+        filters = dict(filters)
+        self._start(generate_batch, (history_store, filters), dict(filters, consolidado=True))
+
+    def _start(self, generate, args, info):
+        self.pending += 1
+        self.pool.start(ReportRunnable(self, generate, args, info))
+
+    @property
+    def busy(self):
+        return self.pending > 0
+
+    def _on_finished(self, pdf_path, os_data):
+        self.pending -= 1
+        self.finished.emit(pdf_path, os_data)
+
+    def _on_error(self, message, os_data):
+        self.pending -= 1
+        self.error.emit(message, os_data)
+
+    def shutdown(self):
+        """Espera o relatório em andamento (chamado ao fechar a janela)"""
+        self.pool.waitForDone()
@@ -0,0 +1,253 @@
+# result_schema.py - FORMATO COMPACTO E VERSIONADO DO RESULTADO
+'''
+📐 Detecções como Registro Numpy
+    Um array estruturado (DETECTION_DTYPE) com uma linha por betoneira:
+    caixa int32, confiança float32, foto, origem e textos por índice
+    Cor, método e classe viram índices de uma tabela de textos do resultado
+
+📦 Binário (pack_result / unpack_result)
+    Cabeçalho struct: "BTR" + versão + tamanhos
+    Campos escalares do resultado em JSON curto + bytes dos arrays
+    Usado no histórico (coluna BLOB), no cache de duplicatas e entre processos
+
+📝 JSON Compacto (to_compact / from_compact)
+    Mesma estrutura em colunas + linhas, para .jsonl e arquivos de texto
+    Campo "v" com a versão; versões desconhecidas são recusadas
+
+↩️ Compatibilidade
+    unpack/from_compact devolvem o mesmo dicionário de sempre
+    ('betoneiras' como lista de dicts), então a interface, o PDF e a
+    anotação não mudam
+'''
+import json
+import struct
+
+import numpy as np
+
+SCHEMA_VERSION = 1
+MAGIC = b"BTR"
+_HEADER = struct.Struct("<3sBIII")  # magic, versão, bytes do JSON, detecções, duplicatas
+
+ID_SIZE = 16
+DETECTION_DTYPE = np.dtype([
+    ('x1', '<i4'), ('y1', '<i4'), ('x2', '<i4'), ('y2', '<i4'),
+    ('conf', '<f4'),
+    ('imagem', '<i2'),   # foto da O.S. (-1 = resultado de uma foto só)
+    ('local', 'u1'),     # 1 = detecção local, 0 = API
+    ('metodo', 'u1'),    # índices na tabela de textos
+    ('cor', 'u1'),
+    ('classe', 'u1'),
+    ('id', f'S{ID_SIZE}'),
+])
+DUPLICATE_DTYPE = np.dtype([
+    ('x1', '<i4'), ('y1', '<i4'), ('x2', '<i4'), ('y2', '<i4'),
+    ('imagem', '<i2'),
+    ('de', f'S{ID_SIZE}'),
+])
+
+# Colunas das linhas no JSON compacto (textos no lugar dos índices)
+DETECTION_COLUMNS = ['id', 'x1', 'y1', 'x2', 'y2', 'conf', 'imagem', 'local', 'metodo', 'cor', 'classe']
+DUPLICATE_COLUMNS = ['imagem', 'x1', 'y1', 'x2', 'y2', 'de']
+
+_ARRAY_KEYS = ('betoneiras', 'duplicatas')
+
+
+class SchemaError(ValueError):
+    """Dados em formato ou versão desconhecidos"""
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    raise TypeError(f"{type(value).__name__} não serializável")
+
+
+def _text_index(texts, value):
+    value = value or ""
+    try:
+        return texts.index(value)
+    except ValueError:
+        if len(texts) >= 255:
+            raise SchemaError("textos distintos demais no resultado")
+        texts.append(value)
+        return len(texts) - 1
+
+
+def _id_bytes(value):
+    encoded = str(value).encode("utf-8")
+    if len(encoded) > ID_SIZE:
+        raise SchemaError(f"id maior que {ID_SIZE} bytes: {value}")
+    return encoded
+
+
+# ==================== DETECÇÕES ====================
+
+def encode_detections(betoneiras, texts):
+    """Lista de dicts → array estruturado (textos acrescentados em `texts`)"""
+    array = np.zeros(len(betoneiras), dtype=DETECTION_DTYPE)
+    for row, bet in zip(array, betoneiras):
+        row['x1'], row['y1'], row['x2'], row['y2'] = bet['bbox']
+        row['conf'] = bet.get('conf', 0.0)
+        row['imagem'] = bet.get('imagem', -1)
+        row['local'] = bool(bet.get('local_detection'))
+        row['metodo'] = _text_index(texts, bet.get('method'))
+        row['cor'] = _text_index(texts, bet.get('cor'))
+        row['classe'] = _text_index(texts, bet.get('class'))
+        row['id'] = _id_bytes(bet.get('id', ''))
+    return array
+
+
+def decode_detections(array, texts, imagens=None):
+    """Array estruturado → lista de dicts no formato do detector"""
+    betoneiras = []
+    for row in array.tolist():
+        record = dict(zip(DETECTION_DTYPE.names, row))
+        bet = {
+            'id': record['id'].decode("utf-8"),
+            'conf': round(record['conf'], 4),
+            'cor': texts[record['cor']],
+            'class': texts[record['classe']],
+            'local_detection': bool(record['local']),
+            'bbox': (record['x1'], record['y1'], record['x2'], record['y2']),
+        }
+        if texts[record['metodo']]:
+            bet['method'] = texts[record['metodo']]
+        if record['imagem'] >= 0:
+            bet['imagem'] = record['imagem']
+            if imagens and record['imagem'] < len(imagens):
+                bet['imagem_path'] = imagens[record['imagem']]['image_path']
+        betoneiras.append(bet)
+    return betoneiras
+
+
+def encode_duplicates(duplicatas):
+    array = np.zeros(len(duplicatas), dtype=DUPLICATE_DTYPE)
+    for row, duplicate in zip(array, duplicatas):
+        row['x1'], row['y1'], row['x2'], row['y2'] = duplicate['bbox']
+        row['imagem'] = duplicate['imagem']
+        row['de'] = _id_bytes(duplicate['de'])
+    return array
+
+
+def decode_duplicates(array):
+    return [{'imagem': imagem, 'bbox': (x1, y1, x2, y2), 'de': de.decode("utf-8")}
+            for x1, y1, x2, y2, imagem, de in array.tolist()]
+
+
+def _header(results, texts):
+    header = {key: value for key, value in results.items() if key not in _ARRAY_KEYS}
+    header['textos'] = texts
+    return header
+
+
+def _restore_sizes(results):
+    """JSON devolve listas; o resto do código espera (largura, altura)"""
+    if isinstance(results.get('image_size'), list):
+        results['image_size'] = tuple(results['image_size'])
+    for foto in results.get('imagens') or []:
+        if isinstance(foto.get('image_size'), list):
+            foto['image_size'] = tuple(foto['image_size'])
+    return results
+
+
+# ==================== BINÁRIO ====================
+
+def pack_result(results):
+    """Resultado → bytes (histórico, cache, comunicação entre processos)"""
+    texts = [""]
+    detections = encode_detections(results.get('betoneiras', []), texts)
+    duplicates = encode_duplicates(results['duplicatas']) if 'duplicatas' in results else None
+    header = json.dumps(_header(results, texts), ensure_ascii=False, separators=(",", ":"),
+                        default=_json_default).encode("utf-8")
+    n_duplicates = 0xFFFFFFFF if duplicates is None else len(duplicates)
+    parts = [_HEADER.pack(MAGIC, SCHEMA_VERSION, len(header), len(detections), n_duplicates),
+             header, detections.tobytes()]
+    if duplicates is not None:
+        parts.append(duplicates.tobytes())
+    return b"".join(parts)
+
+
+def unpack_result(data):
+    """bytes → resultado (mesmo formato de process_image)"""
+    data = memoryview(data)
+    if len(data) < _HEADER.size:
+        raise SchemaError("resultado truncado")
+    magic, version, header_size, n_detections, n_duplicates = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SchemaError("não é um resultado serializado")
+    if version != SCHEMA_VERSION:
+        raise SchemaError(f"versão {version} do resultado não suportada (atual: {SCHEMA_VERSION})")
+
+    offset = _HEADER.size
+    results = json.loads(bytes(data[offset:offset + header_size]).decode("utf-8"))
+    offset += header_size
+    texts = results.pop('textos')
+    detections = np.frombuffer(data, DETECTION_DTYPE, n_detections, offset)
+    results['betoneiras'] = decode_detections(detections, texts, results.get('imagens'))
+    if n_duplicates != 0xFFFFFFFF:
+        offset += detections.nbytes
+        results['duplicatas'] = decode_duplicates(np.frombuffer(data, DUPLICATE_DTYPE, n_duplicates, offset))
+    return _restore_sizes(results)
+
+
+# ==================== JSON COMPACTO ====================
+
+def to_compact(results):
+    """Resultado → dict só com tipos JSON (colunas + linhas)"""
+    texts = [""]
+    detections = encode_detections(results.get('betoneiras', []), texts)
+    compact = json.loads(json.dumps(_header(results, texts), default=_json_default))
+    del compact['textos']
+    compact['v'] = SCHEMA_VERSION
+    compact['deteccoes'] = {
+        'colunas': DETECTION_COLUMNS,
+        'linhas': [
+            [row['id'].decode("utf-8"), int(row['x1']), int(row['y1']), int(row['x2']), int(row['y2']),
+             round(float(row['conf']), 4), int(row['imagem']), int(row['local']),
+             texts[row['metodo']], texts[row['cor']], texts[row['classe']]]
+            for row in detections
+        ],
+    }
+    if 'duplicatas' in results:
+        compact['duplicatas'] = {
+            'colunas': DUPLICATE_COLUMNS,
+            'linhas': [[d['imagem'], *map(int, d['bbox']), d['de']] for d in results['duplicatas']],
+        }
+    return compact
+
+
+def from_compact(compact):
+    """dict do JSON compacto → resultado"""
+    compact = dict(compact)
+    version = compact.pop('v', None)
+    if version != SCHEMA_VERSION:
+        raise SchemaError(f"versão {version} do resultado não suportada (atual: {SCHEMA_VERSION})")
+    imagens = compact.get('imagens')
+    betoneiras = []
+    for row in compact.pop('deteccoes', {'linhas': []})['linhas']:
+        record = dict(zip(DETECTION_COLUMNS, row))
+        bet = {'id': record['id'], 'conf': record['conf'], 'cor': record['cor'], 'class': record['classe'],
+               'local_detection': bool(record['local']),
+               'bbox': (record['x1'], record['y1'], record['x2'], record['y2'])}
+        if record['metodo']:
+            bet['method'] = record['metodo']
+        if record['imagem'] >= 0:
+            bet['imagem'] = record['imagem']
+            if imagens and record['imagem'] < len(imagens):
+                bet['imagem_path'] = imagens[record['imagem']]['image_path']
+        betoneiras.append(bet)
+    compact['betoneiras'] = betoneiras
+    if 'duplicatas' in compact:
+        compact['duplicatas'] = [{'imagem': imagem, 'bbox': (x1, y1, x2, y2), 'de': de}
+                                 for imagem, x1, y1, x2, y2, de in compact['duplicatas']['linhas']]
+    return _restore_sizes(compact)
+
+
+# ==================== EXPORTAÇÃO ====================
+
+def format_boxes(results):
+    """Caixas em texto para CSV: "id:x1,y1,x2,y2;..." (F2:... = foto 2)"""
+    return ";".join(f"{bet['id']}:{','.join(str(int(v)) for v in bet['bbox'])}"
+                    for bet in results.get('betoneiras', []))
@@ -0,0 +1,71 @@
+# roi.py - REGIÕES DE INTERESSE POR LOCAL/CÂMERA
+'''
+✂️ Recorte do Pátio
+    Polígonos configurados em config.json ("roi")
+    A imagem é recortada no retângulo envolvente dos polígonos
+    Pixels fora dos polígonos são zerados (ruas, prédios, caminhões)
+
+📐 Coordenadas normalizadas (0 a 1)
+    O mesmo polígono vale para qualquer resolução da câmera
+'''
+import threading
+
+import cv2
+import numpy as np
+
+from config import load_config
+
+
+class RegionOfInterest:
+    """Máscara de polígonos de um local/câmera"""
+
+    def __init__(self, polygons):
+        self.polygons = [np.array(poly, dtype=np.float32) for poly in polygons if len(poly) >= 3]
+        self._masks = {}
+        self._lock = threading.Lock()
+
+    def _mask_for(self, shape):
+        """Máscara e retângulo envolvente em pixels (cache por resolução)"""
+        h, w = shape[:2]
+        with self._lock:
+            if (h, w) not in self._masks:
+                scale = np.array([w, h], dtype=np.float32)
+                pixel_polys = [np.round(poly * scale).astype(np.int32) for poly in self.polygons]
+
+                all_points = np.concatenate(pixel_polys)
+                x1, y1 = np.clip(all_points.min(axis=0), 0, [w, h])
+                x2, y2 = np.clip(all_points.max(axis=0) + 1, 0, [w, h])
+                bbox = (int(x1), int(y1), int(x2), int(y2))
+
+                mask = np.zeros((bbox[3] - bbox[1], bbox[2] - bbox[0]), dtype=np.uint8)
+                offset = np.array([bbox[0], bbox[1]], dtype=np.int32)
+                cv2.fillPoly(mask, [poly - offset for poly in pixel_polys], 255)
+                self._masks[(h, w)] = (mask, bbox)
+            return self._masks[(h, w)]
+
+    def apply(self, image):
+        """Recorta e mascara a imagem; retorna (recorte, (offset_x, offset_y))"""
+        mask, (x1, y1, x2, y2) = self._mask_for(image.shape)
+        crop = image[y1:y2, x1:x2]
+        return cv2.bitwise_and(crop, crop, mask=mask), (x1, y1)
+
+
+_roi_cache = {}
+_roi_lock = threading.Lock()
+
+
+def get_roi(key, config=None):
+    """ROI configurada para um local/câmera (None se não houver)"""
+    if not key:
+        return None
+    polygons = (config or load_config()).get("roi", {}).get(key)
+    if not polygons:
+        return None
+
+    with _roi_lock:
+        cached = _roi_cache.get(key)
+        if cached is None or cached[0] != polygons:
+            roi = RegionOfInterest(polygons)
+            cached = (polygons, roi if roi.polygons else None)
+            _roi_cache[key] = cached
+        return cached[1]
@@ -0,0 +1,164 @@
+# rollups.py - AGREGADOS INCREMENTAIS DO DASHBOARD
+'''
+📊 Agregados por Dimensão
+    global, cliente, funcionario, dia (AAAA-MM-DD) e hora (AAAA-MM-DD HH)
+    Contagem, sucessos, inconsistências, soma de tempos e de betoneiras
+
+📈 Histogramas
+    diferenca: detectado - esperado (limitado a ±5)
+    tempo: faixas de tempo de processamento
+    hora_do_dia: 0 a 23
+
+⚡ O(1) por Registro
+    Cada novo registro atualiza um número fixo de agregados
+    Em memória (consultas do dashboard) e no SQLite (mesma transação do histórico)
+'''
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup (
+    dimensao TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    sucessos INTEGER NOT NULL DEFAULT 0,
+    inconsistencias INTEGER NOT NULL DEFAULT 0,
+    tempo_total REAL NOT NULL DEFAULT 0,
+    detectado_total INTEGER NOT NULL DEFAULT 0,
+    esperado_total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimensao, chave)
+);
+CREATE TABLE IF NOT EXISTS rollup_histograma (
+    dimensao TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    histograma TEXT NOT NULL,
+    faixa TEXT NOT NULL,
+    contagem INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimensao, chave, histograma, faixa)
+);
+"""
+
+COUNTERS = ['total', 'sucessos', 'inconsistencias', 'tempo_total', 'detectado_total', 'esperado_total']
+
+TIME_BUCKETS = [(1, "<1s"), (2, "1-2s"), (5, "2-5s"), (10, "5-10s"), (30, "10-30s"), (60, "30-60s")]
+
+
+def time_bucket(seconds):
+    for limit, label in TIME_BUCKETS:
+        if seconds < limit:
+            return label
+    return ">60s"
+
+
+def rollup_keys(record):
+    """Dimensões atualizadas por um registro (timestamp no formato de armazenamento)"""
+    timestamp = record.get('timestamp') or ""
+    return [
+        ('global', ''),
+        ('cliente', record.get('cliente') or 'N/A'),
+        ('funcionario', record.get('funcionario') or 'N/A'),
+        ('dia', timestamp[:10]),
+        ('hora', timestamp[:13]),
+    ]
+
+
+def record_deltas(record):
+    """Incrementos de contadores e faixas de histograma de um registro"""
+    sucesso = record.get('status') == 'SUCESSO'
+    detectado = int(record.get('detectado') or 0)
+    esperado = int(record.get('esperado') or 0)
+    tempo = float(record.get('tempo_processamento') or 0)
+    counters = {
+        'total': 1,
+        'sucessos': int(sucesso),
+        'inconsistencias': int(not sucesso),
+        'tempo_total': tempo,
+        'detectado_total': detectado,
+        'esperado_total': esperado,
+    }
+    timestamp = record.get('timestamp') or ""
+    buckets = {
+        'diferenca': str(max(-5, min(5, detectado - esperado))),
+        'tempo': time_bucket(tempo),
+        'hora_do_dia': timestamp[11:13] or "??",
+    }
+    return counters, buckets
+
+
+class RollupAggregates:
+    """Agregados em memória, espelhados nas tabelas rollup/rollup_histograma"""
+
+    def __init__(self):
+        self.values = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    # ==================== MEMÓRIA ====================
+
+    def apply(self, record):
+        """Aplica um registro aos agregados em memória (O(1))"""
+        counters, buckets = record_deltas(record)
+        with self.lock:
+            for key in rollup_keys(record):
+                values = self.values.setdefault(key, dict.fromkeys(COUNTERS, 0))
+                for name, delta in counters.items():
+                    values[name] += delta
+                histograms = self.histograms.setdefault(key, {})
+                for name, bucket in buckets.items():
+                    histogram = histograms.setdefault(name, {})
+                    histogram[bucket] = histogram.get(bucket, 0) + 1
+
+    def get(self, dimension, key=''):
+        """Agregado de uma chave, com médias derivadas"""
+        with self.lock:
+            values = dict(self.values.get((dimension, key), dict.fromkeys(COUNTERS, 0)))
+            histograms = {name: dict(h) for name, h in self.histograms.get((dimension, key), {}).items()}
+        total = values['total']
+        values['tempo_medio'] = values['tempo_total'] / total if total else 0.0
+        values['taxa_sucesso'] = values['sucessos'] / total if total else 0.0
+        values['histogramas'] = histograms
+        return values
+
+    def keys(self, dimension):
+        """Chaves conhecidas de uma dimensão (ex.: todos os clientes)"""
+        with self.lock:
+            return sorted(key for dim, key in self.values if dim == dimension)
+
+    # ==================== SQLITE ====================
+
+    def load(self, conn):
+        """Carrega os agregados persistidos"""
+        with self.lock:
+            self.values.clear()
+            self.histograms.clear()
+            for row in conn.execute(f"SELECT dimensao, chave, {', '.join(COUNTERS)} FROM rollup"):
+                self.values[(row[0], row[1])] = dict(zip(COUNTERS, row[2:]))
+            for dim, key, name, bucket, count in conn.execute(
+                    "SELECT dimensao, chave, histograma, faixa, contagem FROM rollup_histograma"):
+                self.histograms.setdefault((dim, key), {}).setdefault(name, {})[bucket] = count
+
+    def persist(self, conn, record):
+        """Aplica um registro às tabelas de agregados (dentro da transação do lote)"""
+        counters, buckets = record_deltas(record)
+        updates = ", ".join(f"{name} = {name} + excluded.{name}" for name in COUNTERS)
+        for dim, key in rollup_keys(record):
+            conn.execute(
+                f"INSERT INTO rollup (dimensao, chave, {', '.join(COUNTERS)}) "
+                f"VALUES (?, ?, {', '.join('?' for _ in COUNTERS)}) "
+                f"ON CONFLICT (dimensao, chave) DO UPDATE SET {updates}",
+                [dim, key] + [counters[name] for name in COUNTERS]
+            )
+            for name, bucket in buckets.items():
+                conn.execute(
+                    "INSERT INTO rollup_histograma (dimensao, chave, histograma, faixa, contagem) "
+                    "VALUES (?, ?, ?, ?, 1) "
+                    "ON CONFLICT (dimensao, chave, histograma, faixa) DO UPDATE SET contagem = contagem + 1",
+                    (dim, key, name, bucket)
+                )
+
+    def rebuild(self, conn, rows):
+        """Recalcula os agregados a partir do histórico (migração de bancos antigos)"""
+        conn.execute("DELETE FROM rollup")
+        conn.execute("DELETE FROM rollup_histograma")
+        for row in rows:
+            self.persist(conn, dict(row))
+        self.load(conn)
@@ -0,0 +1,134 @@
+# shared_frames.py - QUADROS EM MEMÓRIA COMPARTILHADA ENTRE PROCESSOS
+'''
+🧠 Memória Compartilhada (multiprocessing.shared_memory)
+    Processos trabalhadores escrevem imagens direto em blocos compartilhados
+    Só um descritor pequeno (nome do bloco, formato, tipo) é serializado
+    Nenhum array de vários MB passa pelo pickle da fila de processos
+
+🔁 Ciclo de Vida Explícito
+    SharedFramePool cria N blocos fixos no processo principal (dono)
+    acquire() entrega um bloco livre; release() devolve depois do uso
+    close() (ou o bloco with) fecha e remove todos os blocos, mesmo com erro
+    Trabalhadores só anexam e fecham; nunca removem
+
+📐 Tamanho
+    Cada bloco comporta o maior quadro esperado (ex.: anotada 1600x1600x3)
+    Quadros menores usam o início do bloco; o descritor leva o formato real
+'''
+import queue
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class FrameRef:
+    """Descritor serializável de um quadro dentro de um bloco compartilhado"""
+
+    __slots__ = ('name', 'shape', 'dtype')
+
+    def __init__(self, name, shape, dtype='uint8'):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = str(dtype)
+
+    def __getstate__(self):
+        return self.name, self.shape, self.dtype
+
+    def __setstate__(self, state):
+        self.name, self.shape, self.dtype = state
+
+    @property
+    def nbytes(self):
+        return int(np.prod(self.shape)) * np.dtype(self.dtype).itemsize
+
+    def __repr__(self):
+        return f"FrameRef({self.name!r}, {self.shape}, {self.dtype})"
+
+
+def attach(name):
+    """Anexa um bloco existente sem registrá-lo para remoção neste processo"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+# Blocos já anexados neste processo (trabalhadores reaproveitam entre tarefas)
+_attached = {}
+
+
+def frame_view(ref):
+    """Array numpy sobre o bloco do descritor (sem cópia)"""
+    shm = _attached.get(ref.name)
+    if shm is None:
+        shm = _attached[ref.name] = attach(ref.name)
+    return np.ndarray(ref.shape, dtype=ref.dtype, buffer=shm.buf)
+
+
+def write_frame(name, image):
+    """Copia a imagem para o bloco `name`; retorna o descritor do quadro"""
+    ref = FrameRef(name, image.shape, image.dtype)
+    shm = _attached.get(name)
+    if shm is None:
+        shm = _attached[name] = attach(name)
+    if ref.nbytes > shm.size:
+        raise ValueError(f"quadro de {ref.nbytes} bytes não cabe no bloco de {shm.size}")
+    np.copyto(frame_view(ref), image)
+    return ref
+
+
+def detach_all():
+    """Fecha os anexos deste processo (trabalhador encerrando)"""
+    while _attached:
+        _, shm = _attached.popitem()
+        try:
+            shm.close()
+        except BufferError:
+            pass  # ainda há uma view viva; o SO libera ao encerrar o processo
+
+
+class SharedFramePool:
+    """Blocos compartilhados de tamanho fixo, criados e removidos pelo dono"""
+
+    def __init__(self, slots, slot_bytes):
+        self.slot_bytes = slot_bytes
+        self.blocks = {}
+        self.free = queue.Queue()
+        try:
+            for _ in range(slots):
+                shm = shared_memory.SharedMemory(create=True, size=slot_bytes)
+                self.blocks[shm.name] = shm
+                self.free.put(shm.name)
+        except Exception:
+            self.close()
+            raise
+
+    def acquire(self, timeout=None):
+        """Nome de um bloco livre (bloqueia até algum ser devolvido)"""
+        return self.free.get(timeout=timeout)
+
+    def release(self, name):
+        self.free.put(name)
+
+    def view(self, ref):
+        """Array sobre um bloco do próprio pool (válido até o release)"""
+        return np.ndarray(ref.shape, dtype=ref.dtype, buffer=self.blocks[ref.name].buf)
+
+    def close(self):
+        """Fecha e remove todos os blocos (idempotente)"""
+        while self.blocks:
+            _, shm = self.blocks.popitem()
+            try:
+                shm.close()
+            except BufferError:
+                pass  # view ainda referenciada; a remoção abaixo vale mesmo assim
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,136 @@
+# thumbnails.py - MINIATURAS FORA DA THREAD DA INTERFACE
+'''
+🖼️ Decodificação Reduzida
+    JPEG decodificado já em 1/2, 1/4 ou 1/8 (escala DCT, IMREAD_REDUCED_*)
+    Fator escolhido pelo cabeçalho da imagem (annotation.decode_reduced)
+    O restante é reduzido com INTER_AREA até o tamanho pedido
+
+🧵 Trabalhadores
+    Decodificação, anotação (annotation.py) e conversão BGR→RGB
+    em um QThreadPool próprio
+    A interface recebe um QImage pronto, no tamanho do rótulo
+
+🗃️ Cache LRU
+    Chave: caminho + data de modificação + tamanho pedido
+    Arquivo alterado = nova miniatura; itens mais antigos saem primeiro
+'''
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from annotation import decode_reduced, fit_size, render_annotated
+from config import load_config
+
+
+def to_qimage(image, width, height):
+    """Reduz (mantendo proporção) e converte BGR → QImage independente do array"""
+    rgb = cv2.cvtColor(fit_size(image, width, height), cv2.COLOR_BGR2RGB)
+    h, w = rgb.shape[:2]
+    return QImage(rgb.data, w, h, 3 * w, QImage.Format_RGB888).copy()
+
+
+class ThumbnailCache:
+    """LRU de miniaturas (QImage), segura entre threads"""
+
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            image = self.items.get(key)
+            if image is not None:
+                self.items.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        with self.lock:
+            self.items[key] = image
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_items:
+                self.items.popitem(last=False)
+
+
+class _ThumbnailRunnable(QRunnable):
+    def __init__(self, service, tag, width, height, path=None, results=None):
+        super().__init__()
+        # Sinal fica no ThumbnailService (vive enquanto a janela existir)
+        self.service = service
+        self.tag = tag
+        self.width = width
+        self.height = height
+        self.path = path
+        self.results = results
+
+    def run(self):
+        try:
+            if self.path is not None:
+                thumbnail = self.service.from_path(self.path, self.width, self.height)
+            else:
+                image = render_annotated(self.results, (self.width, self.height))
+                if image is None:
+                    raise ValueError("foto do resultado não encontrada")
+                thumbnail = to_qimage(image, self.width, self.height)
+        except Exception as e:
+            print(f"⚠️  Falha na miniatura {self.path or self.tag}: {e}")
+            thumbnail = QImage()
+        try:
+            self.service.ready.emit(self.tag, thumbnail)
+        except RuntimeError:
+            pass  # janela fechada antes de a miniatura ficar pronta
+
+
+class ThumbnailService(QObject):
+    """Gera miniaturas em segundo plano; resultado chega pelo sinal ready"""
+
+    ready = pyqtSignal(str, QImage)  # etiqueta do pedido, miniatura (nula se falhou)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        settings = load_config()["miniaturas"]
+        self.default_size = (settings["largura"], settings["altura"])
+        self.cache = ThumbnailCache(settings["max_itens"])
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(settings["trabalhadores"])
+
+    def cache_key(self, path, width, height):
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, width, height)
+
+    def from_path(self, path, width, height):
+        """Miniatura de um arquivo (cache LRU; chamada nos trabalhadores)"""
+        key = self.cache_key(path, width, height)
+        thumbnail = self.cache.get(key)
+        if thumbnail is None:
+            image = decode_reduced(path, width, height)
+            if image is None:
+                raise ValueError("formato não suportado")
+            thumbnail = to_qimage(image, width, height)
+            self.cache.put(key, thumbnail)
+        return thumbnail
+
+    def request_path(self, tag, path, size=None):
+        """Pede a miniatura de um arquivo"""
+        width, height = size or self.default_size
+        try:
+            cached = self.cache.get(self.cache_key(path, width, height))
+        except OSError:
+            cached = None
+        if cached is not None:
+            self.ready.emit(tag, cached)
+            return
+        self.pool.start(_ThumbnailRunnable(self, tag, width, height, path=path))
+
+    def request_result(self, tag, results, size=None):
+        """Pede a miniatura anotada de um resultado (desenhada já no tamanho final)"""
+        width, height = size or self.default_size
+        self.pool.start(_ThumbnailRunnable(self, tag, width, height, results=results))
+
+    def shutdown(self):
+        self.pool.clear()
+        self.pool.waitForDone()
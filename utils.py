@@ -1,39 +1,177 @@
 import os
+import reportlab
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle,
+                                BaseDocTemplate, Frame, PageTemplate)
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 from datetime import datetime
+from io import BytesIO
+from xml.sax.saxutils import escape
 import cv2
 
+from annotation import render_annotated
+from config import load_config
+
+# Estilos compilados uma única vez e reaproveitados por todos os relatórios
+STYLES = getSampleStyleSheet()
+
+TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=STYLES['Heading1'],
+    fontSize=16,
+    spaceAfter=30,
+    alignment=1
+)
+
+FOOTER_STYLE = ParagraphStyle(
+    'Footer',
+    parent=STYLES['Normal'],
+    fontSize=8,
+    textColor=colors.grey,
+    alignment=1
+)
+
+CELL_STYLE = ParagraphStyle(
+    'Cell',
+    parent=STYLES['Normal'],
+    fontSize=7,
+    leading=8
+)
+
+INFO_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('PADDING', (0, 0), (-1, -1), 6),
+])
+
+LIST_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('PADDING', (0, 0), (-1, -1), 6),
+])
+
+BATCH_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTSIZE', (0, 0), (-1, -1), 7),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('PADDING', (0, 0), (-1, -1), 3),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+])
+
+BATCH_COLUMNS = [
+    ("Data", 'timestamp', 1.2),
+    ("O.S.", 'os_number', 0.7),
+    ("Cliente", 'cliente', 1.6),
+    ("Funcionário", 'funcionario', 1.3),
+    ("Esp.", 'esperado', 0.45),
+    ("Det.", 'detectado', 0.45),
+    ("Status", 'status', 0.95),
+    ("Tempo", 'tempo_processamento', 0.55),
+]
+
+# O streaming repete o laço interno do BaseDocTemplate.build() (métodos
+# privados); fora das versões conferidas cai no build() público
+STREAMING_VERSIONS = ('4.', '5.')
+STREAMING_SUPPORTED = reportlab.Version.startswith(STREAMING_VERSIONS) and all(
+    hasattr(BaseDocTemplate, name)
+    for name in ('_calc', '_startBuild', '_endBuild', 'clean_hanging', 'handle_flowable')
+)
+
+class StreamingDocTemplate(BaseDocTemplate):
+    """Documento que recebe a história em partes (memória limitada)"""
+
+    def build_stream(self, chunks, onPage=None):
+        """Mesmo ciclo do build(), mas consome um pedaço de cada vez
+
+        Cada pedaço é uma lista de flowables; depois de desenhado
+        ele é descartado antes de o próximo ser gerado. Sem suporte
+        (STREAMING_SUPPORTED), junta os pedaços e usa o build() público.
+        """
+        self._calc()
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id='normal')
+        self.addPageTemplates([PageTemplate(id='Batch', frames=frame, onPage=onPage or _noop,
+                                            pagesize=self.pagesize)])
+        if not STREAMING_SUPPORTED:
+            print(f"⚠️  ReportLab {reportlab.Version}: relatório montado inteiro em memória")
+            self.build([flowable for flowables in chunks for flowable in flowables])
+            return
+        self._startBuild()
+        canv = self.canv
+        canv._doctemplate = self
+        try:
+            for flowables in chunks:
+                while flowables:
+                    self.clean_hanging()
+                    self.handle_flowable(flowables)
+        finally:
+            del canv._doctemplate
+        self._endBuild()
+
+def _noop(canvas, doc):
+    pass
+
 def setup_directories():
     """Cria diretórios necessários"""
     os.makedirs('models', exist_ok=True)
     os.makedirs('reports', exist_ok=True)
     os.makedirs('temp', exist_ok=True)
 
-def generate_pdf_report(results, os_data):  # CORREÇÃO: Mudar ordem dos parâmetros
-    """Gera relatório PDF com os resultados"""
+def compress_image(image, width, height, dpi, quality=85, min_quality=40, budget=None):
+    """JPEG já no tamanho impresso (width/height em pontos), dentro do orçamento
+
+    Acima do orçamento, a qualidade cai até min_quality; depois disso,
+    a resolução é reduzida (20% por vez).
+    """
+    max_w = int(width / inch * dpi)
+    max_h = int(height / inch * dpi)
+    h, w = image.shape[:2]
+    if w > max_w or h > max_h:
+        image = cv2.resize(image, (min(w, max_w), min(h, max_h)), interpolation=cv2.INTER_AREA)
+    while True:
+        ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("Falha ao codificar imagem")
+        if not budget or len(encoded) <= budget:
+            return encoded.tobytes()
+        if quality > min_quality:
+            quality = max(min_quality, quality - 10)
+        elif min(image.shape[:2]) > 64:
+            image = cv2.resize(image, None, fx=0.8, fy=0.8, interpolation=cv2.INTER_AREA)
+        else:
+            return encoded.tobytes()  # melhor esforço
+
+def _build_pdf(story):
+    """Monta o documento em memória (o tamanho final é conhecido antes de gravar)"""
+    buffer = BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4).build(list(story))
+    return buffer.getvalue()
+
+def generate_pdf_report(results, os_data, annotated=None):  # CORREÇÃO: Mudar ordem dos parâmetros
+    """Gera relatório PDF com os resultados
+
+    `annotated`: imagem anotada já pronta (ex.: vinda de um processo do lote);
+    sem ela, a imagem é desenhada aqui no tamanho impresso.
+    """
     setup_directories()
-    # Nome do arquivo
+    # Nome do arquivo (vários relatórios no mesmo segundo não se sobrescrevem)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     pdf_filename = f"reports/relatorio_betoneiras_{timestamp}.pdf"
+    counter = 1
+    while os.path.exists(pdf_filename):
+        counter += 1
+        pdf_filename = f"reports/relatorio_betoneiras_{timestamp}_{counter}.pdf"
     
-    # Criar documento
-    doc = SimpleDocTemplate(pdf_filename, pagesize=A4)
-    styles = getSampleStyleSheet()
+    settings = load_config()["relatorio"]
+    budget = settings["orcamento_bytes"]
+    styles = STYLES
     story = []
     
     # Título
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30,
-        alignment=1
-    )
-    title = Paragraph("RELATÓRIO DE DEVOLUÇÃO DE BETONEIRAS", title_style)
+    title = Paragraph("RELATÓRIO DE DEVOLUÇÃO DE BETONEIRAS", TITLE_STYLE)
     story.append(title)
     
     # Dados da O.S.
@@ -49,11 +187,7 @@ def generate_pdf_report(results, os_data):  # CORREÇÃO: Mudar ordem dos parâm
     ]
     
     os_table = Table(os_info, colWidths=[2*inch, 3*inch])
-    os_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('PADDING', (0, 0), (-1, -1), 6),
-    ]))
+    os_table.setStyle(INFO_TABLE_STYLE)
     story.append(os_table)
     story.append(Spacer(1, 20))
     
@@ -72,11 +206,7 @@ def generate_pdf_report(results, os_data):  # CORREÇÃO: Mudar ordem dos parâm
     ]
     
     detection_table = Table(detection_info, colWidths=[2*inch, 3*inch])
-    detection_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('PADDING', (0, 0), (-1, -1), 6),
-    ]))
+    detection_table.setStyle(INFO_TABLE_STYLE)
     story.append(detection_table)
     story.append(Spacer(1, 20))
     
@@ -94,56 +224,133 @@ def generate_pdf_report(results, os_data):  # CORREÇÃO: Mudar ordem dos parâm
             ])
         
         bet_table = Table(betoneiras_data, colWidths=[1*inch, 1.5*inch, 1.5*inch])
-        bet_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('PADDING', (0, 0), (-1, -1), 6),
-        ]))
+        bet_table.setStyle(LIST_TABLE_STYLE)
         story.append(bet_table)
         story.append(Spacer(1, 20))
     
-    # Imagem processada
-    processed_image = results.get('processed_image')
-    temp_img_path = None
+    # Imagem processada: anotada agora, já no tamanho impresso (sem arquivo temporário)
+    print_size = (int(6 * settings["dpi"]), int(4.5 * settings["dpi"]))
+    processed_image = annotated if annotated is not None else render_annotated(results, print_size)
+    image_index = None
     
     if processed_image is not None:
         story.append(Paragraph("IMAGEM PROCESSADA", styles['Heading3']))
-        
-        # Salvar imagem temporariamente
-        temp_img_path = f"temp/processed_{timestamp}.jpg"
         try:
-            cv2.imwrite(temp_img_path, processed_image)
-            
-            # Adicionar imagem ao PDF
-            if os.path.exists(temp_img_path):
-                img = Image(temp_img_path, width=6*inch, height=4.5*inch)
-                story.append(img)
+            image_data = compress_image(processed_image, 6*inch, 4.5*inch, settings["dpi"],
+                                        settings["qualidade"], settings["qualidade_minima"], budget)
+            image_index = len(story)
+            story.append(Image(BytesIO(image_data), width=6*inch, height=4.5*inch))
         except Exception as e:
-            print(f"⚠️ Erro ao salvar imagem para PDF: {e}")
+            print(f"⚠️ Erro ao preparar imagem para PDF: {e}")
     
     # Rodapé
     story.append(Spacer(1, 20))
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.grey,
-        alignment=1
-    )
-    footer = Paragraph(f"Relatório gerado em {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", footer_style)
+    footer = Paragraph(f"Relatório gerado em {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", FOOTER_STYLE)
     story.append(footer)
     
-    # Gerar PDF
+    # Gerar PDF (o que passar do orçamento sai da imagem)
     try:
-        doc.build(story)
-        
-        # Limpar arquivo temporário
-        if temp_img_path and os.path.exists(temp_img_path):
-            os.remove(temp_img_path)
+        data = _build_pdf(story)
+        for _ in range(3):
+            if image_index is None or not budget or len(data) <= budget:
+                break
+            image_budget = max(1, len(image_data) - (len(data) - budget))
+            image_data = compress_image(processed_image, 6*inch, 4.5*inch, settings["dpi"],
+                                        settings["qualidade"], settings["qualidade_minima"], image_budget)
+            story[image_index] = Image(BytesIO(image_data), width=6*inch, height=4.5*inch)
+            data = _build_pdf(story)
         
+        with open(pdf_filename, 'wb') as f:
+            f.write(data)
         return pdf_filename
         
     except Exception as e:
         print(f"❌ Erro ao gerar PDF: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def _batch_page(canvas, doc):
+    """Cabeçalho e numeração de cada página do relatório consolidado"""
+    canvas.saveState()
+    canvas.setFont('Helvetica-Bold', 9)
+    canvas.drawString(doc.leftMargin, doc.pagesize[1] - 0.5 * inch, doc.title)
+    canvas.setFont('Helvetica', 8)
+    canvas.setFillColor(colors.grey)
+    canvas.drawRightString(doc.pagesize[0] - doc.rightMargin, 0.5 * inch, f"Página {doc.page}")
+    canvas.restoreState()
+
+def _batch_row(record):
+    row = []
+    for _, key, _ in BATCH_COLUMNS:
+        value = record.get(key)
+        if key == 'tempo_processamento':
+            row.append(f"{value or 0:.1f}s")
+        elif key in ('cliente', 'funcionario'):
+            row.append(Paragraph(escape(str(value or '')), CELL_STYLE))
+        else:
+            row.append('' if value is None else str(value))
+    return row
+
+def generate_batch_report(history_store, filters=None, title=None, pdf_filename=None, rows_per_table=50):
+    """Relatório único para muitas O.S. do histórico (ex.: fechamento do mês)
+
+    Os registros são lidos em páginas de iter_records() e viram tabelas de
+    rows_per_table linhas; cada tabela é desenhada e descartada antes da
+    próxima, então a memória não cresce com a quantidade de O.S.
+    """
+    setup_directories()
+    filters = dict(filters or {})
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    pdf_filename = pdf_filename or f"reports/relatorio_consolidado_{timestamp}.pdf"
+    title = title or "RELATÓRIO CONSOLIDADO DE DEVOLUÇÕES"
+
+    # Registros ainda na fila de escrita também entram
+    history_store.flush()
+    total = history_store.count(filters)
+    sucessos = history_store.count(dict(filters, status='SUCESSO'))
+    header = [label for label, _, _ in BATCH_COLUMNS]
+    widths = [width * inch for _, _, width in BATCH_COLUMNS]
+    totals = {'esperado': 0, 'detectado': 0, 'tempo': 0.0}
+
+    def chunks():
+        periodo = " a ".join(filter(None, [filters.get('desde'), filters.get('ate')])) or "todo o histórico"
+        yield [
+            Paragraph(title, TITLE_STYLE),
+            Table([
+                ["Período:", periodo],
+                ["Ordens de Serviço:", str(total)],
+                ["Sucesso:", str(sucessos)],
+                ["Inconsistentes:", str(total - sucessos)],
+            ], colWidths=[2*inch, 3*inch], style=INFO_TABLE_STYLE),
+            Spacer(1, 20),
+        ]
+
+        rows = []
+        for record in history_store.iter_records(filters):
+            rows.append(_batch_row(record))
+            totals['esperado'] += record.get('esperado') or 0
+            totals['detectado'] += record.get('detectado') or 0
+            totals['tempo'] += record.get('tempo_processamento') or 0.0
+            if len(rows) == rows_per_table:
+                yield [Table([header] + rows, colWidths=widths, repeatRows=1, style=BATCH_TABLE_STYLE)]
+                rows = []
+        if rows:
+            yield [Table([header] + rows, colWidths=widths, repeatRows=1, style=BATCH_TABLE_STYLE)]
+
+        yield [
+            Spacer(1, 20),
+            Table([
+                ["Betoneiras Esperadas:", str(totals['esperado'])],
+                ["Betoneiras Detectadas:", str(totals['detectado'])],
+                ["Tempo Médio:", f"{totals['tempo'] / total:.1f}s" if total else "-"],
+            ], colWidths=[2*inch, 3*inch], style=INFO_TABLE_STYLE),
+            Spacer(1, 20),
+            Paragraph(f"Relatório gerado em {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", FOOTER_STYLE),
+        ]
+
+    doc = StreamingDocTemplate(pdf_filename, pagesize=A4, title=title, pageCompression=1)
+    try:
+        doc.build_stream(chunks(), onPage=_batch_page)
+        return pdf_filename
+    except Exception as e:
+        print(f"❌ Erro ao gerar relatório consolidado: {e}")
+        return None
@@ -0,0 +1,402 @@
+# watch_folder.py - INGESTÃO AUTOMÁTICA DE PASTA MONITORADA
+'''
+📂 Pasta Monitorada (sem interface)
+    Câmeras das baias e celulares sincronizam fotos em uma pasta
+    Cada foto nova é detectada, gravada no histórico e vira relatório PDF
+
+👀 Monitoramento
+    watchdog (inotify no Linux) quando instalado
+    Varredura periódica como alternativa (e para arquivos já existentes)
+
+⏳ Arquivos Parcialmente Escritos
+    Só processa quando tamanho e data ficam estáveis por alguns segundos
+    JPEG precisa terminar com o marcador de fim de imagem
+
+🔗 Identificação da O.S.
+    Arquivo .json ao lado da foto (mesmo nome) com os dados da O.S.
+    Ou padrão do nome do arquivo (config.json → "pasta_monitorada" → "padrao_nome")
+    Fotos da mesma O.S. prontas juntas formam um único trabalho (contagem única)
+
+🧵 Fila Limitada
+    Trabalhadores configuráveis; fila cheia segura a varredura (backpressure)
+    Processadas vão para "processados/", falhas para "erros/"
+
+🗃️ Artefatos (artifact_store.py)
+    Foto e prévia anotada guardadas por hash antes do registro no histórico
+
+▶️ Uso
+    python watch_folder.py [pasta] [--trabalhadores N] [--perfil rapido]
+'''
+import json
+import os
+import queue
+import re
+import shutil
+import signal
+import threading
+import time
+
+from artifact_store import ArtifactStore, relink_images
+from config import load_config
+from history_store import HistoryStore, make_record
+
+# Importações condicionais: watchdog e ReportLab são opcionais aqui
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+try:
+    from utils import generate_pdf_report
+except ImportError as e:
+    print(f"⚠️  Relatórios PDF indisponíveis: {e}")
+    generate_pdf_report = None
+
+_STOP = object()
+
+
+def file_complete(path):
+    """JPEG só está completo com o marcador de fim (FF D9) nos últimos bytes"""
+    if not path.lower().endswith((".jpg", ".jpeg")):
+        return True
+    try:
+        with open(path, "rb") as f:
+            f.seek(-16, os.SEEK_END)
+            return b"\xff\xd9" in f.read()
+    except OSError:
+        return False
+
+
+def read_os_data(path, name_pattern, funcionario):
+    """Dados da O.S.: sidecar JSON (prioridade) + grupos do padrão do nome
+
+    Retorna None sem O.S. identificável ou com sidecar inválido (foto vai
+    para a pasta de erro como sem O.S., nunca derruba o monitor).
+    """
+    os_data = {}
+    match = name_pattern.search(os.path.splitext(os.path.basename(path))[0])
+    if match:
+        os_data.update({key: value for key, value in match.groupdict().items() if value})
+
+    sidecar = os.path.splitext(path)[0] + ".json"
+    if os.path.exists(sidecar):
+        try:
+            with open(sidecar, "r", encoding="utf-8") as f:
+                sidecar_data = json.load(f)
+            if not isinstance(sidecar_data, dict):
+                raise ValueError(f"esperado objeto JSON, recebido {type(sidecar_data).__name__}")
+            os_data.update(sidecar_data)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Sidecar inválido {os.path.basename(sidecar)}: {e}")
+            return None
+
+    if not os_data.get('numero_os'):
+        return None
+    try:
+        os_data['quantidade_esperada'] = int(os_data.get('quantidade_esperada') or 0)
+    except (TypeError, ValueError):
+        print(f"⚠️  Quantidade esperada inválida para {os.path.basename(path)}: "
+              f"{os_data.get('quantidade_esperada')!r}")
+        return None
+    os_data.setdefault('funcionario', funcionario)
+    os_data.setdefault('cliente', 'N/A')
+    os_data.setdefault('data_cadastro', time.strftime("%d/%m/%Y %H:%M"))
+    return os_data
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Repassa eventos do watchdog para o rastreador de arquivos"""
+
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.track(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.track(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.track(event.dest_path)
+
+
+class FolderWatcher:
+    """Monitora uma pasta e alimenta uma fila limitada de detecções"""
+
+    def __init__(self, folder=None, workers=None, profile=None, detector=None, history_store=None,
+                 artifact_store=None):
+        settings = load_config()["pasta_monitorada"]
+        self.settings = settings
+        self.folder = os.path.abspath(folder or settings["pasta"])
+        self.workers = workers or settings["trabalhadores"]
+        self.profile = profile or settings["perfil"]
+        self.extensions = tuple(ext.lower() for ext in settings["extensoes"])
+        self.name_pattern = re.compile(settings["padrao_nome"], re.IGNORECASE)
+        self.done_folder = os.path.join(self.folder, settings["pasta_processados"])
+        self.error_folder = os.path.join(self.folder, settings["pasta_erros"])
+        for path in (self.folder, self.done_folder, self.error_folder):
+            os.makedirs(path, exist_ok=True)
+
+        if detector is None:
+            from detector_roboflow_api import BetoneiraDetectorAPI
+            detector = BetoneiraDetectorAPI()
+        self.detector = detector
+        self.history_store = history_store or HistoryStore()
+        if artifact_store is None and load_config()["artefatos"]["ativo"]:
+            artifact_store = ArtifactStore()
+        self.artifact_store = artifact_store
+
+        # caminho -> (tamanho, mtime, estável desde)
+        self.pending = {}
+        self.in_flight = set()
+        self.pending_lock = threading.Lock()
+        self.jobs = queue.Queue(maxsize=settings["max_fila"])
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.observer = None
+        self.stats = {'processadas': 0, 'erros': 0, 'sem_os': 0}
+        self.stats_lock = threading.Lock()
+
+    def count(self, key):
+        """Incrementa uma estatística (vários trabalhadores em paralelo)"""
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    # ==================== DESCOBERTA ====================
+
+    def track(self, path):
+        """Registra (ou renova) um arquivo candidato"""
+        path = os.path.abspath(path)
+        if os.path.dirname(path) != self.folder or not path.lower().endswith(self.extensions):
+            return
+        with self.pending_lock:
+            if path not in self.in_flight:
+                self.pending.setdefault(path, (None, None, None))
+
+    def scan(self):
+        """Varredura completa (alternativa ao watchdog e arquivos já existentes)"""
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    self.track(entry.path)
+
+    def ready_files(self):
+        """Arquivos com tamanho/data estáveis pelo tempo de estabilização"""
+        now = time.time()
+        settle = self.settings["estabilizacao"]
+        ready = []
+        with self.pending_lock:
+            for path, (size, mtime, since) in list(self.pending.items()):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    del self.pending[path]  # removido ou renomeado
+                    continue
+                if (stat.st_size, stat.st_mtime) != (size, mtime):
+                    self.pending[path] = (stat.st_size, stat.st_mtime, now)
+                    continue
+                if stat.st_size and now - since >= settle and file_complete(path):
+                    ready.append(path)
+            for path in ready:
+                del self.pending[path]
+                self.in_flight.add(path)
+        return sorted(ready)
+
+    # ==================== O.S. ====================
+
+    def os_data_for(self, path):
+        return read_os_data(path, self.name_pattern, self.settings["funcionario"])
+
+    def dispatch(self, paths):
+        """Agrupa fotos prontas por O.S. e envia para a fila (bloqueia se cheia)"""
+        groups = {}
+        for path in paths:
+            os_data = self.os_data_for(path)
+            if os_data is None:
+                print(f"❓ Sem O.S. identificável: {os.path.basename(path)}")
+                self.count('sem_os')
+                self.finish([path], self.error_folder)
+                continue
+            group = groups.setdefault(os_data['numero_os'], (os_data, []))
+            group[1].append(path)
+
+        for os_data, group_paths in groups.values():
+            while not self.stop_event.is_set():
+                try:
+                    self.jobs.put((os_data, group_paths), timeout=0.5)
+                    print(f"📥 O.S. {os_data['numero_os']}: {len(group_paths)} foto(s) na fila "
+                          f"({self.jobs.qsize()}/{self.jobs.maxsize})")
+                    break
+                except queue.Full:
+                    continue
+
+    # ==================== PROCESSAMENTO ====================
+
+    def worker_loop(self):
+        while True:
+            item = self.jobs.get()
+            if item is _STOP:
+                return
+            os_data, paths = item
+            try:
+                self.process(os_data, paths)
+            except Exception as e:
+                # Histórico, PDF ou movimentação falharam: o trabalhador continua vivo
+                print(f"❌ O.S. {os_data['numero_os']}: erro inesperado: {e}")
+                self.count('erros')
+                self.finish([path for path in paths if os.path.exists(path)], self.error_folder)
+            finally:
+                with self.pending_lock:
+                    self.in_flight.difference_update(paths)
+                self.jobs.task_done()
+
+    def process(self, os_data, paths):
+        # Sem operador para confirmar: nunca reaproveita o resultado de outra foto
+        options = dict(reuse_duplicates=False, profile=self.profile)
+        try:
+            if len(paths) > 1:
+                results = self.detector.process_images(paths, os_data, **options)
+            else:
+                results = self.detector.process_image(paths[0], os_data, **options)
+        except Exception as e:
+            print(f"❌ O.S. {os_data['numero_os']}: {e}")
+            self.count('erros')
+            self.finish(paths, self.error_folder)
+            return
+
+        if results.get('rejected'):
+            motivos = (results.get('quality') or {}).get('motivos', [])
+            print(f"⛔ O.S. {os_data['numero_os']}: imagem rejeitada no controle de qualidade "
+                  f"({'; '.join(motivos) or 'sem motivo informado'})")
+            self.count('erros')
+            self.finish(paths, self.error_folder)
+            return
+
+        duplicate = results.get('duplicate_of')
+        if duplicate:
+            # Fica registrado também no resultado gravado no histórico
+            print(f"🧬 O.S. {os_data['numero_os']}: resultado reaproveitado de "
+                  f"{os.path.basename(duplicate['image_path'])} ({duplicate['timestamp']})")
+
+        destinations = self.finish(paths, self.done_folder)
+        relink_images(results, destinations)  # PDF e prévia leem as fotos já movidas
+        if self.artifact_store:
+            try:
+                self.artifact_store.archive(results, destinations)
+            except Exception as e:
+                print(f"⚠️  Artefatos da O.S. {os_data['numero_os']} não guardados: {e}")
+        record = make_record(os_data, results, destinations)
+        self.history_store.add(record)
+        self.count('processadas')
+        print(f"✅ O.S. {os_data['numero_os']}: {record['detectado']}/{record['esperado']} "
+              f"betoneiras ({record['status']})")
+
+        if self.settings["gerar_pdf"] and generate_pdf_report:
+            try:
+                pdf_path = generate_pdf_report(results, os_data)
+                print(f"📄 Relatório: {pdf_path}")
+            except Exception as e:
+                print(f"⚠️  Falha ao gerar PDF da O.S. {os_data['numero_os']}: {e}")
+
+    def finish(self, paths, destination):
+        """Move fotos (e sidecars) para processados/erros; retorna os novos caminhos"""
+        moved = []
+        for path in paths:
+            target = os.path.join(destination, os.path.basename(path))
+            if os.path.exists(target):
+                stem, ext = os.path.splitext(target)
+                target = f"{stem}_{int(time.time() * 1000)}{ext}"
+            try:
+                shutil.move(path, target)
+                sidecar = os.path.splitext(path)[0] + ".json"
+                if os.path.exists(sidecar):
+                    shutil.move(sidecar, os.path.splitext(target)[0] + ".json")
+            except OSError as e:
+                print(f"⚠️  Não foi possível mover {os.path.basename(path)}: {e}")
+                target = path
+            moved.append(target)
+            with self.pending_lock:
+                self.in_flight.discard(path)
+        return moved
+
+    # ==================== CICLO DE VIDA ====================
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.worker_loop, name=f"PastaWorker-{i + 1}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+        if WATCHDOG_AVAILABLE:
+            self.observer = Observer()
+            self.observer.schedule(_EventHandler(self), self.folder, recursive=False)
+            self.observer.start()
+            print(f"👀 Monitorando {self.folder} (eventos do sistema de arquivos)")
+        else:
+            print(f"👀 Monitorando {self.folder} (varredura a cada {self.settings['intervalo_varredura']}s; "
+                  f"instale 'watchdog' para eventos)")
+        print(f"🧵 {self.workers} trabalhador(es), fila de até {self.jobs.maxsize} O.S.")
+
+    def run_forever(self):
+        """Laço principal: descoberta, estabilização e envio à fila"""
+        self.start()
+        self.scan()
+        last_scan = time.time()
+        # Com watchdog a varredura completa é só uma rede de segurança
+        scan_every = self.settings["intervalo_varredura"] * (30 if self.observer else 1)
+        try:
+            while not self.stop_event.is_set():
+                if time.time() - last_scan >= scan_every:
+                    self.scan()
+                    last_scan = time.time()
+                ready = self.ready_files()
+                if ready:
+                    self.dispatch(ready)
+                self.stop_event.wait(min(0.5, self.settings["estabilizacao"] / 2))
+        finally:
+            self.shutdown()
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def shutdown(self):
+        """Termina os trabalhos já na fila e grava o histórico"""
+        print("🛑 Encerrando: aguardando trabalhos em andamento...")
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join(timeout=5)
+        for _ in self.threads:
+            self.jobs.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+        self.history_store.close()
+        if self.artifact_store:
+            self.artifact_store.close()
+        print(f"📊 Processadas: {self.stats['processadas']} | Erros: {self.stats['erros']} | "
+              f"Sem O.S.: {self.stats['sem_os']}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingestão automática de fotos de uma pasta")
+    parser.add_argument("pasta", nargs="?", default=None, help="pasta monitorada (padrão: config.json)")
+    parser.add_argument("--trabalhadores", type=int, default=None)
+    parser.add_argument("--perfil", default=None)
+    args = parser.parse_args()
+
+    watcher = FolderWatcher(args.pasta, args.trabalhadores, args.perfil)
+    signal.signal(signal.SIGINT, watcher.stop)
+    signal.signal(signal.SIGTERM, watcher.stop)
+    watcher.run_forever()
+
+
+if __name__ == "__main__":
+    main()